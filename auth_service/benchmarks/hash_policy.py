@@ -0,0 +1,56 @@
+"""Report password hashes per second for hash policies on the current host.
+
+    python benchmarks/hash_policy.py --method scrypt:32768:8:1 --method pbkdf2:sha256:600000
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import typer
+from werkzeug.security import generate_password_hash
+
+DEFAULT_METHODS = [
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:600000",
+]
+
+app = typer.Typer()
+
+
+def _hash_for(method: str, duration: float) -> int:
+    """Hash for `duration` seconds in a single process, return number of hashes."""
+    hashes = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        generate_password_hash("benchmark_password", method=method)
+        hashes += 1
+    return hashes
+
+
+def benchmark(method: str, duration: float, workers: int) -> tuple[float, float]:
+    single = _hash_for(method, duration) / duration
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parallel = sum(executor.map(_hash_for, [method] * workers, [duration] * workers)) / duration
+
+    return single, parallel
+
+
+@app.command()
+def main(
+    method: List[str] = typer.Option(DEFAULT_METHODS, help="werkzeug hash method, may be passed several times"),
+    duration: float = typer.Option(3.0, help="Seconds to hash for every measurement"),
+    workers: int = typer.Option(os.cpu_count() or 1, help="Processes for the parallel measurement"),
+):
+    typer.secho(f"{'method':<28}{'1 process, h/s':>18}{f'{workers} processes, h/s':>22}", fg=typer.colors.BLUE)
+    for hash_method in method:
+        single, parallel = benchmark(method=hash_method, duration=duration, workers=workers)
+        typer.echo(f"{hash_method:<28}{single:>18.1f}{parallel:>22.1f}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,121 @@
+"""Compare requests/sec and latency of BaseHTTPMiddleware and pure ASGI middleware stacks on a trivial endpoint.
+
+Requests are sent straight into the ASGI app, so only the framework and middleware overhead is measured.
+The rate limiter is left disabled in both stacks to keep Redis out of the numbers. Settings are imported
+from src, so run it with the service env, e.g. inside the auth_service container:
+
+    PYTHONPATH=. python benchmarks/middleware_stack.py --requests 20000 --concurrency 50
+"""
+
+import asyncio
+import statistics
+import time
+
+import typer
+from fastapi import FastAPI, Request, status
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from src.api.v1.middlewares import RequestIdMiddleware
+from src.services.rate_limit import RateLimitMiddleware
+
+app = typer.Typer()
+
+
+class BaseHTTPRateLimitMiddleware(BaseHTTPMiddleware):
+    """The previous middleware shape: pass-through BaseHTTPMiddleware with the limiter disabled."""
+
+    async def dispatch(self, request: Request, call_next):
+        return await call_next(request)
+
+
+async def before_request(request: Request, call_next):
+    """The previous X-Request-Id check, registered with app.middleware("http")."""
+    response = await call_next(request)
+    if not request.headers.get("X-Request-Id"):
+        return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "X-Request-Id is required"})
+    return response
+
+
+def create_app(asgi: bool) -> FastAPI:
+    service = FastAPI(default_response_class=ORJSONResponse)
+
+    @service.get("/ping")
+    async def ping() -> dict:
+        return {"ping": "pong"}
+
+    if asgi:
+        service.add_middleware(RequestIdMiddleware)
+        service.add_middleware(RateLimitMiddleware)
+    else:
+        service.middleware("http")(before_request)
+        service.add_middleware(BaseHTTPRateLimitMiddleware)
+    return service
+
+
+async def _request(service: FastAPI) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"x-request-id", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+
+    disconnected = asyncio.Event()
+
+    async def receive() -> dict:
+        if disconnected.is_set():
+            # BaseHTTPMiddleware keeps listening for a disconnect until the response is sent.
+            await asyncio.Future()
+        disconnected.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        pass
+
+    started = time.perf_counter()
+    await service(scope, receive, send)
+    return time.perf_counter() - started
+
+
+async def benchmark(service: FastAPI, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    """Return requests/sec and latencies of all requests."""
+    latencies: list[float] = []
+
+    async def client() -> None:
+        for _ in range(requests // concurrency):
+            latencies.append(await _request(service))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return len(latencies) / (time.perf_counter() - started), latencies
+
+
+async def run(requests: int, concurrency: int) -> None:
+    typer.secho(f"{'stack':<18}{'req/s':>10}{'p50, ms':>10}{'p99, ms':>10}", fg=typer.colors.BLUE)
+    for name, asgi in (("BaseHTTPMiddleware", False), ("pure ASGI", True)):
+        service = create_app(asgi=asgi)
+        # Warm up routing and middleware stack building.
+        await benchmark(service, requests=concurrency * 10, concurrency=concurrency)
+        rps, latencies = await benchmark(service, requests=requests, concurrency=concurrency)
+        percentiles = statistics.quantiles(latencies, n=100)
+        typer.echo(f"{name:<18}{rps:>10.0f}{percentiles[49] * 1000:>10.3f}{percentiles[98] * 1000:>10.3f}")
+
+
+@app.command()
+def main(
+    requests: int = typer.Option(20000, help="Requests to send to every stack"),
+    concurrency: int = typer.Option(50, help="Requests in flight at once"),
+):
+    asyncio.run(run(requests=requests, concurrency=concurrency))
+
+
+if __name__ == "__main__":
+    app()
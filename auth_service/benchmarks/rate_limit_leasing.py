@@ -0,0 +1,105 @@
+"""Report Redis calls per request and over-admission of the rate limiter for lease sizes.
+
+Simulates workers, each with its own RateLimiter, sending requests to one bucket above its limit.
+Settings are imported from src, so run it with the service env, e.g. inside the auth_service container:
+
+    PYTHONPATH=. python benchmarks/rate_limit_leasing.py --redis-url redis://redis:6379 --lease-size 0 --lease-size 10
+"""
+
+import asyncio
+import uuid
+from typing import List
+
+import typer
+from redis.asyncio import Redis
+from src.core.config.base import RateLimitPolicy, RateLimitSettings
+from src.core.metrics import metrics
+from src.core.rate_limit import RateLimiter
+
+app = typer.Typer()
+
+
+async def _worker(
+    rate_limiter: RateLimiter, key: str, policy: RateLimitPolicy, rps: float, duration: float
+) -> tuple[int, int]:
+    """Send requests at `rps` for `duration` seconds, return numbers of sent and admitted requests."""
+    sent = admitted = 0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    while loop.time() < deadline:
+        sent += 1
+        admitted += (await rate_limiter.hit(key=key, policy=policy)).allowed
+        await asyncio.sleep(1 / rps)
+    return sent, admitted
+
+
+async def benchmark(
+    redis: Redis, workers: int, lease_size: int, lease_ttl: float, policy: RateLimitPolicy, rps: float, duration: float
+) -> tuple[int, int, int]:
+    """Return sent requests, admitted requests and Redis calls of one run."""
+    settings = RateLimitSettings(lease_size=lease_size, lease_ttl=lease_ttl, lease_max_fraction=1.0)
+    rate_limiters = [RateLimiter(redis=redis, settings=settings) for _ in range(workers)]
+    key = f"benchmark:{uuid.uuid4()}"
+
+    calls_before = metrics.snapshot()["counters"].get("rate_limit_redis_calls_total", 0)
+    results = await asyncio.gather(
+        *(_worker(rate_limiter, key, policy, rps / workers, duration) for rate_limiter in rate_limiters)
+    )
+    calls = metrics.snapshot()["counters"].get("rate_limit_redis_calls_total", 0) - calls_before
+
+    return sum(sent for sent, _ in results), sum(admitted for _, admitted in results), calls
+
+
+async def run(
+    redis_url: str,
+    lease_sizes: List[int],
+    lease_ttl: float,
+    workers: int,
+    policy: RateLimitPolicy,
+    rps: float,
+    duration: float,
+) -> None:
+    redis = Redis.from_url(redis_url)
+    # GCRA admits a full burst and then the steady rate for the rest of the run.
+    ideal = policy.limit + policy.limit * duration / policy.period
+    typer.secho(
+        f"{'lease':>6}{'sent':>8}{'admitted':>10}{'ideal':>8}{'over':>8}{'bound':>8}{'redis calls/req':>17}",
+        fg=typer.colors.BLUE,
+    )
+    try:
+        for lease_size in lease_sizes:
+            sent, admitted, calls = await benchmark(redis, workers, lease_size, lease_ttl, policy, rps, duration)
+            typer.echo(
+                f"{lease_size:>6}{sent:>8}{admitted:>10}{ideal:>8.0f}{admitted - ideal:>8.0f}"
+                f"{workers * lease_size:>8}{calls / sent:>17.3f}"
+            )
+    finally:
+        await redis.aclose()
+
+
+@app.command()
+def main(
+    redis_url: str = typer.Option("redis://localhost:6379", help="Redis to run against"),
+    lease_size: List[int] = typer.Option([0, 5, 10, 20], help="Lease size, may be passed several times"),
+    lease_ttl: float = typer.Option(1.0, help="Seconds a lease may be spent for"),
+    workers: int = typer.Option(8, help="Simulated workers"),
+    limit: int = typer.Option(100, help="Requests allowed per period"),
+    period: int = typer.Option(1, help="Policy period, seconds"),
+    rps: float = typer.Option(500, help="Load offered by all workers together, requests per second"),
+    duration: float = typer.Option(5.0, help="Seconds to run every measurement for"),
+):
+    asyncio.run(
+        run(
+            redis_url=redis_url,
+            lease_sizes=lease_size,
+            lease_ttl=lease_ttl,
+            workers=workers,
+            policy=RateLimitPolicy(limit=limit, period=period),
+            rps=rps,
+            duration=duration,
+        )
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,86 @@
+"""Compare access and refresh token pairs issued per second by AuthJWT and TokenIssuer for every algorithm.
+
+HS256 uses the configured shared secret, the other algorithms a key ring with one generated key. Settings are
+imported from src, so run it with the service env, e.g. inside the auth_service container:
+
+    PYTHONPATH=. python benchmarks/token_issuance.py --duration 3
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+import typer
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from async_fastapi_jwt_auth import AuthJWT
+from src.core.signing import KeyRing, SigningKey
+from src.core.token_issuer import TokenIssuer
+
+DEFAULT_ALGORITHMS = ["HS256", "RS256", "ES256", "EdDSA"]
+USER_CLAIMS = {"perm": 7, "access_level": 1, "user_id": str(uuid.uuid4()), "epoch": 0}
+
+app = typer.Typer()
+
+
+def create_key_ring(algorithm: str) -> KeyRing | None:
+    if algorithm == "HS256":
+        return None
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    key = SigningKey(
+        kid=algorithm.lower(),
+        algorithm=algorithm,
+        private_key=private_key,
+        active_from=datetime.utcnow() - timedelta(days=1),
+    )
+    return KeyRing(keys=[key], max_token_lifetime=86400)
+
+
+async def issue_with_library(key_ring: KeyRing | None, duration: float) -> int:
+    authorize = AuthJWT()
+    options = {}
+    if key_ring:
+        signing_key = key_ring.get_signing_key()
+        authorize._private_key = signing_key.private_key
+        options = {"algorithm": signing_key.algorithm, "headers": {"kid": signing_key.kid}}
+    pairs = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        await authorize.create_access_token(subject="benchmark@example.com", user_claims=USER_CLAIMS, **options)
+        await authorize.create_refresh_token(subject="benchmark@example.com", user_claims=USER_CLAIMS, **options)
+        pairs += 1
+    return pairs
+
+
+def issue_with_issuer(token_issuer: TokenIssuer, duration: float) -> int:
+    pairs = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        token_issuer.issue_pair(subject="benchmark@example.com", user_claims=USER_CLAIMS)
+        pairs += 1
+    return pairs
+
+
+@app.command()
+def main(
+    algorithm: List[str] = typer.Option(DEFAULT_ALGORITHMS, help="Signing algorithm, may be passed several times"),
+    duration: float = typer.Option(3.0, help="Seconds to issue tokens for every measurement"),
+):
+    typer.secho(
+        f"{'algorithm':<12}{'AuthJWT, pairs/s':>20}{'TokenIssuer, pairs/s':>24}{'speedup':>10}", fg=typer.colors.BLUE
+    )
+    for algorithm_name in algorithm:
+        key_ring = create_key_ring(algorithm_name)
+        library = asyncio.run(issue_with_library(key_ring, duration)) / duration
+        issuer = issue_with_issuer(TokenIssuer(key_ring=key_ring), duration) / duration
+        typer.echo(f"{algorithm_name:<12}{library:>20.0f}{issuer:>24.0f}{issuer / library:>9.2f}x")
+
+
+if __name__ == "__main__":
+    app()
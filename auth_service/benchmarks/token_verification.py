@@ -0,0 +1,123 @@
+"""Report token verifications per second of the downstream client for every signing algorithm.
+
+The JWKS is served by an in-process transport and fetched once, so the numbers are signature and claims checks.
+With --redis-url the denylist is checked too; after the first lookup it is answered from the local cache.
+
+    PYTHONPATH=. python benchmarks/token_verification.py --duration 3
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import httpx
+import jwt
+import orjson
+import typer
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jwt.algorithms import get_default_algorithms
+from redis.asyncio import Redis
+from src.auth_client import JWKSCache, Permission, TokenVerifier
+
+DEFAULT_ALGORITHMS = ["HS256", "RS256", "ES256", "EdDSA"]
+SECRET = "benchmark_secret_of_at_least_32_bytes"
+
+app = typer.Typer()
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    return ed25519.Ed25519PrivateKey.generate()
+
+
+def create_token(algorithm: str, private_key) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": "benchmark@example.com",
+        "iat": now,
+        "nbf": now,
+        "exp": now + timedelta(minutes=15),
+        "jti": str(uuid.uuid4()),
+        "type": "access",
+        "fresh": False,
+        "perm": int(Permission.ROLES_READ),
+        "access_level": 1,
+        "user_id": str(uuid.uuid4()),
+        "epoch": 0,
+    }
+    if algorithm == "HS256":
+        return jwt.encode(claims, SECRET, algorithm="HS256")
+    return jwt.encode(claims, private_key, algorithm=algorithm, headers={"kid": algorithm.lower()})
+
+
+def create_jwks_cache(keys: dict) -> JWKSCache:
+    jwks = {
+        "keys": [
+            {
+                **get_default_algorithms()[algorithm].to_jwk(private_key.public_key(), as_dict=True),
+                "kid": algorithm.lower(),
+                "alg": algorithm,
+                "use": "sig",
+            }
+            for algorithm, private_key in keys.items()
+        ]
+    }
+    body = orjson.dumps(jwks)
+    transport = httpx.MockTransport(
+        lambda _: httpx.Response(200, content=body, headers={"Cache-Control": "max-age=3600"})
+    )
+    return JWKSCache("http://auth/.well-known/jwks.json", client=httpx.AsyncClient(transport=transport))
+
+
+async def verify_for(verifier: TokenVerifier, token: str, duration: float) -> int:
+    verifications = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        verified = await verifier.verify(token)
+        verified.has_permissions(Permission.ROLES_READ)
+        verifications += 1
+    return verifications
+
+
+async def benchmark(algorithms: list[str], duration: float, redis_url: str | None) -> None:
+    keys = {algorithm: generate_private_key(algorithm) for algorithm in algorithms if algorithm != "HS256"}
+    redis = Redis.from_url(redis_url) if redis_url else None
+    # HS256 tokens have no "kid", so they are checked as legacy tokens issued before the key ring.
+    verifier = TokenVerifier(
+        jwks=create_jwks_cache(keys),
+        secret=SECRET,
+        redis=redis,
+        legacy_issued_before=datetime.utcnow() + timedelta(days=1),
+        max_token_lifetime=86400,
+    )
+    verifier.start()
+    try:
+        typer.secho(f"{'algorithm':<12}{'verify/s':>14}{'us/verify':>14}", fg=typer.colors.BLUE)
+        for algorithm in algorithms:
+            token = create_token(algorithm, keys.get(algorithm))
+            # Warm up the JWKS and denylist caches.
+            await verifier.verify(token)
+            rate = await verify_for(verifier, token, duration) / duration
+            typer.echo(f"{algorithm:<12}{rate:>14.0f}{1_000_000 / rate:>14.1f}")
+    finally:
+        await verifier.stop()
+        if redis:
+            await redis.close()
+
+
+@app.command()
+def main(
+    algorithm: List[str] = typer.Option(DEFAULT_ALGORITHMS, help="Signing algorithm, may be passed several times"),
+    duration: float = typer.Option(3.0, help="Seconds to verify for every algorithm"),
+    redis_url: Optional[str] = typer.Option(None, help="Check the denylist in this Redis, e.g. redis://redis:6379"),
+):
+    asyncio.run(benchmark(algorithms=algorithm, duration=duration, redis_url=redis_url))
+
+
+if __name__ == "__main__":
+    app()
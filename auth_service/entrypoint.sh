@@ -13,6 +13,8 @@ done
 # shellcheck disable=SC2164
 cd src
 alembic upgrade heads
+python commands/migrate_sessions.py
+python commands/manage_partitions.py --report
 
 echo "Waiting for users"
 python commands/create_user.py --email=admin@mail.com --password=admin_password --first-name=admin --last-name=admin --access-level=5
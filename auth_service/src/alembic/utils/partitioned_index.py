@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+
+def create_partitioned_index(op, table_name: str, index_name: str, columns: str) -> None:
+    """Create an index of a partitioned table one partition at a time.
+
+    The index of the parent is created invalid with ON ONLY, every partition gets its own index
+    CONCURRENTLY, so writes to the hot table are never blocked, and attaching the last one validates the
+    parent index. Partitions created later inherit the index.
+    """
+    connection = op.get_bind()
+    partitions = connection.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+            ORDER BY c.relname
+            """
+        ),
+        {"table": table_name},
+    ).scalars()
+
+    op.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON ONLY {table_name} ({columns})"))
+    for partition_name in list(partitions):
+        partition_index_name = f"{partition_name}_{index_name.removeprefix('ix_' + table_name + '_')}_idx"
+        with op.get_context().autocommit_block():
+            op.execute(
+                text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index_name} ON {partition_name} ({columns})")
+            )
+        op.execute(text(f"ALTER INDEX {index_name} ATTACH PARTITION {partition_index_name}"))
@@ -0,0 +1,43 @@
+"""lookup_indexes
+
+Revision ID: 2
+Revises: 1
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+
+from src.alembic.utils.partitioned_index import create_partitioned_index
+
+# revision identifiers, used by Alembic.
+revision = "2"
+down_revision = "1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Login history of a user, newest first.
+    create_partitioned_index(
+        op=op,
+        table_name="users_login_history",
+        index_name="ix_users_login_history_user_id_login_time",
+        columns="user_id, login_time, id",
+    )
+    with op.get_context().autocommit_block():
+        # The primary key (user_id, role_id) does not help lookups by role.
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_roles_role_id_user_id ON users_roles (role_id, user_id)"
+        )
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_oauth_users_user_id ON oauth_users (user_id)")
+        # Emails are looked up case-insensitively, fails if there are users differing only by email case.
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_lower ON users (lower(email))")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email_lower", table_name="users")
+    op.drop_index("ix_oauth_users_user_id", table_name="oauth_users")
+    op.drop_index("ix_users_roles_role_id_user_id", table_name="users_roles")
+    # Drops the indexes of the partitions too.
+    op.drop_index("ix_users_login_history_user_id_login_time", table_name="users_login_history")
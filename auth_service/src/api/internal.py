@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, status
+
+from src.core.metrics import metrics
+from src.models.token import TokenIntrospectRequest, TokenIntrospectResponse
+from src.services.token import TokenService, get_token_service
+
+# Not proxied by nginx (only /api is), reachable from inside the cluster only.
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+async def get_metrics() -> dict:
+    """Endpoint to get metrics of the worker that serves the request."""
+    return metrics.snapshot()
+
+
+@router.post("/introspect", response_model=TokenIntrospectResponse, status_code=status.HTTP_200_OK)
+async def introspect(
+    introspect_request: TokenIntrospectRequest, token_service: TokenService = Depends(get_token_service)
+) -> TokenIntrospectResponse:
+    """Endpoint for services that cannot verify tokens themselves to check a batch of tokens in one call.
+
+    Internal only: it answers whether any token is valid and returns its claims, so it is not exposed to clients.
+    """
+    return TokenIntrospectResponse(tokens=await token_service.introspect(introspect_request.tokens))
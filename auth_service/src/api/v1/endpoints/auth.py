@@ -1,18 +1,22 @@
+import time
 from typing import Annotated
 
 from async_fastapi_jwt_auth import AuthJWT
-from async_fastapi_jwt_auth.auth_jwt import AuthJWTBearer
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from async_fastapi_jwt_auth.exceptions import AuthJWTException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from src.api.v1.utils import auth_dep, get_access_cookie_claims, get_verified_claims
 from src.core.config.base import base_auth_jwt_settings
-from src.models.role import RoleInDB
+from src.core.dependencies import get_login_history_writer, get_token_issuer
+from src.core.login_history import LoginHistoryWriter
+from src.core.token_issuer import TokenIssuer
+from src.models.role import get_permissions, get_token_permissions
 from src.models.user import UserInDB, UserLogin, UserLoginHistoryCreate, UserResponse
-from src.services.redis import RedisService, get_redis_service
+from src.services.redis import REFRESH_REUSED, REFRESH_ROTATED, RedisService, get_redis_service
+from src.services.role import RoleService, get_role_service
 from src.services.user import UserService, get_user_service
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-auth_dep = AuthJWTBearer()
-
 
 @router.post("/login", response_model=UserInDB, status_code=status.HTTP_200_OK)
 async def login(
@@ -21,49 +25,50 @@ async def login(
     x_real_ip: Annotated[str | None, Header()] = None,
     authorize: AuthJWT = Depends(auth_dep),
     user_service: UserService = Depends(get_user_service),
+    role_service: RoleService = Depends(get_role_service),
     redis_service: RedisService = Depends(get_redis_service),
+    login_history_writer: LoginHistoryWriter = Depends(get_login_history_writer),
+    token_issuer: TokenIssuer = Depends(get_token_issuer),
 ) -> UserInDB:
     user = await user_service.get_by_email(user_login.email)
-    if not user or not user.check_password(user_login.password):
+    if not user or not await user_service.check_password(user=user, password=user_login.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
 
-    user_roles = [str(RoleInDB.model_validate(role)) for role in user.roles]
+    user_roles = await role_service.get_user_roles(user.id)
+    user_claims = {
+        "perm": int(get_permissions(await role_service.get_role_names(user_roles.role_ids))),
+        "access_level": user.access_level,
+        "user_id": str(user.id),
+        "epoch": await redis_service.get_token_epoch(email=user.email),
+    }
 
-    access_token = await authorize.create_access_token(
-        subject=user_login.email, user_claims={"roles": user_roles, "access_level": user.access_level}
-    )
-    refresh_token = await authorize.create_refresh_token(subject=user_login.email)
+    tokens = token_issuer.issue_pair(subject=user.email, user_claims=user_claims)
 
-    await redis_service.set_refresh_token(email=user_login.email, refresh_token=refresh_token)
+    await redis_service.set_refresh_token(
+        email=user.email, refresh_token=tokens.refresh_token, expires_at=tokens.refresh_expires_at
+    )
 
-    await authorize.set_access_cookies(access_token)
-    await authorize.set_refresh_cookies(refresh_token)
+    await authorize.set_access_cookies(tokens.access_token)
+    await authorize.set_refresh_cookies(tokens.refresh_token)
 
-    login_history_data = UserLoginHistoryCreate(
-        user_id=user.id,
-        ip=x_real_ip,
-        user_agent=user_agent,
-    )
-    await user_service.create_history_record(user_login_history=login_history_data)
+    login_history_writer.write(UserLoginHistoryCreate(user_id=user.id, ip_address=x_real_ip, user_agent=user_agent))
 
     return UserInDB.model_validate(user)
 
 
 @router.post("/logout", response_model=UserResponse, status_code=status.HTTP_200_OK)
 async def logout(
-    authorize: AuthJWT = Depends(auth_dep), redis_service: RedisService = Depends(get_redis_service)
+    request: Request, authorize: AuthJWT = Depends(auth_dep), redis_service: RedisService = Depends(get_redis_service)
 ) -> UserResponse:
     await authorize.jwt_refresh_token_required()
 
-    raw_jwt = await authorize.get_raw_jwt()
-
-    for token_name in ["access", "refresh"]:
-        await redis_service.revoke_token(
-            email=raw_jwt["sub"],
-            token_name=token_name,
-            token_value=raw_jwt["jti"],
-            ttl=base_auth_jwt_settings.access_expires_time,
-        )
+    raw_jwt = get_verified_claims(authorize)
+    now = int(time.time())
+    # Revoked until they expire, the access token only if it is still valid and belongs to the same user.
+    tokens = {"refresh": (raw_jwt["jti"], raw_jwt["exp"] - now)}
+    if (access_jwt := get_access_cookie_claims(request)) and access_jwt["sub"] == raw_jwt["sub"]:
+        tokens["access"] = (access_jwt["jti"], access_jwt["exp"] - now)
+    await redis_service.revoke_tokens(email=raw_jwt["sub"], tokens=tokens)
 
     await authorize.unset_access_cookies()
     await authorize.unset_refresh_cookies()
@@ -71,26 +76,57 @@ async def logout(
     return UserResponse(msg="User has been logged out.")
 
 
+@router.post("/logout-all", response_model=UserResponse, status_code=status.HTTP_200_OK)
+async def logout_all(
+    authorize: AuthJWT = Depends(auth_dep), redis_service: RedisService = Depends(get_redis_service)
+) -> UserResponse:
+    await authorize.jwt_required()
+
+    await redis_service.revoke_all_tokens(email=await authorize.get_jwt_subject())
+
+    await authorize.unset_access_cookies()
+    await authorize.unset_refresh_cookies()
+
+    return UserResponse(msg="User has been logged out from all devices.")
+
+
 @router.post("/refresh", response_model=UserResponse, status_code=status.HTTP_200_OK)
 async def refresh(
     authorize: AuthJWT = Depends(auth_dep),
     redis_service: RedisService = Depends(get_redis_service),
+    token_issuer: TokenIssuer = Depends(get_token_issuer),
 ) -> UserResponse:
     await authorize.jwt_refresh_token_required()
 
-    current_user = await authorize.get_jwt_subject()
-    user_roles = (await authorize.get_raw_jwt()).get("roles")
-    user_access_level = (await authorize.get_raw_jwt()).get("access_level")
-
-    new_access_token = await authorize.create_access_token(
-        subject=current_user, user_claims={"roles": user_roles, "access_level": user_access_level}
+    raw_jwt = get_verified_claims(authorize)
+    current_user = raw_jwt["sub"]
+    # The refresh token passed the denylist check, so its epoch is the current one.
+    user_claims = {
+        "perm": get_token_permissions(raw_jwt),
+        "access_level": raw_jwt.get("access_level"),
+        "user_id": raw_jwt.get("user_id"),
+        "epoch": raw_jwt.get("epoch", 0),
+    }
+
+    tokens = token_issuer.issue_pair(subject=current_user, user_claims=user_claims)
+
+    rotation = await redis_service.rotate_refresh_token(
+        email=current_user,
+        refresh_claims=raw_jwt,
+        refresh_token=authorize._token,
+        new_refresh_token=tokens.refresh_token,
+        new_expires_at=tokens.refresh_expires_at,
     )
-    new_refresh_token = await authorize.create_refresh_token(subject=current_user)
-
-    await redis_service.set_refresh_token(email=current_user, refresh_token=new_refresh_token)
+    if rotation == REFRESH_REUSED:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has already been used, all sessions have been revoked.",
+        )
+    if rotation != REFRESH_ROTATED:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token is not an active session.")
 
-    await authorize.set_access_cookies(new_access_token)
-    await authorize.set_refresh_cookies(new_refresh_token)
+    await authorize.set_access_cookies(tokens.access_token)
+    await authorize.set_refresh_cookies(tokens.refresh_token)
     return UserResponse(msg="Tokens have been refreshed")
 
 
@@ -100,7 +136,7 @@ async def access_revoke(
 ) -> None:
     await authorize.jwt_required()
 
-    raw_jwt = await authorize.get_raw_jwt()
+    raw_jwt = get_verified_claims(authorize)
     await redis_service.revoke_token(
         email=raw_jwt["sub"],
         token_name="access",
@@ -115,10 +151,36 @@ async def refresh_revoke(
 ) -> None:
     await authorize.jwt_refresh_token_required()
 
-    raw_jwt = await authorize.get_raw_jwt()
+    raw_jwt = get_verified_claims(authorize)
     await redis_service.revoke_token(
         email=raw_jwt["sub"],
         token_name="refresh",
         token_value=raw_jwt["jti"],
         ttl=base_auth_jwt_settings.access_expires_time,
     )
+
+
+@router.get("/verify", response_class=Response, status_code=status.HTTP_200_OK)
+async def verify(authorize: AuthJWT = Depends(auth_dep)) -> Response:
+    """Endpoint for nginx auth_request: an empty 200 with the claims in headers or 401.
+
+    Both answers may be cached by the token for AUTHJWT_VERIFY_MAX_AGE seconds at most: a valid token can
+    only become revoked, which the cache hides for that long, and an invalid one never becomes valid.
+    """
+    max_age = base_auth_jwt_settings.verify_max_age
+    try:
+        await authorize.jwt_required()
+    except AuthJWTException:
+        # nginx treats any status but 2xx, 401 and 403 as an error of the subrequest.
+        return Response(status_code=status.HTTP_401_UNAUTHORIZED, headers={"Cache-Control": f"max-age={max_age}"})
+
+    claims = get_verified_claims(authorize)
+    return Response(
+        headers={
+            "X-User-Id": claims.get("user_id") or "",
+            "X-User-Email": claims["sub"],
+            "X-User-Permissions": str(get_token_permissions(claims)),
+            "X-User-Access-Level": str(claims.get("access_level") or 0),
+            "Cache-Control": f"max-age={max(min(claims['exp'] - int(time.time()), max_age), 0)}",
+        }
+    )
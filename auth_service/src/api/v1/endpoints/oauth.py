@@ -1,15 +1,17 @@
 from typing import Annotated
 
 from async_fastapi_jwt_auth import AuthJWT
-from async_fastapi_jwt_auth.auth_jwt import AuthJWTBearer
 from fastapi import APIRouter, HTTPException, status, Query, Depends, Header
 from fastapi.responses import RedirectResponse
-from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.dependencies import get_pg_connection
+from src.api.v1.utils import auth_dep
+from src.core.dependencies import call_after_commit, get_db_session, get_login_history_writer, get_token_issuer
+from src.core.login_history import LoginHistoryWriter
+from src.core.token_issuer import TokenIssuer
 from services import RoleService
 from services.role import get_role_service
-from src.models.role import RoleInDB
+from src.models.role import get_permissions
 from src.models.user import UserLoginHistoryCreate, UserInDB
 from src.services import RedisService, UserService
 from src.services.redis import get_redis_service
@@ -37,9 +39,6 @@ async def login(oauth_provider: OAuthProviderEnum):
     return RedirectResponse(url=redirect_url)
 
 
-auth_dep = AuthJWTBearer()
-
-
 @router.post("/callback/{provider}")
 async def callback(
     provider: str,
@@ -50,11 +49,13 @@ async def callback(
     user_service: UserService = Depends(get_user_service),
     role_service: RoleService = Depends(get_role_service),
     redis_service: RedisService = Depends(get_redis_service),
-    pg_connection: AsyncEngine = Depends(get_pg_connection),
+    session: AsyncSession = Depends(get_db_session),
+    login_history_writer: LoginHistoryWriter = Depends(get_login_history_writer),
+    token_issuer: TokenIssuer = Depends(get_token_issuer),
 ):
     oauth_service = get_oauth_service(
         provider=provider,
-        pg_connection=pg_connection,
+        session=session,
         redis=redis_service.redis,
         role_service=role_service,
         user_service=user_service,
@@ -64,7 +65,7 @@ async def callback(
 
     if oauth_user := await oauth_service._get_oauth_user_by_id(oauth_id=user_info.get("id")):
         user = oauth_user.user
-        user_roles = [str(RoleInDB.model_validate(role)) for role in user.roles]
+        user_roles = [role.name for role in user.roles]
     else:
         user = await oauth_service.create_oauth(
             oauth_id=user_info.get("id"),
@@ -74,23 +75,26 @@ async def callback(
         )
         role = await role_service.get_by_name(role_name=DEFAULT_ROLE)
         await role_service.assign_role(role=role, user=user)
-        user_roles = [str(RoleInDB.model_validate(role))]
-
-    access_token = await authorize.create_access_token(
-        subject=user.email, user_claims={"roles": user_roles, "access_level": user.access_level}
-    )
-    refresh_token = await authorize.create_refresh_token(subject=user.email)
+        user_roles = [role.name]
 
-    await redis_service.set_refresh_token(email=user.email, refresh_token=refresh_token)
+    user_claims = {
+        "perm": int(get_permissions(user_roles)),
+        "access_level": user.access_level,
+        "user_id": str(user.id),
+        "epoch": await redis_service.get_token_epoch(email=user.email),
+    }
 
-    await authorize.set_access_cookies(access_token)
-    await authorize.set_refresh_cookies(refresh_token)
+    tokens = token_issuer.issue_pair(subject=user.email, user_claims=user_claims)
 
-    login_history_data = UserLoginHistoryCreate(
-        user_id=user.id,
-        ip=x_real_ip,
-        user_agent=user_agent,
+    await redis_service.set_refresh_token(
+        email=user.email, refresh_token=tokens.refresh_token, expires_at=tokens.refresh_expires_at
     )
-    await user_service.create_history_record(user_login_history=login_history_data)
+
+    await authorize.set_access_cookies(tokens.access_token)
+    await authorize.set_refresh_cookies(tokens.refresh_token)
+
+    # The user may be created by this very request, its history can only be written once it is committed.
+    login_history = UserLoginHistoryCreate(user_id=user.id, ip_address=x_real_ip, user_agent=user_agent)
+    call_after_commit(session, lambda: login_history_writer.write(login_history))
 
     return UserInDB.model_validate(user)
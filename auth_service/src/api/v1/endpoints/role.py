@@ -1,9 +1,9 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from src.api.v1.utils import has_permission
+from src.api.v1.utils import require_permissions
 from src.models.response import ResponseModel
-from src.models.role import RoleCRUD, RoleEnum, RoleInDB
+from src.models.role import Permission, RoleCRUD, RoleInDB
 from src.services.role import RoleService, get_role_service
 from src.services.user import UserService, get_user_service
 
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/roles", tags=["roles"])
     "/",
     response_model=RoleInDB,
     status_code=status.HTTP_201_CREATED,
-    dependencies=[Depends(has_permission(roles=[RoleEnum.admin], access_level=5))],
+    dependencies=[Depends(require_permissions(Permission.ROLES_WRITE, access_level=5))],
 )
 async def create_role(
     role_data: RoleCRUD,
@@ -40,7 +40,7 @@ async def create_role(
     "/",
     response_model=list[RoleInDB],
     status_code=status.HTTP_200_OK,
-    dependencies=[Depends(has_permission(roles=[RoleEnum.admin, RoleEnum.staff], access_level=1))],
+    dependencies=[Depends(require_permissions(Permission.ROLES_READ, access_level=1))],
 )
 async def get_roles(
     role_service: RoleService = Depends(get_role_service),
@@ -59,7 +59,7 @@ async def get_roles(
     "/{role_id}",
     response_model=RoleInDB,
     status_code=status.HTTP_200_OK,
-    dependencies=[Depends(has_permission(roles=[RoleEnum.admin], access_level=5))],
+    dependencies=[Depends(require_permissions(Permission.ROLES_WRITE, access_level=5))],
 )
 async def update_role(
     role_id: UUID,
@@ -86,7 +86,7 @@ async def update_role(
     "/{role_id}",
     response_model=RoleInDB,
     status_code=status.HTTP_200_OK,
-    dependencies=[Depends(has_permission(roles=[RoleEnum.admin], access_level=5))],
+    dependencies=[Depends(require_permissions(Permission.ROLES_WRITE, access_level=5))],
 )
 async def delete_role(
     role_id: UUID,
@@ -112,7 +112,7 @@ async def delete_role(
     "/{role_id}/users/",
     response_model=ResponseModel,
     status_code=status.HTTP_200_OK,
-    dependencies=[Depends(has_permission(roles=[RoleEnum.admin], access_level=5))],
+    dependencies=[Depends(require_permissions(Permission.ROLES_ASSIGN, access_level=5))],
 )
 async def assign_role(
     role_id: UUID,
@@ -152,7 +152,7 @@ async def assign_role(
     "/{role_id}/users/",
     response_model=ResponseModel,
     status_code=status.HTTP_200_OK,
-    dependencies=[Depends(has_permission(roles=[RoleEnum.admin], access_level=5))],
+    dependencies=[Depends(require_permissions(Permission.ROLES_ASSIGN, access_level=5))],
 )
 async def revoke_role(
     role_id: UUID,
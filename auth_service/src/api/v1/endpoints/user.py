@@ -1,15 +1,34 @@
+from datetime import datetime
 from uuid import UUID
 
-from async_fastapi_jwt_auth.auth_jwt import AuthJWT, AuthJWTBearer
-from fastapi import APIRouter, Depends, HTTPException, status
+from async_fastapi_jwt_auth.auth_jwt import AuthJWT
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi_pagination import Page
 
-from src.models.user import UserCreate, UserInDB, UserLoginHistoryInDB, UserUpdateCredentials
+from src.api.v1.utils import auth_dep, get_verified_claims
+from src.core.hashing import PasswordHasherOverloadedError
+from src.models.user import (
+    UserCreate,
+    UserInDB,
+    UserLoginHistoryCursorPage,
+    UserLoginHistoryInDB,
+    UserUpdateCredentials,
+)
+from src.services.redis import RedisService, get_redis_service
 from src.services.user import UserService, get_user_service
 
 router = APIRouter(prefix="/users", tags=["user"])
 
-auth_dep = AuthJWTBearer()
+
+async def get_current_user_id(authorize: AuthJWT, user_service: UserService) -> UUID:
+    raw_jwt = get_verified_claims(authorize)
+    if user_id := raw_jwt.get("user_id"):
+        return UUID(user_id)
+    # Tokens issued before the claim was added only carry the email.
+    user = await user_service.get_by_email(user_email=raw_jwt["sub"])
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return user.id
 
 
 @router.get("/history", response_model=Page[UserLoginHistoryInDB], status_code=status.HTTP_200_OK)
@@ -18,8 +37,33 @@ async def get_user_history(
     user_service: UserService = Depends(get_user_service),
 ) -> Page[UserLoginHistoryInDB]:
     await authorize.jwt_required()
-    user_email = await authorize.get_jwt_subject()
-    return await user_service.get_user_login_history(email=user_email)
+    user_id = await get_current_user_id(authorize=authorize, user_service=user_service)
+    return await user_service.get_user_login_history(user_id=user_id)
+
+
+@router.get("/history/cursor", response_model=UserLoginHistoryCursorPage, status_code=status.HTTP_200_OK)
+async def get_user_history_page(
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    size: int = Query(50, ge=1, le=100),
+    from_time: datetime | None = Query(None, alias="from", description="Only records at or after this time"),
+    to_time: datetime | None = Query(None, alias="to", description="Only records before this time"),
+    estimate_total: bool = Query(False, description="Add planner estimate of the number of records"),
+    authorize: AuthJWT = Depends(auth_dep),
+    user_service: UserService = Depends(get_user_service),
+) -> UserLoginHistoryCursorPage:
+    await authorize.jwt_required()
+    user_id = await get_current_user_id(authorize=authorize, user_service=user_service)
+    try:
+        return await user_service.get_user_login_history_page(
+            user_id=user_id,
+            size=size,
+            cursor=cursor,
+            from_time=from_time,
+            to_time=to_time,
+            estimate_total=estimate_total,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
 
 
 @router.post("/signup", response_model=UserInDB, status_code=status.HTTP_201_CREATED)
@@ -31,6 +75,8 @@ async def create_user(user_create: UserCreate, user_service: UserService = Depen
         )
     try:
         return await user_service.create(user_create=user_create)
+    except PasswordHasherOverloadedError:
+        raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -44,6 +90,7 @@ async def change_user_credentials(
     update_credentials: UserUpdateCredentials,
     authorize: AuthJWT = Depends(auth_dep),
     user_service: UserService = Depends(get_user_service),
+    redis_service: RedisService = Depends(get_redis_service),
 ) -> UserInDB:
     await authorize.jwt_required()
 
@@ -61,7 +108,7 @@ async def change_user_credentials(
             detail="You can't change credentials for another user",
         )
 
-    if not user.check_password(update_credentials.old_password):
+    if not await user_service.check_password(user=user, password=update_credentials.old_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid old password",
@@ -73,4 +120,10 @@ async def change_user_credentials(
             detail="New password should be different from the old one",
         )
 
-    return await user_service.update_credentials(user=user, new_password=update_credentials.new_password)
+    updated_user = await user_service.update_credentials(user=user, new_password=update_credentials.new_password)
+    # Sessions opened with the old password must not survive its change.
+    await redis_service.revoke_all_tokens(email=user_email)
+    await authorize.unset_access_cookies()
+    await authorize.unset_refresh_cookies()
+
+    return updated_user
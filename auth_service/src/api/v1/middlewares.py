@@ -1,11 +1,21 @@
 from fastapi import status
-from fastapi.requests import Request
 from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 
-async def before_request(request: Request, call_next):
-    response = await call_next(request)
-    request_id = request.headers.get("X-Request-Id")
-    if not request_id:
-        return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "X-Request-Id is required"})
-    return response
+class RequestIdMiddleware:
+    """Reject requests without X-Request-Id before they reach the application."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not Headers(scope=scope).get("X-Request-Id"):
+            response = ORJSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "X-Request-Id is required"}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
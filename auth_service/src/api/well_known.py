@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+
+from src.core.config import base_auth_jwt_settings
+from src.core.dependencies import get_key_ring
+from src.core.signing import KeyRing
+
+router = APIRouter(prefix="/.well-known", tags=["well-known"])
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(","))
+
+
+@router.get("/jwks.json", status_code=status.HTTP_200_OK)
+async def get_jwks(request: Request, key_ring: KeyRing | None = Depends(get_key_ring)) -> Response:
+    """Endpoint to get public keys verifying tokens, downstream services cache it and verify tokens locally."""
+    if not key_ring:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tokens are not signed with public keys.")
+
+    body, etag = key_ring.get_jwks()
+    headers = {"Cache-Control": f"public, max-age={base_auth_jwt_settings.jwks_max_age}", "ETag": etag}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,11 @@
+"""Local verification of auth service tokens for downstream services.
+
+    verifier = TokenVerifier(jwks=JWKSCache("http://auth/.well-known/jwks.json"), redis=Redis(...))
+    verifier.start()
+    token = await verifier.verify(raw_token)
+    if not token.has_permissions(Permission.ROLES_READ): ...
+"""
+
+from src.auth_client.jwks import JWKSCache, VerificationKey  # noqa
+from src.auth_client.verifier import TokenRevokedError, TokenVerifier, VerifiedToken  # noqa
+from src.models.role import Permission  # noqa
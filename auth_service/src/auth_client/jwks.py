@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+import jwt
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+@dataclass(frozen=True)
+class VerificationKey:
+    kid: str
+    algorithm: str
+    key: Any
+
+
+class JWKSCache:
+    """Public keys of the auth service, fetched from its JWKS endpoint and kept for the advertised max-age.
+
+    Expired keys are revalidated with If-None-Match, so an unchanged set costs a 304. A token naming an
+    unknown "kid" triggers a refetch (at most once per ``min_refresh_interval`` seconds): the auth service
+    publishes keys before they sign, so this only happens when the cache predates the publication.
+    If the endpoint is unreachable the last known keys are used until it recovers.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        client: httpx.AsyncClient | None = None,
+        default_max_age: float = 300.0,
+        min_refresh_interval: float = 30.0,
+    ) -> None:
+        self._url = url
+        self._client = client or httpx.AsyncClient(timeout=5.0)
+        self._default_max_age = default_max_age
+        self._min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, VerificationKey] = {}
+        self._etag: str | None = None
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get_key(self, kid: str) -> VerificationKey | None:
+        now = time.monotonic()
+        if now >= self._expires_at or (kid not in self._keys and now - self._fetched_at >= self._min_refresh_interval):
+            await self.refresh()
+        return self._keys.get(kid)
+
+    async def refresh(self) -> None:
+        fetched_at = self._fetched_at
+        async with self._lock:
+            # Another request refreshed the keys while this one was waiting for the lock.
+            if self._fetched_at != fetched_at:
+                return
+            try:
+                await self._fetch()
+            except (httpx.HTTPError, ValueError, KeyError):
+                logging.error("Could not fetch JWKS from '{}'".format(self._url), exc_info=True)
+                # Keep serving the known keys, retry after min_refresh_interval.
+                self._expires_at = time.monotonic() + self._min_refresh_interval
+            self._fetched_at = time.monotonic()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def _fetch(self) -> None:
+        headers = {"If-None-Match": self._etag} if self._etag else {}
+        response = await self._client.get(self._url, headers=headers)
+        if response.status_code != httpx.codes.NOT_MODIFIED:
+            response.raise_for_status()
+            self._keys = self._parse(response.json())
+            self._etag = response.headers.get("ETag")
+        max_age = MAX_AGE_PATTERN.search(response.headers.get("Cache-Control", ""))
+        self._expires_at = time.monotonic() + (int(max_age.group(1)) if max_age else self._default_max_age)
+
+    @staticmethod
+    def _parse(jwks: dict) -> dict[str, VerificationKey]:
+        keys = {}
+        for jwk in jwks["keys"]:
+            try:
+                keys[jwk["kid"]] = VerificationKey(kid=jwk["kid"], algorithm=jwk["alg"], key=jwt.PyJWK(jwk).key)
+            except (jwt.PyJWKError, KeyError):
+                logging.error("Skipping unusable JWK '{}'".format(jwk.get("kid")), exc_info=True)
+        return keys
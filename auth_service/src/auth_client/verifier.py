@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import reduce
+from operator import or_
+from typing import Any
+
+import jwt
+from redis.asyncio import Redis
+
+from src.auth_client.jwks import JWKSCache
+from src.core.denylist import DenylistCache
+from src.core.legacy_tokens import LEGACY_ALGORITHM, decode_legacy_token
+from src.core.pubsub import RedisSubscriber
+from src.models.role import Permission, get_token_permissions
+
+
+class TokenRevokedError(jwt.InvalidTokenError):
+    pass
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    claims: dict[str, Any]
+
+    @property
+    def subject(self) -> str:
+        return self.claims["sub"]
+
+    @property
+    def user_id(self) -> str | None:
+        return self.claims.get("user_id")
+
+    @property
+    def access_level(self) -> int:
+        return self.claims.get("access_level", 0)
+
+    @property
+    def permissions(self) -> Permission:
+        return Permission(get_token_permissions(self.claims))
+
+    def has_permissions(self, *permissions: Permission, access_level: int = 0) -> bool:
+        """Same check as ``require_permissions`` of the auth service: all of the bits and at least access_level."""
+        required = reduce(or_, permissions, Permission(0))
+        return (self.permissions & required) == required and self.access_level >= access_level
+
+
+class TokenVerifier:
+    """Verify tokens of the auth service locally, without calling its API.
+
+    Signatures are checked with keys from the JWKS endpoint (``jwks``) or, for a service still signing with
+    the shared secret, with ``secret``. With ``redis`` the denylist written by the auth service is checked too,
+    through the same pub/sub synced per-process cache the service uses; call ``start``/``stop`` around use.
+
+    With both ``jwks`` and ``secret`` tokens without "kid" are accepted only if issued before
+    ``legacy_issued_before`` and for at most ``max_token_lifetime`` seconds after that, as the service does.
+    """
+
+    def __init__(
+        self,
+        jwks: JWKSCache | None = None,
+        secret: str | None = None,
+        redis: Redis | None = None,
+        denylist_size: int = 100_000,
+        issuer: str | None = None,
+        audience: str | None = None,
+        leeway: int = 0,
+        legacy_issued_before: datetime | None = None,
+        max_token_lifetime: int | None = None,
+    ) -> None:
+        if not jwks and not secret:
+            raise ValueError("Either jwks or secret is required")
+        if jwks and secret and (legacy_issued_before is None or max_token_lifetime is None):
+            raise ValueError("legacy_issued_before and max_token_lifetime are required to accept legacy tokens")
+        self._jwks = jwks
+        self._secret = secret
+        self._legacy_issued_before = legacy_issued_before
+        self._max_token_lifetime = max_token_lifetime
+        self._options = {"issuer": issuer, "audience": audience, "leeway": leeway}
+        self._subscriber = RedisSubscriber(redis=redis) if redis else None
+        self._denylist = DenylistCache(redis, self._subscriber, max_size=denylist_size) if redis else None
+
+    def start(self) -> None:
+        if self._subscriber:
+            self._subscriber.start()
+
+    async def stop(self) -> None:
+        if self._subscriber:
+            await self._subscriber.stop()
+        if self._jwks:
+            await self._jwks.close()
+
+    async def verify(self, token: str, token_type: str = "access") -> VerifiedToken:
+        """Verify the token, raise jwt.InvalidTokenError (TokenRevokedError if revoked) when it is not valid."""
+        claims = await self._decode(token)
+        if claims.get("type") != token_type:
+            raise jwt.InvalidTokenError("Only {} tokens are allowed".format(token_type))
+        if self._denylist and await self._denylist.is_token_revoked(claims):
+            raise TokenRevokedError("Token has been revoked")
+        return VerifiedToken(claims=claims)
+
+    async def _decode(self, token: str) -> dict:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            if not self._secret:
+                raise jwt.InvalidTokenError("Token has no key id")
+            if not self._jwks:
+                return jwt.decode(token, self._secret, algorithms=[LEGACY_ALGORITHM], **self._options)
+            return decode_legacy_token(
+                token,
+                self._secret,
+                issued_before=self._legacy_issued_before,
+                max_token_lifetime=self._max_token_lifetime,
+                **self._options,
+            )
+
+        if not self._jwks or not (key := await self._jwks.get_key(kid)):
+            raise jwt.InvalidTokenError("Unknown key id '{}'".format(kid))
+        return jwt.decode(token, key.key, algorithms=[key.algorithm], **self._options)
@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import json
+from asyncio import run as aiorun
+from datetime import datetime
+from pathlib import Path
+
+import typer
+from sqlalchemy import exc, text
+from src.commands.base import async_engine
+from src.core.partitions import (
+    LOGIN_HISTORY_TABLE,
+    PARTITION_KEY,
+    detach_partition,
+    get_partition_name,
+    is_partition_attached,
+    list_partitions,
+)
+
+app = typer.Typer()
+
+ARCHIVE_FORMAT = "ndjson+gzip"
+
+
+def get_archive_paths(output_dir: Path, partition: str) -> tuple[Path, Path]:
+    """Get paths of the data file and the manifest of an archived partition."""
+    return output_dir / f"{partition}.ndjson.gz", output_dir / f"{partition}.manifest.json"
+
+
+def get_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(2**20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def count_lines(path: Path) -> int:
+    """Count rows of an archive, reading it back also checks the gzip CRC."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        return sum(1 for _ in file)
+
+
+async def dump_partition(name: str, path: Path, batch_size: int) -> tuple[int, int]:
+    """Stream partition rows into path as gzipped NDJSON, return rows in the table and rows written."""
+    written = 0
+    async with async_engine.connect() as connection:
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        # One snapshot for the count and the rows.
+        async with driver_connection.transaction(isolation="repeatable_read", readonly=True):
+            rows = await driver_connection.fetchval(f"SELECT count(*) FROM {name}")
+            with gzip.open(path, "wt", encoding="utf-8") as file:
+                async for record in driver_connection.cursor(
+                    f"SELECT row_to_json(t)::text FROM {name} t ORDER BY {PARTITION_KEY}, id", prefetch=batch_size
+                ):
+                    file.write(record[0])
+                    file.write("\n")
+                    written += 1
+    return rows, written
+
+
+async def archive_partition(month: datetime, output_dir: Path, detach: bool, drop: bool, batch_size: int) -> bool:
+    """Archive the partition of the month, return whether it succeeded."""
+    month = month.date().replace(day=1)
+    name = get_partition_name(LOGIN_HISTORY_TABLE, month)
+    data_path, manifest_path = get_archive_paths(output_dir, name)
+    partial_path = data_path.with_name(f"{data_path.name}.partial")
+    typer.secho(
+        message=(
+            f"Plan: {'detach, ' if detach else ''}archive '{name}' to '{data_path}', "
+            f"{'drop' if drop else 'keep'} the table once the archive is verified"
+        ),
+        fg=typer.colors.BLUE,
+    )
+    try:
+        async with async_engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            attached = await is_partition_attached(connection, name)
+            if attached is None:
+                typer.secho(message=f"Partition '{name}' does not exist", fg=typer.colors.RED)
+                return False
+            if attached:
+                if not detach:
+                    typer.secho(message=f"Partition '{name}' is attached, pass --detach", fg=typer.colors.RED)
+                    return False
+                partitions = await list_partitions(connection, LOGIN_HISTORY_TABLE)
+                partition = next(partition for partition in partitions if partition.name == name)
+                has_default = any(partition.is_default for partition in partitions)
+                typer.secho(message=f"Detaching partition '{name}' ...", fg=typer.colors.BLUE)
+                await detach_partition(connection, LOGIN_HISTORY_TABLE, partition, concurrently=not has_default)
+
+        typer.secho(message=f"Archiving partition '{name}' to '{data_path}' ...", fg=typer.colors.BLUE)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        rows, written = await dump_partition(name, partial_path, batch_size)
+        archived = count_lines(partial_path)
+        if not rows == written == archived:
+            typer.secho(
+                message=f"Row counts do not match: {rows} in '{name}', {written} written, {archived} archived",
+                fg=typer.colors.RED,
+            )
+            return False
+        partial_path.rename(data_path)
+
+        manifest = {
+            "table": LOGIN_HISTORY_TABLE,
+            "partition": name,
+            "month": month.isoformat(),
+            "format": ARCHIVE_FORMAT,
+            "file": data_path.name,
+            "rows": rows,
+            "bytes": data_path.stat().st_size,
+            "sha256": get_sha256(data_path),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+
+        if drop:
+            async with async_engine.begin() as connection:
+                await connection.execute(text(f"DROP TABLE {name}"))
+    except exc.SQLAlchemyError as e:
+        typer.secho(message=f"There is an SQLAlchemyError error: {e}", fg=typer.colors.RED)
+        return False
+    except Exception as e:
+        typer.secho(message=f"There is an error: {e}", fg=typer.colors.RED)
+        return False
+
+    typer.secho(
+        message=f"Partition '{name}' archived, {rows} rows{', table dropped' if drop else ''}.",
+        fg=typer.colors.GREEN,
+    )
+    return True
+
+
+@app.command()
+def main(
+    month: datetime = typer.Option(..., formats=["%Y-%m"], help="Month of the partition, YYYY-MM"),
+    output_dir: Path = typer.Option(Path("archive"), help="Directory for the data file and the manifest"),
+    detach: bool = typer.Option(False, help="Detach the partition first if it is still attached"),
+    drop: bool = typer.Option(False, help="Drop the table once the archive is verified"),
+    batch_size: int = typer.Option(10_000, help="Rows fetched from the server-side cursor at once"),
+):
+    if not aiorun(
+        archive_partition(month=month, output_dir=output_dir, detach=detach, drop=drop, batch_size=batch_size)
+    ):
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
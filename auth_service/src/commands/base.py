@@ -1,10 +1,47 @@
-from sqlalchemy.ext.asyncio import create_async_engine
-from src.core.config.base import auth_service_settings
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.core.config import cache_settings, redis_settings
+from src.core.database import create_pg_engine
+from src.core.dependencies import run_after_commit_callbacks
+from src.core.hashing import create_password_hasher
+from src.core.pubsub import RedisSubscriber
+from src.core.user_roles import UserRolesCache
 from src.services import RoleService
 from src.services.role import get_role_service
 from src.services.user import UserService, get_user_service
 
-async_engine = create_async_engine(auth_service_settings.get_dsn())
+async_engine = create_pg_engine()
+async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+password_hasher = create_password_hasher()
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[tuple[UserService, RoleService]]:
+    """Yield services sharing one session, the transaction is committed when the block succeeds.
 
-user_service: UserService = get_user_service(pg_connection=async_engine, redis=None)
-role_service: RoleService = get_role_service(pg_connection=async_engine, redis=None)
+    Role changes invalidate cached roles projections of the service through Redis like the API does.
+    """
+    redis = Redis(**redis_settings.model_dump())
+    # Never started: a command only writes to the cache, with the local LRU bypassed.
+    user_roles_cache = UserRolesCache(
+        redis=redis, subscriber=RedisSubscriber(redis=redis), ttl=cache_settings.user_roles_ttl
+    )
+    try:
+        async with async_session_factory() as session:
+            try:
+                yield (
+                    get_user_service(session=session, redis=redis, password_hasher=password_hasher),
+                    get_role_service(
+                        session=session, redis=redis, role_catalog=None, user_roles_cache=user_roles_cache
+                    ),
+                )
+                await session.commit()
+            except BaseException:
+                await session.rollback()
+                raise
+            await run_after_commit_callbacks(session)
+    finally:
+        await redis.close()
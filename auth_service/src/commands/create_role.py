@@ -2,7 +2,7 @@ from asyncio import run as aiorun
 
 import typer
 from sqlalchemy import exc
-from src.commands.base import role_service
+from src.commands.base import unit_of_work
 from src.models.role import RoleCRUD
 
 
@@ -10,16 +10,16 @@ app = typer.Typer()
 
 
 async def create_role(name: str) -> None:
-    if await role_service.get_by_name(role_name=name):
-        typer.secho(message=f"Role '{name}' already exists", fg=typer.colors.MAGENTA)
-        return
-
-    typer.secho(message=f"Creating role: '{name}' ...", fg=typer.colors.BLUE)
+    try:
+        async with unit_of_work() as (_, role_service):
+            if await role_service.get_by_name(role_name=name):
+                typer.secho(message=f"Role '{name}' already exists", fg=typer.colors.MAGENTA)
+                return
 
-    role_data = RoleCRUD(name=f"{name}")
+            typer.secho(message=f"Creating role: '{name}' ...", fg=typer.colors.BLUE)
 
-    try:
-        await role_service.create(role_data=role_data)
+            role_data = RoleCRUD(name=f"{name}")
+            await role_service.create(role_data=role_data)
     except exc.SQLAlchemyError as e:
         typer.secho(message=f"There is an SQLAlchemyError error: {e}", fg=typer.colors.RED)
     except Exception as e:
@@ -2,7 +2,7 @@ from asyncio import run as aiorun
 
 import typer
 from sqlalchemy import exc
-from src.commands.base import user_service
+from src.commands.base import unit_of_work
 from src.models.user import UserCreate
 
 
@@ -10,17 +10,17 @@ app = typer.Typer()
 
 
 async def create_user(email: str, password: str, first_name: str, last_name: str, access_level: int):
-    if await user_service.get_by_email(user_email=email):
-        typer.secho(message=f"User '{email}' already exists", fg=typer.colors.MAGENTA)
-        return
-
-    typer.secho(message=f"Creating user: '{email}' ...", fg=typer.colors.BLUE)
-    user_create = UserCreate(
-        email=email, password=password, first_name=first_name, last_name=last_name, access_level=access_level
-    )
-
     try:
-        await user_service.create(user_create=user_create)
+        async with unit_of_work() as (user_service, _):
+            if await user_service.get_by_email(user_email=email):
+                typer.secho(message=f"User '{email}' already exists", fg=typer.colors.MAGENTA)
+                return
+
+            typer.secho(message=f"Creating user: '{email}' ...", fg=typer.colors.BLUE)
+            user_create = UserCreate(
+                email=email, password=password, first_name=first_name, last_name=last_name, access_level=access_level
+            )
+            await user_service.create(user_create=user_create)
     except exc.SQLAlchemyError as e:
         typer.secho(message=f"There is an SQLAlchemyError error: {e}", fg=typer.colors.RED)
     except Exception as e:
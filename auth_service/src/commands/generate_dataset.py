@@ -0,0 +1,253 @@
+import asyncio
+import math
+import multiprocessing
+import random
+import time
+import uuid
+from asyncio import run as aiorun
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import typer
+from sqlalchemy import exc, text
+from src.commands.base import async_engine, password_hasher
+from src.core.database import create_pg_engine
+from src.core.partitions import LOGIN_HISTORY_TABLE, add_months, create_month_partition, list_partitions
+
+app = typer.Typer()
+
+USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36",
+    "okhttp/4.12.0",
+)
+# History ends on this day unless --as-of is passed, so a seed always generates the same dataset.
+DEFAULT_AS_OF = datetime(2026, 10, 1)
+# Tables in the order foreign keys need them.
+COLUMNS = {
+    "users": ("id", "email", "password", "first_name", "last_name", "created_at", "access_level"),
+    "users_roles": ("user_id", "role_id"),
+    "oauth_users": ("id", "user_id", "oauth_id", "oauth_name"),
+    LOGIN_HISTORY_TABLE: ("id", "user_id", "user_agent", "ip_address", "login_time"),
+}
+
+
+@dataclass(frozen=True)
+class DatasetOptions:
+    seed: int
+    prefix: str
+    chunk_size: int
+    users: int
+    oauth_fraction: float
+    logins_per_user: float
+    password_hash: str
+    role_ids: tuple[uuid.UUID, ...]
+    # cumulative weights of role popularity, Zipf-like
+    role_weights: tuple[float, ...]
+    start: datetime
+    # cumulative weights of days since start, bursty
+    day_weights: tuple[float, ...]
+
+
+def get_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def get_day_weights(rng: random.Random, days: int) -> list[float]:
+    """Login volume per day: growing over the period, lower at weekends, with rare bursts."""
+    weights, total = [], 0.0
+    for day in range(days):
+        weight = (0.5 + day / days) * rng.lognormvariate(0, 0.3)
+        if day % 7 in (5, 6):
+            weight *= 0.7
+        if rng.random() < 0.03:
+            weight *= rng.uniform(5, 20)
+        total += weight
+        weights.append(total)
+    return weights
+
+
+def generate_chunk(options: DatasetOptions, chunk: int) -> dict[str, list[tuple]]:
+    """Generate rows of users [chunk * chunk_size, (chunk + 1) * chunk_size), the same for the same seed."""
+    rng = random.Random(f"{options.seed}:{chunk}")
+    # Mean of the lognormal is logins_per_user, sigma makes a long tail of power users.
+    sigma = 1.5
+    mu = math.log(options.logins_per_user) - sigma**2 / 2
+    days = len(options.day_weights)
+    rows = {table: [] for table in COLUMNS}
+    for index in range(chunk * options.chunk_size, min((chunk + 1) * options.chunk_size, options.users)):
+        user_id = get_uuid(rng)
+        logins = min(int(rng.lognormvariate(mu, sigma)), int(options.logins_per_user * 100))
+        login_times = sorted(
+            options.start + timedelta(days=day, seconds=rng.randrange(86400))
+            for day in rng.choices(range(days), cum_weights=options.day_weights, k=logins)
+        )
+        created_at = (login_times[0] if login_times else options.start) - timedelta(seconds=rng.randrange(30 * 86400))
+        rows["users"].append(
+            (
+                user_id,
+                f"{options.prefix}_{index}@example.com",
+                options.password_hash,
+                f"first_{index}",
+                f"last_{index}",
+                created_at,
+                rng.choices((0, 1, 3, 5), weights=(80, 15, 4, 1))[0],
+            )
+        )
+        role_count = rng.choices((0, 1, 2, 3), weights=(30, 50, 15, 5))[0]
+        for role_id in set(rng.choices(options.role_ids, cum_weights=options.role_weights, k=role_count)):
+            rows["users_roles"].append((user_id, role_id))
+        if rng.random() < options.oauth_fraction:
+            rows["oauth_users"].append((get_uuid(rng), user_id, str(rng.getrandbits(64)), "yandex"))
+        user_agent = rng.choice(USER_AGENTS)
+        for login_time in login_times:
+            if rng.random() < 0.1:
+                user_agent = rng.choice(USER_AGENTS)
+            ip_address = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+            rows[LOGIN_HISTORY_TABLE].append((get_uuid(rng), user_id, user_agent, ip_address, login_time))
+    return rows
+
+
+async def load_chunk(options: DatasetOptions, chunk: int) -> dict[str, int]:
+    rows = generate_chunk(options, chunk)
+    engine = create_pg_engine()
+    try:
+        async with engine.connect() as connection:
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+            async with driver_connection.transaction():
+                for table, columns in COLUMNS.items():
+                    await driver_connection.copy_records_to_table(table, records=rows[table], columns=columns)
+    finally:
+        await engine.dispose()
+    return {table: len(records) for table, records in rows.items()}
+
+
+def run_chunk(options: DatasetOptions, chunk: int) -> dict[str, int]:
+    """Generate and COPY one chunk in a worker process."""
+    return aiorun(load_chunk(options, chunk))
+
+
+async def prepare(seed: int, prefix: str, roles: int, months: int, as_of: date) -> tuple[datetime, list[uuid.UUID]]:
+    """Create roles and missing monthly partitions, return the start of the history and role ids."""
+    start_month = add_months(as_of.replace(day=1), -(months - 1))
+    async with async_engine.connect() as connection:
+        partitions = await list_partitions(connection, LOGIN_HISTORY_TABLE)
+    existing_months = {partition.month for partition in partitions}
+    has_default = any(partition.is_default for partition in partitions)
+    for offset in range(months):
+        month = add_months(start_month, offset)
+        if month not in existing_months:
+            await create_month_partition(async_engine, LOGIN_HISTORY_TABLE, month, has_default)
+
+    rng = random.Random(f"{seed}:roles")
+    role_names = [f"{prefix}_role_{index}" for index in range(roles)]
+    async with async_engine.begin() as connection:
+        if (
+            await connection.execute(
+                text("SELECT 1 FROM users WHERE lower(email) = :email"), {"email": f"{prefix}_0@example.com"}
+            )
+        ).scalar():
+            raise ValueError(f"Users with prefix '{prefix}' already exist, pass another --prefix")
+        for name in role_names:
+            await connection.execute(
+                text("INSERT INTO roles (id, name) VALUES (:id, :name) ON CONFLICT (name) DO NOTHING"),
+                {"id": get_uuid(rng), "name": name},
+            )
+        role_ids = dict(
+            (
+                await connection.execute(
+                    text("SELECT name, id FROM roles WHERE name = ANY(:names)"), {"names": role_names}
+                )
+            ).all()
+        )
+    return datetime.combine(start_month, datetime.min.time()), [role_ids[name] for name in role_names]
+
+
+async def generate_dataset(
+    seed: int,
+    prefix: str,
+    users: int,
+    roles: int,
+    oauth_fraction: float,
+    months: int,
+    as_of: date,
+    logins_per_user: float,
+    password: str,
+    chunk_size: int,
+    workers: int,
+) -> None:
+    started = time.perf_counter()
+    start, role_ids = await prepare(seed=seed, prefix=prefix, roles=roles, months=months, as_of=as_of)
+    options = DatasetOptions(
+        seed=seed,
+        prefix=prefix,
+        chunk_size=chunk_size,
+        users=users,
+        oauth_fraction=oauth_fraction,
+        logins_per_user=logins_per_user,
+        # Hashed once, hashing millions of passwords would take longer than the rest.
+        password_hash=await password_hasher.hash(password),
+        role_ids=tuple(role_ids),
+        role_weights=tuple(sum(1 / rank for rank in range(1, index + 2)) for index in range(roles)),
+        start=start,
+        day_weights=tuple(get_day_weights(random.Random(f"{seed}:days"), (as_of - start.date()).days + 1)),
+    )
+
+    chunks = math.ceil(users / chunk_size)
+    totals = dict.fromkeys(COLUMNS, 0)
+    loop = asyncio.get_running_loop()
+    # Fresh processes, not forks holding connections of the parent's pool.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        tasks = [loop.run_in_executor(executor, run_chunk, options, chunk) for chunk in range(chunks)]
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            for table, count in (await task).items():
+                totals[table] += count
+            typer.echo(f"{done}/{chunks} chunks, {totals[LOGIN_HISTORY_TABLE]} login history rows")
+
+    async with async_engine.begin() as connection:
+        await connection.execute(text(f"ANALYZE roles, {', '.join(COLUMNS)}"))
+    loaded = ", ".join(f"{count} {table}" for table, count in totals.items())
+    typer.secho(message=f"{loaded} loaded in {time.perf_counter() - started:.0f}s", fg=typer.colors.GREEN)
+
+
+@app.command()
+def main(
+    users: int = typer.Option(1_000_000, help="Users to generate"),
+    roles: int = typer.Option(20, help="Roles to create, assigned with Zipf-like popularity"),
+    oauth_fraction: float = typer.Option(0.3, help="Share of users with an OAuth account"),
+    months: int = typer.Option(24, help="Months of login history up to --as-of"),
+    as_of: datetime = typer.Option(DEFAULT_AS_OF, formats=["%Y-%m-%d"], help="Last day of the login history"),
+    logins_per_user: float = typer.Option(20, help="Mean logins per user, the distribution has a long tail"),
+    seed: int = typer.Option(42, help="The same seed generates the same dataset"),
+    prefix: str = typer.Option("synthetic", help="Prefix of generated emails and role names"),
+    password: str = typer.Option("synthetic_password", help="Password of every generated user"),
+    chunk_size: int = typer.Option(10_000, help="Users generated and copied in one transaction"),
+    workers: int = typer.Option(4, help="Processes generating and copying chunks in parallel"),
+):
+    try:
+        aiorun(
+            generate_dataset(
+                seed=seed,
+                prefix=prefix,
+                users=users,
+                roles=roles,
+                oauth_fraction=oauth_fraction,
+                months=months,
+                as_of=as_of.date(),
+                logins_per_user=logins_per_user,
+                password=password,
+                chunk_size=chunk_size,
+                workers=workers,
+            )
+        )
+    except exc.SQLAlchemyError as e:
+        typer.secho(message=f"There is an SQLAlchemyError error: {e}", fg=typer.colors.RED)
+    except Exception as e:
+        typer.secho(message=f"There is an error: {e}", fg=typer.colors.RED)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,58 @@
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import typer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from src.core.signing import SIGNING_ALGORITHMS
+
+app = typer.Typer()
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    return ed25519.Ed25519PrivateKey.generate()
+
+
+@app.command()
+def main(
+    key_ring: Path = typer.Option(..., help="Key ring file, created if it does not exist"),
+    algorithm: str = typer.Option("ES256", help=f"One of {', '.join(SIGNING_ALGORITHMS)}"),
+    active_in: int = typer.Option(
+        86400, help="Seconds until the key starts signing, at least AUTHJWT_KEY_PUBLISH_AHEAD plus JWKS max age"
+    ),
+):
+    if algorithm not in SIGNING_ALGORITHMS:
+        typer.secho(message=f"Algorithm must be one of {SIGNING_ALGORITHMS}", fg=typer.colors.RED)
+        return
+
+    active_from = (datetime.utcnow() + timedelta(seconds=active_in)).replace(microsecond=0)
+    kid = f"{algorithm.lower()}-{active_from:%Y%m%d%H%M%S}"
+    config = json.loads(key_ring.read_text()) if key_ring.exists() else {"keys": []}
+    if any(key["kid"] == kid for key in config["keys"]):
+        typer.secho(message=f"Key '{kid}' already exists", fg=typer.colors.MAGENTA)
+        return
+
+    pem = generate_private_key(algorithm).private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    key_path = key_ring.parent / f"{kid}.pem"
+    key_ring.parent.mkdir(parents=True, exist_ok=True)
+    # Readable by the service user only.
+    with os.fdopen(os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as file:
+        file.write(pem)
+
+    config["keys"].append({"kid": kid, "alg": algorithm, "file": key_path.name, "active_from": active_from.isoformat()})
+    key_ring.write_text(json.dumps(config, indent=2))
+    typer.secho(message=f"Key '{kid}' signs tokens from {active_from.isoformat()} UTC.", fg=typer.colors.GREEN)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,134 @@
+import asyncio
+import zlib
+from asyncio import run as aiorun
+from datetime import datetime
+
+import typer
+from sqlalchemy import exc, text
+from src.commands.base import async_engine
+from src.core.partitions import (
+    LOGIN_HISTORY_TABLE,
+    Partition,
+    add_months,
+    advisory_lock,
+    create_default_partition,
+    create_month_partition,
+    detach_partition,
+    get_partition_name,
+    list_partitions,
+)
+
+app = typer.Typer()
+
+# One maintenance run at a time across all nodes.
+PARTITIONS_LOCK_KEY = zlib.crc32(f"{LOGIN_HISTORY_TABLE}:partitions".encode())
+
+
+def print_report(partitions: list[Partition]) -> None:
+    typer.secho(f"{'partition':<36}{'rows':>14}{'size, MB':>12}", fg=typer.colors.BLUE)
+    for partition in partitions:
+        typer.echo(f"{partition.name:<36}{partition.rows:>14}{partition.size / 2**20:>12.1f}")
+    typer.echo(
+        f"{f'{len(partitions)} partitions':<36}{sum(p.rows for p in partitions):>14}"
+        f"{sum(p.size for p in partitions) / 2**20:>12.1f}"
+    )
+
+
+async def manage_partitions(
+    future_months: int,
+    retention_months: int,
+    default_partition: bool,
+    drop: bool,
+    report: bool,
+    table: str = LOGIN_HISTORY_TABLE,
+) -> None:
+    async with async_engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        async with advisory_lock(connection, PARTITIONS_LOCK_KEY) as locked:
+            if not locked:
+                typer.secho(message="Partitions are being maintained by another node", fg=typer.colors.MAGENTA)
+                return
+
+            partitions = await list_partitions(connection, table)
+            has_default = any(partition.is_default for partition in partitions)
+            if default_partition and not has_default:
+                typer.secho(message="Creating DEFAULT partition ...", fg=typer.colors.BLUE)
+                await create_default_partition(async_engine, table)
+                has_default = True
+
+            current_month = datetime.utcnow().date().replace(day=1)
+            existing_months = {partition.month for partition in partitions}
+            for offset in range(future_months + 1):
+                month = add_months(current_month, offset)
+                if month in existing_months:
+                    continue
+                moved = await create_month_partition(async_engine, table, month, has_default)
+                typer.secho(
+                    message=f"Partition '{get_partition_name(table, month)}' created, {moved} rows moved",
+                    fg=typer.colors.GREEN,
+                )
+
+            if retention_months:
+                oldest_month = add_months(current_month, -retention_months)
+                for partition in partitions:
+                    if not partition.month or partition.month >= oldest_month:
+                        continue
+                    await detach_partition(connection, table, partition, concurrently=not has_default)
+                    if drop:
+                        await connection.execute(text(f"DROP TABLE {partition.name}"))
+                    typer.secho(
+                        message=f"Partition '{partition.name}' {'dropped' if drop else 'detached'}",
+                        fg=typer.colors.GREEN,
+                    )
+
+            if report:
+                print_report(await list_partitions(connection, table))
+
+
+async def run(
+    future_months: int, retention_months: int, default_partition: bool, drop: bool, report: bool, interval: int
+) -> None:
+    while True:
+        try:
+            await manage_partitions(
+                future_months=future_months,
+                retention_months=retention_months,
+                default_partition=default_partition,
+                drop=drop,
+                report=report,
+            )
+        except exc.SQLAlchemyError as e:
+            typer.secho(message=f"There is an SQLAlchemyError error: {e}", fg=typer.colors.RED)
+        except Exception as e:
+            typer.secho(message=f"There is an error: {e}", fg=typer.colors.RED)
+
+        if not interval:
+            return
+        await asyncio.sleep(interval)
+
+
+@app.command()
+def main(
+    future_months: int = typer.Option(3, help="Months ahead of the current one to keep partitions for"),
+    retention_months: int = typer.Option(0, help="Detach partitions older than this many months, 0 keeps all"),
+    default_partition: bool = typer.Option(
+        True, help="Keep a DEFAULT partition for rows outside of monthly ones, prevents concurrent detach"
+    ),
+    drop: bool = typer.Option(True, help="Drop detached partitions, --no-drop keeps them for archiving"),
+    report: bool = typer.Option(False, help="Print partition rows and sizes"),
+    interval: int = typer.Option(0, help="Repeat every this many seconds, 0 runs once"),
+):
+    aiorun(
+        run(
+            future_months=future_months,
+            retention_months=retention_months,
+            default_partition=default_partition,
+            drop=drop,
+            report=report,
+            interval=interval,
+        )
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
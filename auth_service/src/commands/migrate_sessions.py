@@ -0,0 +1,52 @@
+from asyncio import run as aiorun
+
+import typer
+from redis.asyncio import Redis
+from src.core.config.base import redis_settings
+from src.services.redis import RedisService
+
+app = typer.Typer()
+
+MIGRATION_MARKER_KEY = "auth:migrations:sessions_index"
+LEGACY_TOKEN_NAMES = ("access_token", "refresh_token")
+
+
+async def migrate_sessions(batch_size: int) -> None:
+    """Move legacy "{email}:{token_name}:{token}" keys into the per-user session index, once."""
+    redis = Redis(**redis_settings.model_dump())
+    redis_service = RedisService(redis=redis)
+    migrated = 0
+    try:
+        if await redis.exists(MIGRATION_MARKER_KEY):
+            typer.secho(message="Sessions have already been migrated", fg=typer.colors.MAGENTA)
+            return
+
+        typer.secho(message="Migrating sessions ...", fg=typer.colors.BLUE)
+        for token_name in LEGACY_TOKEN_NAMES:
+            async for key in redis.scan_iter(match=f"*:{token_name}:*", count=batch_size):
+                email, _, token = key.decode().partition(f":{token_name}:")
+                async with redis.pipeline(transaction=False) as p:
+                    await p.time()
+                    await p.ttl(key)
+                    (seconds, _), ttl = await p.execute()
+                if ttl > 0:
+                    await redis_service.add_sessions(email=email, sessions={f"{token_name}:{token}": seconds + ttl})
+                    migrated += 1
+                await redis.delete(key)
+
+        await redis.set(MIGRATION_MARKER_KEY, migrated)
+    except Exception as e:
+        typer.secho(message=f"There is an error: {e}", fg=typer.colors.RED)
+    else:
+        typer.secho(message=f"{migrated} sessions migrated.", fg=typer.colors.GREEN)
+    finally:
+        await redis.aclose()
+
+
+@app.command()
+def main(batch_size: int = typer.Option(1000, help="SCAN batch size")):
+    aiorun(migrate_sessions(batch_size=batch_size))
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,80 @@
+import gzip
+import json
+from asyncio import run as aiorun
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+import typer
+from sqlalchemy import exc, text
+from src.commands.archive_partition import ARCHIVE_FORMAT, get_sha256
+from src.commands.base import async_engine
+from src.core.partitions import LOCK_TIMEOUT, attach_partition, is_partition_attached
+
+app = typer.Typer()
+
+
+def read_batches(path: Path, batch_size: int) -> Iterator[list[str]]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        batch = []
+        for line in file:
+            batch.append(line.rstrip("\n"))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+async def restore_partition(manifest_path: Path, batch_size: int) -> bool:
+    """Restore and attach the archived partition, return whether it succeeded."""
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["format"] != ARCHIVE_FORMAT:
+            typer.secho(message=f"Unsupported archive format '{manifest['format']}'", fg=typer.colors.RED)
+            return False
+        data_path = manifest_path.parent / manifest["file"]
+        if get_sha256(data_path) != manifest["sha256"]:
+            typer.secho(message=f"Checksum of '{data_path}' does not match the manifest", fg=typer.colors.RED)
+            return False
+
+        table, name, month = manifest["table"], manifest["partition"], date.fromisoformat(manifest["month"])
+        typer.secho(message=f"Restoring partition '{name}' from '{data_path}' ...", fg=typer.colors.BLUE)
+        # Load and attach in one transaction, a failed restore leaves nothing behind.
+        async with async_engine.begin() as connection:
+            if await is_partition_attached(connection, name) is not None:
+                typer.secho(message=f"Table '{name}' already exists", fg=typer.colors.RED)
+                return False
+            await connection.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            await connection.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING ALL)"))
+            for batch in read_batches(data_path, batch_size):
+                await connection.execute(
+                    text(f"INSERT INTO {name} SELECT * FROM json_populate_recordset(NULL::{table}, :rows)"),
+                    {"rows": f"[{','.join(batch)}]"},
+                )
+            rows = (await connection.execute(text(f"SELECT count(*) FROM {name}"))).scalar()
+            if rows != manifest["rows"]:
+                raise ValueError(f"{rows} rows restored, {manifest['rows']} expected")
+            await attach_partition(connection, table, name, month)
+    except exc.SQLAlchemyError as e:
+        typer.secho(message=f"There is an SQLAlchemyError error: {e}", fg=typer.colors.RED)
+        return False
+    except Exception as e:
+        typer.secho(message=f"There is an error: {e}", fg=typer.colors.RED)
+        return False
+
+    typer.secho(message=f"Partition '{name}' restored and attached, {rows} rows.", fg=typer.colors.GREEN)
+    return True
+
+
+@app.command()
+def main(
+    manifest: Path = typer.Option(..., help="Manifest written by archive_partition.py"),
+    batch_size: int = typer.Option(10_000, help="Rows inserted per statement"),
+):
+    if not aiorun(restore_partition(manifest_path=manifest, batch_size=batch_size)):
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,6 +1,8 @@
 from .base import (  # noqa
     auth_service_settings,  # noqa
     redis_settings,  # noqa
+    cache_settings,  # noqa
+    rate_limit_settings,  # noqa
     base_auth_jwt_settings,  # noqa
 )
 
@@ -1,5 +1,8 @@
+from datetime import datetime, timedelta
+from typing import Literal
+
 from async_fastapi_jwt_auth import AuthJWT
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -25,11 +28,53 @@ class AuthServiceSettings(BaseSettings):
     db_user: str
     db_password: str
     db_name: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    # milliseconds, 0 disables the timeout
+    db_statement_timeout: int = 0
+
+    hash_executor: Literal["process", "thread"] = "process"
+    hash_workers: int = 2
+    hash_max_concurrency: int = 2
+    hash_max_queue_depth: int = 64
+    # werkzeug method string: "scrypt:<n>:<r>:<p>" or "pbkdf2:<hash>:<iterations>"
+    hash_method: str = "scrypt:32768:8:1"
+    hash_salt_length: int = 16
+
+    login_history_queue_size: int = 10_000
+    login_history_batch_size: int = 500
+    # milliseconds
+    login_history_flush_interval: int = 200
+
+    @field_validator("hash_method")
+    @classmethod
+    def validate_hash_method(cls, value: str) -> str:
+        if value.split(":", 1)[0] not in ("scrypt", "pbkdf2"):
+            raise ValueError("Hash method must be scrypt or pbkdf2")
+        return value
 
     def get_dsn(self):
         """Get dsn to connect to postgres"""
         return f"postgresql+asyncpg://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
 
+    def get_engine_options(self) -> dict:
+        """Get connection pool and asyncpg options for create_async_engine"""
+        return {
+            "pool_size": self.db_pool_size,
+            "max_overflow": self.db_max_overflow,
+            "pool_timeout": self.db_pool_timeout,
+            "pool_recycle": self.db_pool_recycle,
+            "pool_pre_ping": self.db_pool_pre_ping,
+            "connect_args": {
+                "statement_cache_size": self.db_statement_cache_size,
+                "server_settings": {"statement_timeout": str(self.db_statement_timeout)},
+            },
+        }
+
 
 class RedisSettings(BaseSettings):
     """Redis settings class."""
@@ -44,6 +89,60 @@ class RedisSettings(BaseSettings):
     port: int
 
 
+class CacheSettings(BaseSettings):
+    """In-process caches settings class."""
+
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_prefix="cache_",
+        env_file_encoding="utf-8",
+        env_file=".env",
+    )
+    denylist_size: int = 100_000
+    # seconds between role catalog reloads, picks up changes made without publishing them
+    role_catalog_reload_interval: float = 30.0
+    user_roles_size: int = 100_000
+    # seconds a user's roles projection is kept in Redis
+    user_roles_ttl: int = 300
+
+
+class RateLimitPolicy(BaseModel):
+    """Allow ``limit`` requests per ``period`` seconds for every ``key`` (user, ip or client)."""
+
+    limit: int
+    period: int
+    key: Literal["user", "ip", "client"] = "user"
+
+
+class RateLimitSettings(BaseSettings):
+    """Rate limit settings class."""
+
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_prefix="rate_limit_",
+        env_file_encoding="utf-8",
+        env_file=".env",
+    )
+    enable: bool = True
+    default: RateLimitPolicy = RateLimitPolicy(limit=100, period=60)
+    # "<METHOD> <path>" to policy, the path may contain * wildcards, null disables the limit for the route
+    routes: dict[str, RateLimitPolicy | None] = {
+        "POST /api/v1/auth/login": RateLimitPolicy(limit=10, period=60, key="ip"),
+        "POST /api/v1/users/signup": RateLimitPolicy(limit=5, period=60, key="ip"),
+        "GET /internal/*": None,
+        "POST /internal/introspect": None,
+        # nginx auth_request subrequests, a 429 would turn into a 500 of the gated request
+        "GET /api/v1/auth/verify": None,
+    }
+    client_header: str = "X-Client-Id"
+    # Leasing: a worker takes up to lease_size tokens per Redis call and spends them locally for lease_ttl seconds.
+    # 0 checks every request in Redis. Leases are capped by lease_max_fraction of the policy limit.
+    lease_size: int = 0
+    lease_ttl: float = 1.0
+    lease_max_fraction: float = 0.1
+    lease_max_keys: int = 10_000
+
+
 class BaseAuthJWTSettings(BaseSettings):
     """BaseAuthJWT settings class."""
 
@@ -58,10 +157,25 @@ class BaseAuthJWTSettings(BaseSettings):
     secret_key: str
     token_location: str
     cookie_csrf_protect: bool
+    # JSON file of asymmetric signing keys, tokens are signed with the shared secret_key when it is not set
+    key_ring_file: str | None = None
+    # seconds a key is published in the JWKS before it starts signing tokens
+    key_publish_ahead: int = 86400
+    # tokens without "kid" signed with secret_key are accepted next to the key ring, turn off once they expired
+    accept_legacy_tokens: bool = True
+    # naive UTC, only tokens without "kid" issued before it are accepted, when the first key became active if unset
+    legacy_tokens_issued_before: datetime | None = None
+    jwks_max_age: int = 300
+    # seconds an introspection answer may be cached for at most, a revocation is seen after it expires
+    introspect_max_age: int = 3600
+    # seconds nginx may cache an auth_request answer, a revocation is seen after it expires
+    verify_max_age: int = 10
 
 
 auth_service_settings = AuthServiceSettings()
 redis_settings = RedisSettings()
+cache_settings = CacheSettings()
+rate_limit_settings = RateLimitSettings()
 base_auth_jwt_settings = BaseAuthJWTSettings()
 
 
@@ -72,6 +186,8 @@ class AuthJWTSettings(BaseModel):
     authjwt_secret_key: str = base_auth_jwt_settings.secret_key
     authjwt_token_location: set = {base_auth_jwt_settings.token_location}
     authjwt_cookie_csrf_protect: bool = base_auth_jwt_settings.cookie_csrf_protect
+    # Redis sessions are scored by the "exp" of refresh tokens, the lifetime is set here so the two cannot drift.
+    authjwt_refresh_token_expires: timedelta = timedelta(seconds=base_auth_jwt_settings.refresh_expires_time)
     authjwt_denylist_enabled: bool = True
     authjwt_denylist_token_checks: set = {"access", "refresh"}
 
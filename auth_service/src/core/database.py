@@ -0,0 +1,40 @@
+import time
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.core.config import auth_service_settings
+from src.core.metrics import metrics
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long every checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe("db_pool_checkout_wait_seconds", time.perf_counter() - started)
+
+
+def create_pg_engine() -> AsyncEngine:
+    """Create AsyncEngine with the pool configured by AuthServiceSettings."""
+    return create_async_engine(
+        auth_service_settings.get_dsn(),
+        poolclass=InstrumentedAsyncQueuePool,
+        **auth_service_settings.get_engine_options(),
+    )
+
+
+def get_pool_stats(engine: AsyncEngine) -> dict:
+    """Get connection counters of the engine pool in the current worker."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # negative while the pool has not opened pool_size connections yet
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": auth_service_settings.db_max_overflow,
+    }
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+
+from redis.asyncio import Redis
+
+from src.core.metrics import metrics
+from src.core.pubsub import RedisSubscriber
+
+REVOKED_TOKENS_CHANNEL = "auth:revoked_tokens"
+TOKEN_EPOCHS_CHANNEL = "auth:token_epochs"
+
+
+def get_revoke_key(email: str, token_name: str, jti: str) -> str:
+    """Get Redis key that marks a token as revoked."""
+    return f"{email}:revoke:{token_name}:{jti}"
+
+
+def get_epoch_key(email: str) -> str:
+    """Get Redis key with the user's token epoch."""
+    return f"{email}:epoch"
+
+
+class DenylistCache:
+    """Per-worker LRU of denylist lookups kept in sync through Redis pub/sub.
+
+    Two kinds of entries are cached: the user's token epoch (tokens issued with a lower "epoch" claim are revoked)
+    and per-jti revocation flags. Both only ever grow, so cached answers only go stale when a message is missed:
+    the cache is bypassed while the subscriber is disconnected and dropped on every resubscription.
+    """
+
+    def __init__(self, redis: Redis, subscriber: RedisSubscriber, max_size: int = 100_000) -> None:
+        self._redis = redis
+        self._subscriber = subscriber
+        self._max_size = max_size
+        self._entries: OrderedDict[str, int | bool] = OrderedDict()
+        # Bumped on every resync, so a lookup that raced with it does not store its result.
+        self._generation = 0
+
+        subscriber.subscribe(REVOKED_TOKENS_CHANNEL, self._on_revoked)
+        subscriber.subscribe(TOKEN_EPOCHS_CHANNEL, self._on_epoch)
+        subscriber.on_resync(self.clear)
+        metrics.register_gauge("denylist_cache_size", lambda: len(self._entries))
+
+    async def is_token_revoked(self, decrypted_token: dict) -> bool:
+        return (await self.are_tokens_revoked([decrypted_token]))[0]
+
+    async def are_tokens_revoked(self, decrypted_tokens: list[dict]) -> list[bool]:
+        """Check many tokens at once, keys missing in the local cache are read with a single MGET."""
+        epoch_keys = [get_epoch_key(token["sub"]) for token in decrypted_tokens]
+        revoke_keys = [
+            get_revoke_key(email=token["sub"], token_name=token["type"], jti=token["jti"]) for token in decrypted_tokens
+        ]
+        values = await self._lookup(epoch_keys, revoke_keys)
+        # Tokens issued before the epoch was introduced carry no claim and belong to epoch 0.
+        return [
+            values[revoke_key] or token.get("epoch", 0) < values[epoch_key]
+            for token, epoch_key, revoke_key in zip(decrypted_tokens, epoch_keys, revoke_keys)
+        ]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generation += 1
+
+    async def _lookup(self, epoch_keys: list[str], revoke_keys: list[str]) -> dict[str, int | bool]:
+        values = {}
+        if self._subscriber.connected:
+            for key in (*epoch_keys, *revoke_keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    values[key] = self._entries[key]
+        missing_epoch_keys = [key for key in dict.fromkeys(epoch_keys) if key not in values]
+        missing_revoke_keys = [key for key in dict.fromkeys(revoke_keys) if key not in values]
+        if not missing_epoch_keys and not missing_revoke_keys:
+            metrics.inc("denylist_cache_hits_total")
+            return values
+
+        metrics.inc("denylist_cache_misses_total")
+        generation = self._generation
+        raw_values = await self._redis.mget(*missing_epoch_keys, *missing_revoke_keys)
+        epoch_count = len(missing_epoch_keys)
+        fetched = {
+            **{key: int(raw or 0) for key, raw in zip(missing_epoch_keys, raw_values[:epoch_count])},
+            **{key: raw is not None for key, raw in zip(missing_revoke_keys, raw_values[epoch_count:])},
+        }
+        cache = self._subscriber.connected and generation == self._generation
+        for key, value in fetched.items():
+            values[key] = self._store(key, value) if cache else value
+        return values
+
+    def _on_revoked(self, key: str) -> None:
+        self._store(key, True)
+
+    def _on_epoch(self, data: str) -> None:
+        epoch, key = data.split(" ", 1)
+        self._store(key, int(epoch))
+
+    def _store(self, key: str, value: int | bool) -> int | bool:
+        # A newer value could have arrived while we were waiting for Redis, never overwrite it with an older one.
+        value = max(value, self._entries.get(key, value))
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return value
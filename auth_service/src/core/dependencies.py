@@ -1,16 +1,131 @@
+import inspect
+from typing import Any, AsyncIterator, Awaitable, Callable
+
 from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from src.core.denylist import DenylistCache
+from src.core.hashing import PasswordHasher
+from src.core.login_history import LoginHistoryWriter
+from src.core.pubsub import RedisSubscriber
+from src.core.rate_limit import RateLimiter
+from src.core.role_catalog import RoleCatalog
+from src.core.signing import KeyRing
+from src.core.token_issuer import TokenIssuer
+from src.core.user_roles import UserRolesCache
 
 async_pg_engine: AsyncEngine | None = None
 
+async_session_factory: async_sessionmaker[AsyncSession] | None = None
+
 redis: Redis | None = None
 
+redis_subscriber: RedisSubscriber | None = None
+
+denylist_cache: DenylistCache | None = None
+
+password_hasher: PasswordHasher | None = None
+
+rate_limiter: RateLimiter | None = None
+
+login_history_writer: LoginHistoryWriter | None = None
+
+role_catalog: RoleCatalog | None = None
+
+user_roles_cache: UserRolesCache | None = None
+
+key_ring: KeyRing | None = None
+
+token_issuer: TokenIssuer | None = None
+
+AFTER_COMMIT_CALLBACKS = "after_commit_callbacks"
+
 
 async def get_pg_connection() -> AsyncEngine | None:
     """Return AsyncEngine engine instance."""
     return async_pg_engine
 
 
+async def get_db_session() -> AsyncIterator[AsyncSession]:
+    """Yield one AsyncSession shared by all services of a request.
+
+    The transaction is committed once when the endpoint returns and rolled back if it raises.
+    A service may end its read-only beginning early with release_connection.
+    """
+    async with async_session_factory() as session:
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        await run_after_commit_callbacks(session)
+
+
+async def release_connection(session: AsyncSession) -> None:
+    """End the read-only transaction of session and return its connection to the pool.
+
+    Call it before slow work that does not need the database, e.g. password hashing, so requests waiting
+    for the CPU do not exhaust the pool. The next statement begins a new transaction.
+    """
+    if session.new or session.dirty or session.deleted:
+        raise RuntimeError("Can't release the connection of a session with pending changes")
+    if session.in_transaction():
+        await session.commit()
+
+
+async def run_after_commit_callbacks(session: AsyncSession) -> None:
+    """Run callbacks registered with call_after_commit, once the transaction of session is committed."""
+    for callback in session.info.pop(AFTER_COMMIT_CALLBACKS, []):
+        result = callback()
+        if inspect.isawaitable(result):
+            await result
+
+
+def call_after_commit(session: AsyncSession, callback: Callable[[], Awaitable[Any] | Any]) -> None:
+    """Call callback once the request transaction of session is committed, never if it is rolled back."""
+    session.info.setdefault(AFTER_COMMIT_CALLBACKS, []).append(callback)
+
+
 async def get_redis() -> Redis | None:
     """Return async Redis instance."""
     return redis
+
+
+async def get_password_hasher() -> PasswordHasher | None:
+    """Return PasswordHasher instance."""
+    return password_hasher
+
+
+async def get_denylist_cache() -> DenylistCache | None:
+    """Return DenylistCache instance."""
+    return denylist_cache
+
+
+async def get_rate_limiter() -> RateLimiter | None:
+    """Return RateLimiter instance, None when rate limiting is disabled."""
+    return rate_limiter
+
+
+async def get_login_history_writer() -> LoginHistoryWriter | None:
+    """Return LoginHistoryWriter instance."""
+    return login_history_writer
+
+
+async def get_role_catalog() -> RoleCatalog | None:
+    """Return RoleCatalog instance."""
+    return role_catalog
+
+
+async def get_user_roles_cache() -> UserRolesCache | None:
+    """Return UserRolesCache instance."""
+    return user_roles_cache
+
+
+async def get_key_ring() -> KeyRing | None:
+    """Return KeyRing instance, None when tokens are signed with the shared secret."""
+    return key_ring
+
+
+async def get_token_issuer() -> TokenIssuer | None:
+    """Return TokenIssuer instance."""
+    return token_issuer
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from src.core.config import auth_service_settings
+from src.core.metrics import metrics
+
+
+class PasswordHasherOverloadedError(Exception):
+    """Raised when too many hashing jobs are already waiting for a worker."""
+
+
+def _timed(func: Callable, *args: Any) -> tuple[Any, float]:
+    """Run func in the worker and return its result with the pure CPU time spent."""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """Password hashing in a bounded worker pool, off the event loop.
+
+    At most ``max_concurrency`` hashes run at once, at most ``max_queue_depth`` jobs wait for a slot,
+    everything above that is rejected with PasswordHasherOverloadedError (503 for the client).
+    New hashes are produced with the configured policy (werkzeug ``method`` and ``salt_length``),
+    hashes made with any other policy are reported by ``needs_rehash``.
+    """
+
+    def __init__(
+        self,
+        executor: str = "process",
+        max_workers: int = 2,
+        max_concurrency: int = 2,
+        max_queue_depth: int = 64,
+        method: str = "scrypt",
+        salt_length: int = 16,
+    ) -> None:
+        self.method = self._normalize_method(method)
+        self.salt_length = salt_length
+        self._executor = self._create_executor(executor=executor, max_workers=max_workers)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_queue_depth = max_queue_depth
+        self._waiting = 0
+
+        metrics.register_gauge("password_hash_queue_depth", lambda: self._waiting)
+
+    @staticmethod
+    def _create_executor(executor: str, max_workers: int) -> Executor:
+        if executor == "process":
+            return ProcessPoolExecutor(max_workers=max_workers)
+        if executor == "thread":
+            return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        raise ValueError(f"Unsupported hash executor: {executor}")
+
+    @staticmethod
+    def _normalize_method(method: str) -> str:
+        """Expand werkzeug defaults, e.g. "pbkdf2" -> "pbkdf2:sha256:600000", as they are stored in hashes."""
+        return generate_password_hash("", method=method, salt_length=1).split("$", 1)[0]
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Check whether password_hash was made with a policy other than the current one."""
+        method, _, rest = password_hash.partition("$")
+        salt = rest.partition("$")[0]
+        return method != self.method or len(salt) != self.salt_length
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        return await self._run(check_password_hash, password_hash, password)
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        if self._waiting >= self._max_queue_depth:
+            metrics.inc("password_hash_rejected_total")
+            raise PasswordHasherOverloadedError("Password hashing queue is full")
+
+        enqueued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        try:
+            result, hash_time = await asyncio.get_running_loop().run_in_executor(self._executor, _timed, func, *args)
+        finally:
+            self._semaphore.release()
+
+        metrics.observe("password_hash_seconds", hash_time)
+        metrics.observe("password_hash_queue_wait_seconds", time.perf_counter() - enqueued_at - hash_time)
+        return result
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def create_password_hasher() -> PasswordHasher:
+    """Create PasswordHasher configured by AuthServiceSettings."""
+    return PasswordHasher(
+        executor=auth_service_settings.hash_executor,
+        max_workers=auth_service_settings.hash_workers,
+        max_concurrency=auth_service_settings.hash_max_concurrency,
+        max_queue_depth=auth_service_settings.hash_max_queue_depth,
+        method=auth_service_settings.hash_method,
+        salt_length=auth_service_settings.hash_salt_length,
+    )
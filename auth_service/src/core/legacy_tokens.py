@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import jwt
+
+# Tokens issued before the key ring carry no "kid" and are signed with the shared secret.
+LEGACY_ALGORITHM = "HS256"
+
+
+def decode_legacy_token(
+    token: str,
+    secret: str,
+    issued_before: datetime,
+    max_token_lifetime: int,
+    now: datetime | None = None,
+    **options: Any,
+) -> dict:
+    """Verify a token signed with the shared secret before the key ring, raise jwt.InvalidTokenError if it is not.
+
+    Only tokens issued before ``issued_before`` (naive UTC) and not older than ``max_token_lifetime`` seconds
+    are accepted, so whatever "exp" a token carries, none is accepted later than ``max_token_lifetime`` after
+    the cutoff.
+    """
+    jwt_options = options.pop("options", None) or {}
+    jwt_options = {**jwt_options, "require": [*jwt_options.get("require", []), "iat"]}
+    claims = jwt.decode(token, secret, algorithms=[LEGACY_ALGORITHM], options=jwt_options, **options)
+
+    issued_at = datetime.utcfromtimestamp(claims["iat"])
+    if issued_at >= issued_before:
+        raise jwt.InvalidTokenError("Tokens without key id issued after {} are not accepted".format(issued_before))
+    if issued_at + timedelta(seconds=max_token_lifetime) <= (now or datetime.utcnow()):
+        raise jwt.InvalidTokenError("Token without key id has outlived the longest token lifetime")
+    return claims
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import auth_service_settings
+from src.core.metrics import metrics
+from src.models.user import UserLoginHistoryCreate
+
+TABLE_NAME = "users_login_history"
+COLUMNS = ("id", "user_id", "user_agent", "ip_address", "login_time")
+
+
+class LoginHistoryWriter:
+    """Per-worker background writer of login history.
+
+    Records are buffered in a bounded queue and written with one COPY every ``batch_size`` records or
+    ``flush_interval`` seconds, whichever comes first. Records that do not fit in the queue or belong to
+    a failed batch are dropped: history must never slow down or break a login.
+    """
+
+    def __init__(
+        self, engine: AsyncEngine, max_queue_size: int = 10_000, batch_size: int = 500, flush_interval: float = 0.2
+    ) -> None:
+        self._engine = engine
+        self._queue: asyncio.Queue[tuple | None] = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._task: asyncio.Task | None = None
+        metrics.register_gauge("login_history_queue_depth", self._queue.qsize)
+
+    def write(self, record: UserLoginHistoryCreate) -> None:
+        try:
+            self._queue.put_nowait(
+                (
+                    uuid.uuid4(),
+                    record.user_id,
+                    # COPY fails the whole batch on a too long value, keep them within the column sizes.
+                    record.user_agent[:255] if record.user_agent else None,
+                    record.ip_address[:15] if record.ip_address else None,
+                    record.login_time or datetime.utcnow(),
+                )
+            )
+        except asyncio.QueueFull:
+            metrics.inc("login_history_dropped_total")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything queued so far and stop."""
+        await self._queue.put(None)
+        await self._task
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            record = await self._queue.get()
+            batch = []
+            deadline = loop.time() + self._flush_interval
+            while record is not None:
+                batch.append(record)
+                if len(batch) >= self._batch_size:
+                    break
+                try:
+                    record = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    try:
+                        record = await asyncio.wait_for(self._queue.get(), timeout=max(deadline - loop.time(), 0))
+                    except asyncio.TimeoutError:
+                        break
+
+            if batch:
+                await self._flush(batch)
+            if record is None:
+                return
+
+    async def _flush(self, batch: list[tuple]) -> None:
+        started = time.perf_counter()
+        try:
+            async with self._engine.connect() as connection:
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(TABLE_NAME, records=batch, columns=COLUMNS)
+        except Exception:
+            logging.error("Unable to write '{}' login history records".format(len(batch)), exc_info=True)
+            metrics.inc("login_history_dropped_total", len(batch))
+            return
+        metrics.observe("login_history_flush_seconds", time.perf_counter() - started)
+        metrics.inc("login_history_written_total", len(batch))
+
+
+def create_login_history_writer(engine: AsyncEngine) -> LoginHistoryWriter:
+    return LoginHistoryWriter(
+        engine=engine,
+        max_queue_size=auth_service_settings.login_history_queue_size,
+        batch_size=auth_service_settings.login_history_batch_size,
+        flush_interval=auth_service_settings.login_history_flush_interval / 1000,
+    )
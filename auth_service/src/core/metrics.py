@@ -0,0 +1,58 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass
+class Summary:
+    """Running count/sum/max of observed values."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    """In-process metrics of a single worker.
+
+    Every gunicorn worker keeps its own registry, so a snapshot is always reported with the worker pid.
+    """
+
+    def __init__(self) -> None:
+        self._counters: dict[str, int] = {}
+        self._summaries: dict[str, Summary] = {}
+        self._gauges: dict[str, Callable[[], Any]] = {}
+
+    def inc(self, name: str, value: int = 1) -> None:
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        self._summaries.setdefault(name, Summary()).observe(value)
+
+    def register_gauge(self, name: str, callback: Callable[[], Any]) -> None:
+        """Register a callback evaluated on every snapshot."""
+        self._gauges[name] = callback
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "counters": dict(self._counters),
+            "summaries": {name: summary.as_dict() for name, summary in self._summaries.items()},
+            "gauges": {name: callback() for name, callback in self._gauges.items()},
+        }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,175 @@
+import re
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date
+from typing import AsyncIterator
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+LOGIN_HISTORY_TABLE = "users_login_history"
+PARTITION_KEY = "login_time"
+# Monthly partitions are named "<table>_<YYYY>_<MM>", see src/alembic/utils/create_partition.py
+MONTH_SUFFIX_RE = re.compile(r"_(\d{4})_(\d{2})$")
+# Waiting for a lock on the hot table must not queue up logins behind it.
+LOCK_TIMEOUT = "5s"
+
+
+@dataclass
+class Partition:
+    name: str
+    # first day of the month, None for the DEFAULT partition
+    month: date | None
+    is_default: bool
+    detach_pending: bool
+    # bytes, with indexes and TOAST
+    size: int
+    # planner estimate
+    rows: int
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def get_default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def get_partition_month(name: str) -> date | None:
+    if match := MONTH_SUFFIX_RE.search(name):
+        return date(int(match.group(1)), int(match.group(2)), 1)
+    return None
+
+
+@asynccontextmanager
+async def advisory_lock(connection: AsyncConnection, key: int) -> AsyncIterator[bool]:
+    """Try to take a session level advisory lock, yield whether it was taken.
+
+    The connection must be in autocommit mode, so the lock outlives the statement's transaction.
+    """
+    locked = (await connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})).scalar()
+    try:
+        yield locked
+    finally:
+        if locked:
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+
+async def list_partitions(connection: AsyncConnection, table: str) -> list[Partition]:
+    rows = await connection.execute(
+        text(
+            """
+            SELECT
+                c.relname,
+                pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT',
+                i.inhdetachpending,
+                pg_total_relation_size(c.oid),
+                GREATEST(c.reltuples, 0)::bigint
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+            ORDER BY c.relname
+            """
+        ),
+        {"table": table},
+    )
+    return [
+        Partition(
+            name=name,
+            month=None if is_default else get_partition_month(name),
+            is_default=is_default,
+            detach_pending=detach_pending,
+            size=size,
+            rows=rows,
+        )
+        for name, is_default, detach_pending, size, rows in rows
+    ]
+
+
+async def is_partition_attached(connection: AsyncConnection, name: str) -> bool | None:
+    """Whether table name is attached as a partition, None if there is no such table."""
+    return (
+        await connection.execute(
+            text("SELECT relispartition FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"),
+            {"name": name},
+        )
+    ).scalar()
+
+
+async def create_default_partition(engine: AsyncEngine, table: str) -> None:
+    """Catch rows outside of every monthly partition instead of failing their inserts."""
+    async with engine.begin() as connection:
+        await connection.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        await connection.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {get_default_partition_name(table)} PARTITION OF {table} DEFAULT")
+        )
+
+
+async def create_month_partition(engine: AsyncEngine, table: str, month: date, has_default: bool) -> int:
+    """Create the partition of month, return the number of rows moved into it from the DEFAULT partition.
+
+    With a DEFAULT partition the new one is filled and attached in one transaction: Postgres refuses to
+    create a partition while the DEFAULT one holds rows of its range.
+    """
+    name = get_partition_name(table, month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    moved = 0
+    async with engine.begin() as connection:
+        await connection.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        if not has_default:
+            await connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+                )
+            )
+            return moved
+
+        await connection.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING ALL)"))
+        result = await connection.execute(
+            text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {get_default_partition_name(table)}
+                    WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """
+            ),
+            bounds,
+        )
+        moved = result.rowcount
+        await attach_partition(connection, table, name, month)
+    return moved
+
+
+async def attach_partition(connection: AsyncConnection, table: str, name: str, month: date) -> None:
+    await connection.execute(
+        text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')")
+    )
+
+
+async def detach_partition(connection: AsyncConnection, table: str, partition: Partition, concurrently: bool) -> None:
+    """Detach partition from table, the connection must be in autocommit mode.
+
+    DETACH ... CONCURRENTLY does not block queries of the table, but Postgres does not allow it while
+    the table has a DEFAULT partition; then a short exclusive lock is taken, bounded by the lock timeout.
+    """
+    await connection.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+    try:
+        if partition.detach_pending:
+            # A previous concurrent detach was interrupted half way.
+            await connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name} FINALIZE"))
+        elif concurrently:
+            await connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name} CONCURRENTLY"))
+        else:
+            await connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name}"))
+    finally:
+        await connection.execute(text("RESET lock_timeout"))
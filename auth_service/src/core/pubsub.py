@@ -0,0 +1,87 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from src.core.metrics import metrics
+
+MessageHandler = Callable[[str], None]
+ResyncCallback = Callable[[], Awaitable[Any] | Any]
+
+
+class RedisSubscriber:
+    """Redis pub/sub listener of a worker that feeds its in-process caches.
+
+    Messages published while the listener is disconnected are lost, so consumers must not trust their
+    local state while ``connected`` is False, and every (re)subscription calls the resync callbacks.
+    """
+
+    def __init__(self, redis: Redis, reconnect_delay: float = 1.0) -> None:
+        self._redis = redis
+        self._reconnect_delay = reconnect_delay
+        self._handlers: dict[str, MessageHandler] = {}
+        self._resync_callbacks: list[ResyncCallback] = []
+        self._task: asyncio.Task | None = None
+        self.connected = False
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        """Register a handler for messages of channel, must be called before start."""
+        self._handlers[channel] = handler
+
+    def on_resync(self, callback: ResyncCallback) -> None:
+        """Register a callback to rebuild local state after every (re)subscription."""
+        self._resync_callbacks.append(callback)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.connected = False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.warning("Redis pub/sub connection lost, reconnecting", exc_info=True)
+            self.connected = False
+            metrics.inc("pubsub_reconnects_total")
+            await asyncio.sleep(self._reconnect_delay)
+
+    async def _listen(self) -> None:
+        async with self._redis.pubsub() as pubsub:
+            await pubsub.subscribe(*self._handlers)
+            pending_subscriptions = len(self._handlers)
+
+            async for message in pubsub.listen():
+                if message["type"] == "subscribe":
+                    pending_subscriptions -= 1
+                    if not pending_subscriptions:
+                        # Everything published from now on is delivered, drop what could have been missed.
+                        await self._resync()
+                        self.connected = True
+                elif message["type"] == "message":
+                    self._dispatch(channel=message["channel"].decode(), data=message["data"].decode())
+
+    async def _resync(self) -> None:
+        for callback in self._resync_callbacks:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
+        metrics.inc("pubsub_resyncs_total")
+
+    def _dispatch(self, channel: str, data: str) -> None:
+        try:
+            self._handlers[channel](data)
+        except Exception:
+            logging.error("Could not handle pub/sub message from '{}'".format(channel), exc_info=True)
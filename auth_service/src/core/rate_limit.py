@@ -0,0 +1,199 @@
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import translate
+
+from redis.asyncio import Redis
+
+from src.core.config.base import RateLimitPolicy, RateLimitSettings
+from src.core.metrics import metrics
+
+# GCRA: the key holds the theoretical arrival time (TAT) of the next request in milliseconds of Redis time,
+# a request is allowed while TAT does not run ahead of now by more than the whole period.
+# KEYS[1]: bucket, ARGV[1]: emission interval (ms), ARGV[2]: period (ms), ARGV[3]: tokens wanted,
+# ARGV[4]: "1" to grant fewer tokens than wanted, ARGV[5]: unused leased tokens to give back first.
+# Returns tokens granted, remaining, retry after (ms), reset after (ms).
+GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = time[1] * 1000 + time[2] / 1000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local refund = tonumber(ARGV[5])
+local tat = math.max((tonumber(redis.call('GET', KEYS[1])) or now) - interval * refund, now)
+local available = math.floor((now - tat + period) / interval + 1e-6)
+local granted = math.min(wanted, available)
+if granted < wanted and ARGV[4] ~= '1' then
+    granted = 0
+end
+if granted <= 0 then
+    if refund > 0 then
+        redis.call('SET', KEYS[1], tostring(tat), 'PX', math.max(math.ceil(tat - now), 1))
+    end
+    local needed = ARGV[4] == '1' and 1 or wanted
+    return {0, 0, math.ceil(tat + interval * needed - period - now), math.ceil(tat - now)}
+end
+local new_tat = tat + interval * granted
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+return {granted, available - granted, 0, math.ceil(new_tat - now)}
+"""
+
+
+@dataclass
+class Lease:
+    """Tokens a worker took from a Redis bucket in advance."""
+
+    tokens: int
+    # time.monotonic() after which the tokens are given back instead of spent
+    expires_at: float
+    # tokens left in Redis when the lease was taken
+    remaining: int
+    reset_at: float
+    # time.monotonic() before which the bucket was empty in Redis, requests are denied locally until then
+    retry_at: float = 0.0
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    # seconds until the request may be retried, 0 when allowed
+    retry_after: float
+    # seconds until the whole limit is available again
+    reset_after: float
+
+    def get_headers(self) -> dict[str, str]:
+        """Get RateLimit-* headers (IETF draft) and Retry-After for rejected requests."""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class RateLimiter:
+    """GCRA rate limiter, one atomic Lua script call per check.
+
+    Policies are resolved by "<METHOD> <path>": exact routes first, then wildcard ones in settings order,
+    then the default policy. Buckets are shared by all paths matching the same policy.
+
+    With ``lease_size`` set, a worker leases up to that many tokens of a bucket per Redis call and spends them
+    locally for ``lease_ttl`` seconds; unspent tokens are given back with the next lease of the bucket.
+    An empty bucket is remembered as well, requests are denied locally until its Retry-After.
+    Redis never grants more than the limit, but leased tokens may be spent up to ``lease_ttl`` after the grant,
+    so a period can admit at most ``workers * lease`` requests over the limit; the same amount may sit unused
+    in other workers' leases and be denied meanwhile.
+    """
+
+    def __init__(self, redis: Redis, settings: RateLimitSettings) -> None:
+        self._redis = redis
+        self._script = redis.register_script(GCRA_SCRIPT)
+        self._default = settings.default
+        self._routes: dict[str, RateLimitPolicy | None] = {}
+        self._patterns: list[tuple[re.Pattern, str, RateLimitPolicy | None]] = []
+        for route, policy in settings.routes.items():
+            if "*" in route:
+                self._patterns.append((re.compile(translate(route)), route, policy))
+            else:
+                self._routes[route] = policy
+
+        self._lease_size = settings.lease_size
+        self._lease_ttl = settings.lease_ttl
+        self._lease_max_fraction = settings.lease_max_fraction
+        self._lease_max_keys = settings.lease_max_keys
+        self._leases: OrderedDict[str, Lease] = OrderedDict()
+        metrics.register_gauge("rate_limit_leases", lambda: len(self._leases))
+
+    def get_policy(self, method: str, path: str) -> tuple[str, RateLimitPolicy | None]:
+        """Get name and policy of the route, the policy is None when the route is not limited."""
+        route = f"{method} {path}"
+        if route in self._routes:
+            return route, self._routes[route]
+        for pattern, name, policy in self._patterns:
+            if pattern.match(route):
+                return name, policy
+        return "default", self._default
+
+    def get_lease_size(self, policy: RateLimitPolicy) -> int:
+        return min(self._lease_size, int(policy.limit * self._lease_max_fraction))
+
+    async def hit(self, key: str, policy: RateLimitPolicy, cost: int = 1) -> RateLimitResult:
+        lease_size = self.get_lease_size(policy)
+        if lease_size <= cost:
+            granted, remaining, retry_after, reset_after = await self._call(key, policy, cost)
+            return self._get_result(policy, granted >= cost, remaining, retry_after, reset_after)
+
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease and lease.expires_at > now and (lease.tokens >= cost or lease.retry_at > now):
+            allowed = lease.tokens >= cost
+            if allowed:
+                lease.tokens -= cost
+            self._leases.move_to_end(key)
+            metrics.inc("rate_limit_lease_hits_total")
+            return self._get_result(
+                policy,
+                allowed,
+                remaining=lease.remaining + lease.tokens,
+                retry_after=(lease.retry_at - now) * 1000,
+                reset_after=max(lease.reset_at - now, 0) * 1000,
+            )
+
+        # The lease is expired or too small, give back what is left of it in the same call.
+        refund = self._leases.pop(key).tokens if lease else 0
+        granted, remaining, retry_after, reset_after = await self._call(
+            key, policy, lease_size, partial=True, refund=refund
+        )
+        allowed = granted >= cost
+        self._add_lease(key, granted - cost if allowed else granted, remaining, retry_after, reset_after)
+        return self._get_result(policy, allowed, remaining, retry_after, reset_after)
+
+    async def _call(
+        self, key: str, policy: RateLimitPolicy, tokens: int, partial: bool = False, refund: int = 0
+    ) -> list[int]:
+        period = policy.period * 1000
+        metrics.inc("rate_limit_redis_calls_total")
+        return await self._script(
+            keys=[f"rate_limit:{key}"], args=[period / policy.limit, period, tokens, int(partial), refund]
+        )
+
+    def _add_lease(self, key: str, tokens: int, remaining: int, retry_after: int, reset_after: int) -> None:
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease and lease.expires_at > now:
+            # Another request of the same bucket took a lease while we were waiting for Redis.
+            lease.tokens += tokens
+        else:
+            lease = self._leases[key] = Lease(
+                tokens=tokens,
+                expires_at=now + self._lease_ttl,
+                remaining=remaining,
+                reset_at=now + reset_after / 1000,
+            )
+        if retry_after:
+            lease.retry_at = now + retry_after / 1000
+
+        self._leases.move_to_end(key)
+        if len(self._leases) > self._lease_max_keys:
+            # Tokens of an evicted lease are never given back, which only makes the limit stricter.
+            self._leases.popitem(last=False)
+
+    @staticmethod
+    def _get_result(
+        policy: RateLimitPolicy, allowed: bool, remaining: int, retry_after: float, reset_after: float
+    ) -> RateLimitResult:
+        if not allowed:
+            metrics.inc("rate_limit_rejected_total")
+        return RateLimitResult(
+            allowed=allowed,
+            limit=policy.limit,
+            remaining=remaining if allowed else 0,
+            retry_after=0 if allowed else retry_after / 1000,
+            reset_after=reset_after / 1000,
+        )
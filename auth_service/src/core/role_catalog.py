@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.metrics import metrics
+from src.core.pubsub import RedisSubscriber
+from src.models.db.role import Role
+from src.models.role import RoleInDB
+
+ROLES_CHANNEL = "auth:roles"
+
+
+class RoleCatalog:
+    """Per-worker copy of the roles table.
+
+    Roles are few and rarely change, so the whole table is kept in memory and reloaded when any worker
+    publishes a change, on every resubscription and every ``reload_interval`` seconds in case a change
+    was made without publishing it (e.g. by a command). The catalog is not trusted while it is not loaded
+    or the subscriber is disconnected: lookups return ``None`` and callers fall back to Postgres.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        subscriber: RedisSubscriber,
+        reload_interval: float = 30.0,
+    ) -> None:
+        self._session_factory = session_factory
+        self._redis = redis
+        self._subscriber = subscriber
+        self._reload_interval = reload_interval
+        self._by_id: dict[UUID, RoleInDB] = {}
+        self._by_name: dict[str, RoleInDB] = {}
+        self._loaded = False
+        # Reloads are serialized, so the last one to finish has read the latest state.
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._reload_tasks: set[asyncio.Task] = set()
+
+        subscriber.subscribe(ROLES_CHANNEL, self._on_changed)
+        subscriber.on_resync(self.reload)
+        metrics.register_gauge("role_catalog_size", lambda: len(self._by_id))
+
+    @property
+    def is_fresh(self) -> bool:
+        return self._loaded and self._subscriber.connected
+
+    def get_by_id(self, role_id: UUID) -> RoleInDB | None:
+        return self._by_id.get(role_id)
+
+    def get_by_name(self, role_name: str) -> RoleInDB | None:
+        return self._by_name.get(role_name)
+
+    def get_list(self) -> list[RoleInDB]:
+        return list(self._by_id.values())
+
+    async def reload(self) -> None:
+        """Load all roles, on failure the catalog is not fresh until the next successful reload."""
+        async with self._lock:
+            try:
+                async with self._session_factory() as session:
+                    roles = [RoleInDB.model_validate(role) for role in (await session.scalars(select(Role))).all()]
+            except Exception:
+                self._loaded = False
+                logging.error("Could not load role catalog", exc_info=True)
+                return
+            self._by_id = {role.id: role for role in roles}
+            self._by_name = {role.name: role for role in roles}
+            self._loaded = True
+        metrics.inc("role_catalog_reloads_total")
+
+    async def publish_changed(self) -> None:
+        """Reload this worker's catalog and tell every other worker to reload theirs.
+
+        Must be called after the change is committed, otherwise workers could reload the old state.
+        """
+        await self.reload()
+        await self._redis.publish(ROLES_CHANNEL, "changed")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._reload_interval)
+            await self.reload()
+
+    def _on_changed(self, _: str) -> None:
+        task = asyncio.create_task(self.reload())
+        self._reload_tasks.add(task)
+        task.add_done_callback(self._reload_tasks.discard)
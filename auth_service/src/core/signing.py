@@ -0,0 +1,176 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import jwt
+import orjson
+from async_fastapi_jwt_auth import AuthJWT
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt.algorithms import get_default_algorithms
+
+from src.core.config import base_auth_jwt_settings
+from src.core.legacy_tokens import decode_legacy_token
+
+SIGNING_ALGORITHMS = ("RS256", "ES256", "EdDSA")
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: Any
+    # naive UTC, the key signs tokens from this moment until the next key becomes active
+    active_from: datetime
+
+    @property
+    def public_key(self) -> Any:
+        return self.private_key.public_key()
+
+    def get_jwk(self) -> dict:
+        jwk = get_default_algorithms()[self.algorithm].to_jwk(self.public_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+class KeyRing:
+    """Asymmetric signing keys indexed by "kid", rotated by schedule.
+
+    The key with the latest ``active_from`` in the past signs new tokens. Keys are published, and accepted,
+    ``publish_ahead`` seconds before they become active, so verifiers caching the JWKS learn them before
+    the first token signed with them, and until ``max_token_lifetime`` seconds after the next key became
+    active, when the last token they signed has expired.
+
+    Tokens without "kid" are verified with ``legacy_secret`` when it is set, only if they were issued before
+    ``legacy_issued_before`` (by default when the first key became active) and for at most
+    ``max_token_lifetime`` seconds after that.
+    """
+
+    def __init__(
+        self,
+        keys: list[SigningKey],
+        max_token_lifetime: int,
+        publish_ahead: int = 86400,
+        legacy_secret: str | None = None,
+        legacy_issued_before: datetime | None = None,
+    ) -> None:
+        if not keys:
+            raise ValueError("Key ring has no keys")
+        self._keys = sorted(keys, key=lambda key: key.active_from)
+        self._max_token_lifetime = timedelta(seconds=max_token_lifetime)
+        self._publish_ahead = timedelta(seconds=publish_ahead)
+        self._legacy_secret = legacy_secret
+        self._legacy_issued_before = legacy_issued_before or self._keys[0].active_from
+        self._jwks: dict[tuple[str, ...], tuple[bytes, str]] = {}
+
+    def get_signing_key(self, now: datetime | None = None) -> SigningKey:
+        now = now or datetime.utcnow()
+        active_keys = [key for key in self._keys if key.active_from <= now]
+        if not active_keys:
+            raise RuntimeError("No signing key is active yet")
+        return active_keys[-1]
+
+    def get_published_keys(self, now: datetime | None = None) -> list[SigningKey]:
+        now = now or datetime.utcnow()
+        published = []
+        for key, next_key in zip(self._keys, [*self._keys[1:], None]):
+            if key.active_from > now + self._publish_ahead:
+                continue
+            if next_key and next_key.active_from + self._max_token_lifetime <= now:
+                continue
+            published.append(key)
+        return published
+
+    def get_verification_key(self, kid: str, now: datetime | None = None) -> SigningKey | None:
+        return next((key for key in self.get_published_keys(now) if key.kid == kid), None)
+
+    def get_jwks(self, now: datetime | None = None) -> tuple[bytes, str]:
+        """Get the serialized JWKS of published keys and its ETag."""
+        keys = self.get_published_keys(now)
+        cache_key = tuple(key.kid for key in keys)
+        if cache_key not in self._jwks:
+            body = orjson.dumps({"keys": [key.get_jwk() for key in keys]})
+            self._jwks[cache_key] = body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        return self._jwks[cache_key]
+
+    def decode(self, token: str, **options: Any) -> dict:
+        """Verify token with the key named by its "kid" header, raise jwt.InvalidTokenError if it is not valid."""
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            if not self._legacy_secret:
+                raise jwt.InvalidTokenError("Token has no key id")
+            return decode_legacy_token(
+                token,
+                self._legacy_secret,
+                issued_before=self._legacy_issued_before,
+                max_token_lifetime=int(self._max_token_lifetime.total_seconds()),
+                **options,
+            )
+
+        if not (key := self.get_verification_key(kid)):
+            raise jwt.InvalidTokenError("Unknown key id '{}'".format(kid))
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm], **options)
+
+
+def decode_token(token: str, key_ring: KeyRing | None, **options: Any) -> dict:
+    """Verify a token of this service, raise jwt.InvalidTokenError if it is not valid."""
+    if key_ring:
+        return key_ring.decode(token, **options)
+    return jwt.decode(token, AuthJWT._secret_key, algorithms=[AuthJWT._algorithm], **options)
+
+
+def load_signing_key(path: Path, kid: str, algorithm: str, active_from: datetime) -> SigningKey:
+    if algorithm not in SIGNING_ALGORITHMS:
+        raise ValueError("Algorithm '{}' of key '{}' is not one of {}".format(algorithm, kid, SIGNING_ALGORITHMS))
+    return SigningKey(
+        kid=kid,
+        algorithm=algorithm,
+        private_key=load_pem_private_key(path.read_bytes(), password=None),
+        active_from=active_from,
+    )
+
+
+def load_key_ring(
+    path: str,
+    max_token_lifetime: int,
+    publish_ahead: int,
+    legacy_secret: str | None,
+    legacy_issued_before: datetime | None = None,
+) -> KeyRing:
+    """Load the key ring file, key files are resolved relative to it.
+
+    {"keys": [{"kid": "es256-20261101", "alg": "ES256", "file": "es256-20261101.pem",
+               "active_from": "2026-11-01T00:00:00"}]}
+    """
+    key_ring_path = Path(path)
+    config = json.loads(key_ring_path.read_text())
+    return KeyRing(
+        keys=[
+            load_signing_key(
+                path=key_ring_path.parent / key["file"],
+                kid=key["kid"],
+                algorithm=key["alg"],
+                active_from=datetime.fromisoformat(key["active_from"]),
+            )
+            for key in config["keys"]
+        ],
+        max_token_lifetime=max_token_lifetime,
+        publish_ahead=publish_ahead,
+        legacy_secret=legacy_secret,
+        legacy_issued_before=legacy_issued_before,
+    )
+
+
+def create_key_ring() -> KeyRing | None:
+    """Load the configured key ring, None when tokens are signed with the shared secret."""
+    if not base_auth_jwt_settings.key_ring_file:
+        return None
+    # Keys stay published until the longest-living token they could have signed, a refresh token, expires.
+    return load_key_ring(
+        path=base_auth_jwt_settings.key_ring_file,
+        max_token_lifetime=base_auth_jwt_settings.refresh_expires_time,
+        publish_ahead=base_auth_jwt_settings.key_publish_ahead,
+        legacy_secret=base_auth_jwt_settings.secret_key if base_auth_jwt_settings.accept_legacy_tokens else None,
+        legacy_issued_before=base_auth_jwt_settings.legacy_tokens_issued_before,
+    )
@@ -0,0 +1,109 @@
+import base64
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+import orjson
+from async_fastapi_jwt_auth import AuthJWT
+from jwt.algorithms import get_default_algorithms
+
+from src.core.signing import KeyRing
+
+
+def base64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def get_expires_in(expires: timedelta | int | bool) -> int | None:
+    """Get token lifetime in seconds from an AuthJWT setting, None when tokens do not expire."""
+    if expires is False:
+        return None
+    return int(expires.total_seconds()) if isinstance(expires, timedelta) else int(expires)
+
+
+@dataclass(frozen=True)
+class TokenPair:
+    access_token: str
+    refresh_token: str
+    # "exp" claims of the tokens, None when tokens do not expire
+    access_expires_at: int | None
+    refresh_expires_at: int | None
+
+
+@dataclass(frozen=True)
+class TokenSigner:
+    # encoded JOSE header with the trailing ".", the same for every token signed with the key
+    header: bytes
+    algorithm: Any
+    key: Any
+
+    def sign(self, claims: dict) -> str:
+        signing_input = self.header + base64url_encode(orjson.dumps(claims))
+        return (signing_input + b"." + base64url_encode(self.algorithm.sign(signing_input, self.key))).decode()
+
+
+class TokenIssuer:
+    """Issue tokens with the claims AuthJWT would issue, without its per-token overhead.
+
+    The JOSE header is encoded and the key prepared once per signing key, claims are serialized with orjson
+    and an access and refresh token pair shares one timestamp and signer lookup.
+    """
+
+    def __init__(self, key_ring: KeyRing | None = None) -> None:
+        self._key_ring = key_ring
+        self._signers: dict[str | None, TokenSigner] = {}
+        self._access_expires_in = get_expires_in(AuthJWT._access_token_expires)
+        self._refresh_expires_in = get_expires_in(AuthJWT._refresh_token_expires)
+        self._csrf = "cookies" in AuthJWT._token_location and AuthJWT._cookie_csrf_protect
+        self._issuer = AuthJWT._encode_issuer
+
+    def issue_pair(self, subject: str, user_claims: dict | None = None, fresh: bool = False) -> TokenPair:
+        signer = self._get_signer()
+        now = int(time.time())
+        access_claims = self._get_claims(subject, "access", now, user_claims, fresh)
+        refresh_claims = self._get_claims(subject, "refresh", now, user_claims)
+        return TokenPair(
+            access_token=signer.sign(access_claims),
+            refresh_token=signer.sign(refresh_claims),
+            access_expires_at=access_claims.get("exp"),
+            refresh_expires_at=refresh_claims.get("exp"),
+        )
+
+    def _get_claims(
+        self, subject: str, token_type: str, now: int, user_claims: dict | None, fresh: bool = False
+    ) -> dict:
+        # Same claims in the same order as AuthJWT._create_token.
+        claims = {"sub": subject, "iat": now, "nbf": now, "jti": str(uuid.uuid4())}
+        expires_in = self._access_expires_in if token_type == "access" else self._refresh_expires_in
+        if expires_in is not None:
+            claims["exp"] = now + expires_in
+        if self._issuer:
+            claims["iss"] = self._issuer
+        claims["type"] = token_type
+        if token_type == "access":
+            claims["fresh"] = fresh
+        if self._csrf:
+            claims["csrf"] = str(uuid.uuid4())
+        if user_claims:
+            claims.update(user_claims)
+        return claims
+
+    def _get_signer(self) -> TokenSigner:
+        signing_key = self._key_ring.get_signing_key() if self._key_ring else None
+        kid = signing_key.kid if signing_key else None
+        if kid not in self._signers:
+            if signing_key:
+                algorithm_name, key, header = signing_key.algorithm, signing_key.private_key, {"kid": kid}
+            else:
+                algorithm_name, key, header = AuthJWT._algorithm, AuthJWT._secret_key, {}
+            algorithm = get_default_algorithms()[algorithm_name]
+            # Sorted like PyJWT does, so the header is byte for byte the one jwt.encode would produce.
+            header = dict(sorted({**header, "alg": algorithm_name, "typ": "JWT"}.items()))
+            self._signers[kid] = TokenSigner(
+                header=base64url_encode(orjson.dumps(header)) + b".",
+                algorithm=algorithm,
+                key=algorithm.prepare_key(key),
+            )
+        return self._signers[kid]
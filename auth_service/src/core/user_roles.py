@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from src.core.metrics import metrics
+from src.core.pubsub import RedisSubscriber
+
+USER_ROLES_CHANNEL = "auth:user_roles"
+ACCESS_LEVEL_FIELD = "access_level"
+ROLE_FIELD_PREFIX = "role:"
+INVALIDATE_BATCH_SIZE = 1000
+
+# Seconds the version of an invalidated projection is kept, longer than any read between get_version and fill.
+VERSION_TTL = 60
+
+# Fill a projection loaded from Postgres unless it was invalidated since the reader got its version
+# or another reader has filled it in the meantime.
+# KEYS[1] - projection hash, KEYS[2] - version, ARGV[1] - ttl, ARGV[2] - version, ARGV[3..] - field/value pairs
+FILL_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[2]) or redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+# Delete projections and bump their versions, so fills with data read before the change are rejected.
+# KEYS[1..n] - projection hashes, KEYS[n+1..2n] - their versions, ARGV[1] - version ttl, ARGV[2] - channel,
+# ARGV[3] - message
+INVALIDATE_SCRIPT = """
+local count = #KEYS / 2
+for i = 1, count do
+    redis.call('DEL', KEYS[i])
+    redis.call('INCR', KEYS[count + i])
+    redis.call('EXPIRE', KEYS[count + i], ARGV[1])
+end
+redis.call('PUBLISH', ARGV[2], ARGV[3])
+return count
+"""
+
+
+def get_user_roles_key(user_id: UUID) -> str:
+    """Get Redis key of the user's roles projection."""
+    return f"{user_id}:roles"
+
+
+def get_user_roles_version_key(user_id: UUID) -> str:
+    return f"{user_id}:roles:version"
+
+
+@dataclass(frozen=True)
+class UserRoles:
+    role_ids: frozenset[UUID]
+    access_level: int
+
+
+class UserRolesCache:
+    """Projection of users to their role ids and access level, in Redis with a per-worker LRU in front.
+
+    Writers invalidate projections of the affected users after their transaction is committed: the Redis
+    script deletes them, bumps their versions and publishes the user ids, so every worker drops its local
+    copies. A reader takes the version before loading a projection from Postgres and the fill is rejected
+    if it has changed, so a read that raced a write can't cache roles from before it. Local entries are
+    bypassed while the subscriber is disconnected and dropped on every resubscription. Redis entries expire
+    after ``ttl`` seconds, which bounds the staleness left by a writer that died between commit and
+    invalidation.
+    """
+
+    def __init__(self, redis: Redis, subscriber: RedisSubscriber, max_size: int = 100_000, ttl: int = 300) -> None:
+        self._redis = redis
+        self._subscriber = subscriber
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[UUID, UserRoles] = OrderedDict()
+        # Bumped on every invalidation, so a lookup that raced with one does not store its result.
+        self._generation = 0
+        self._fill_script = redis.register_script(FILL_SCRIPT)
+        self._invalidate_script = redis.register_script(INVALIDATE_SCRIPT)
+
+        subscriber.subscribe(USER_ROLES_CHANNEL, self._on_changed)
+        subscriber.on_resync(self.clear)
+        metrics.register_gauge("user_roles_cache_size", lambda: len(self._entries))
+
+    async def get(self, user_id: UUID) -> UserRoles | None:
+        """Get the cached projection, None if neither this worker nor Redis has it."""
+        if self._subscriber.connected and user_id in self._entries:
+            self._entries.move_to_end(user_id)
+            metrics.inc("user_roles_cache_hits_total")
+            return self._entries[user_id]
+
+        generation = self._generation
+        fields = await self._redis.hgetall(get_user_roles_key(user_id))
+        if not fields:
+            metrics.inc("user_roles_cache_misses_total")
+            return None
+
+        metrics.inc("user_roles_redis_hits_total")
+        user_roles = UserRoles(
+            role_ids=frozenset(
+                UUID(field.removeprefix(ROLE_FIELD_PREFIX))
+                for field in map(bytes.decode, fields)
+                if field.startswith(ROLE_FIELD_PREFIX)
+            ),
+            access_level=int(fields[ACCESS_LEVEL_FIELD.encode()]),
+        )
+        if self._subscriber.connected and generation == self._generation:
+            self._store(user_id, user_roles)
+        return user_roles
+
+    async def get_version(self, user_id: UUID) -> int:
+        """Get the version to fill the user's projection with, must be taken before reading Postgres."""
+        return int(await self._redis.get(get_user_roles_version_key(user_id)) or 0)
+
+    async def fill(self, user_id: UUID, user_roles: UserRoles, version: int) -> None:
+        """Cache a projection loaded from Postgres after get_version returned version."""
+        fields = [ACCESS_LEVEL_FIELD, user_roles.access_level]
+        for role_id in user_roles.role_ids:
+            fields.extend((f"{ROLE_FIELD_PREFIX}{role_id}", 1))
+        await self._fill_script(
+            keys=[get_user_roles_key(user_id), get_user_roles_version_key(user_id)],
+            args=[self._ttl, version, *fields],
+        )
+
+    async def invalidate(self, user_ids: Iterable[UUID]) -> None:
+        user_ids = list(user_ids)
+        # Deleting a popular role touches many users, keep every script call short.
+        for start in range(0, len(user_ids), INVALIDATE_BATCH_SIZE):
+            end = start + INVALIDATE_BATCH_SIZE
+            batch = user_ids[start:end]
+            await self._invalidate_script(
+                keys=[
+                    *(get_user_roles_key(user_id) for user_id in batch),
+                    *(get_user_roles_version_key(user_id) for user_id in batch),
+                ],
+                args=[VERSION_TTL, USER_ROLES_CHANNEL, " ".join(map(str, batch))],
+            )
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generation += 1
+
+    def _on_changed(self, data: str) -> None:
+        self._generation += 1
+        for user_id in data.split():
+            self._entries.pop(UUID(user_id), None)
+
+    def _store(self, user_id: UUID, user_roles: UserRoles) -> None:
+        self._entries[user_id] = user_roles
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
@@ -2,20 +2,33 @@ from contextlib import asynccontextmanager
 from typing import Any
 
 from async_fastapi_jwt_auth.exceptions import AuthJWTException
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi_pagination import add_pagination
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from src.core.config.jaeger import jaeger_settings
 from src.services.rate_limit import RateLimitMiddleware
-from src.api.v1.middlewares import before_request
+from src.api.v1.middlewares import RequestIdMiddleware
 from src.api.v1.jaeger import configure_tracer
 from src.api import router as auth_router
+from src.api.internal import router as internal_router
+from src.api.well_known import router as well_known_router
 from src.core import dependencies
-from src.core.config import auth_service_settings, redis_settings
+from src.core.denylist import DenylistCache
+from src.core.database import create_pg_engine, get_pool_stats
+from src.core.hashing import PasswordHasherOverloadedError, create_password_hasher
+from src.core.login_history import create_login_history_writer
+from src.core.config import auth_service_settings, cache_settings, rate_limit_settings, redis_settings
+from src.core.metrics import metrics
+from src.core.pubsub import RedisSubscriber
+from src.core.rate_limit import RateLimiter
+from src.core.role_catalog import RoleCatalog
+from src.core.signing import create_key_ring
+from src.core.token_issuer import TokenIssuer
+from src.core.user_roles import UserRolesCache
 
 
 @asynccontextmanager
@@ -25,11 +38,42 @@ async def lifespan(_: FastAPI) -> Any:
     :param FastAPI _: FastAPI app instance.
     """
 
-    dependencies.async_pg_engine = create_async_engine(auth_service_settings.get_dsn())
+    dependencies.async_pg_engine = create_pg_engine()
+    metrics.register_gauge("db_pool", lambda: get_pool_stats(dependencies.async_pg_engine))
+    dependencies.async_session_factory = async_sessionmaker(dependencies.async_pg_engine, expire_on_commit=False)
+    dependencies.login_history_writer = create_login_history_writer(engine=dependencies.async_pg_engine)
+    dependencies.login_history_writer.start()
     dependencies.redis = Redis(**redis_settings.model_dump())
+    dependencies.redis_subscriber = RedisSubscriber(redis=dependencies.redis)
+    dependencies.denylist_cache = DenylistCache(
+        redis=dependencies.redis, subscriber=dependencies.redis_subscriber, max_size=cache_settings.denylist_size
+    )
+    dependencies.role_catalog = RoleCatalog(
+        session_factory=dependencies.async_session_factory,
+        redis=dependencies.redis,
+        subscriber=dependencies.redis_subscriber,
+        reload_interval=cache_settings.role_catalog_reload_interval,
+    )
+    dependencies.role_catalog.start()
+    dependencies.user_roles_cache = UserRolesCache(
+        redis=dependencies.redis,
+        subscriber=dependencies.redis_subscriber,
+        max_size=cache_settings.user_roles_size,
+        ttl=cache_settings.user_roles_ttl,
+    )
+    dependencies.redis_subscriber.start()
+    if rate_limit_settings.enable:
+        dependencies.rate_limiter = RateLimiter(redis=dependencies.redis, settings=rate_limit_settings)
+    dependencies.password_hasher = create_password_hasher()
+    dependencies.key_ring = create_key_ring()
+    dependencies.token_issuer = TokenIssuer(key_ring=dependencies.key_ring)
     yield
+    await dependencies.login_history_writer.stop()
+    await dependencies.role_catalog.stop()
+    await dependencies.redis_subscriber.stop()
     await dependencies.async_pg_engine.dispose()
     await dependencies.redis.close()
+    dependencies.password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -47,12 +91,23 @@ def authjwt_exception_handler(_: Request, exc: AuthJWTException):
     return JSONResponse(status_code=exc.status_code, content={"detail": exc.message})
 
 
+@app.exception_handler(PasswordHasherOverloadedError)
+def password_hasher_overloaded_handler(_: Request, exc: PasswordHasherOverloadedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service is overloaded, try again later."},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(auth_router)
+app.include_router(internal_router)
+app.include_router(well_known_router)
 
 # Jaeger
 if jaeger_settings.enable:
     configure_tracer(service_name=auth_service_settings.name)
-    app.middleware("http")(before_request)
+    app.add_middleware(RequestIdMiddleware)
     FastAPIInstrumentor.instrument_app(app)
 
 # Добавляем middleware для rate limiting
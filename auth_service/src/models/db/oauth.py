@@ -16,7 +16,7 @@ class OAuthUser(Base):
         nullable=False,
     )
 
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False)
     user = relationship("User", backref=backref("oauth_user", lazy="dynamic"))
 
     oauth_id = Column(String, nullable=False)
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import UUID, Column, ForeignKey, String, Table
+from sqlalchemy import UUID, Column, ForeignKey, Index, String, Table
 from sqlalchemy.orm import relationship
 from src.models.db import Base
 
@@ -9,6 +9,7 @@ association_table = Table(
     Base.metadata,
     Column("user_id", ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
     Column("role_id", ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_users_roles_role_id_user_id", "role_id", "user_id"),
 )
 
 
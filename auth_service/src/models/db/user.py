@@ -2,11 +2,10 @@ import uuid
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import UUID, Column, DateTime, ForeignKey, String, Integer
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import Mapped, relationship
 from src.models.db.base import Base
 from src.models.db.role import Role, association_table
-from werkzeug.security import check_password_hash, generate_password_hash
 
 
 class User(Base):
@@ -34,21 +33,17 @@ class User(Base):
     )
     roles: Mapped[List["Role"]] = relationship(secondary=association_table)
 
+    __table_args__ = (Index("ix_users_email_lower", func.lower(email), unique=True),)
+
     def __init__(
-        self, email: str, password: str, first_name: str = None, last_name: str = None, access_level: int = 0
+        self, email: str, password_hash: str, first_name: str = None, last_name: str = None, access_level: int = 0
     ) -> None:
         self.email = email
-        self.password = generate_password_hash(password)
+        self.password = password_hash
         self.first_name = first_name
         self.last_name = last_name
         self.access_level = access_level
 
-    def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password, password)
-
-    def set_password(self, password: str) -> None:
-        self.password = generate_password_hash(password)
-
     def __repr__(self) -> str:
         return f"<User {self.email}>"
 
@@ -64,5 +59,7 @@ class UserLoginHistory(Base):
 
     user = relationship("User", back_populates="login_history")
 
+    __table_args__ = (Index("ix_users_login_history_user_id_login_time", "user_id", "login_time", "id"),)
+
     def __repr__(self) -> str:
         return f"<UserLoginHistory {self.user_id}>"
@@ -1,4 +1,6 @@
-from enum import Enum
+from enum import Enum, IntFlag
+from functools import lru_cache
+from typing import Iterable
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -29,3 +31,38 @@ class RoleEnum(Enum):
     user = "user"
     admin = "admin"
     staff = "staff"
+
+
+class Permission(IntFlag):
+    """Permission bits carried by tokens in the "perm" claim, new members must take the next free bit."""
+
+    ROLES_READ = 1
+    ROLES_WRITE = 2
+    ROLES_ASSIGN = 4
+
+
+ROLE_PERMISSIONS: dict[str, Permission] = {
+    RoleEnum.admin.value: Permission.ROLES_READ | Permission.ROLES_WRITE | Permission.ROLES_ASSIGN,
+    RoleEnum.staff.value: Permission.ROLES_READ,
+    RoleEnum.user.value: Permission(0),
+}
+
+
+def get_permissions(role_names: Iterable[str]) -> Permission:
+    """Union of permissions of the roles, unknown roles grant nothing."""
+    permissions = Permission(0)
+    for role_name in role_names:
+        permissions |= ROLE_PERMISSIONS.get(role_name, Permission(0))
+    return permissions
+
+
+@lru_cache(maxsize=1024)
+def _get_legacy_permissions(role_names: tuple[str, ...]) -> int:
+    return get_permissions(role_names)
+
+
+def get_token_permissions(claims: dict) -> int:
+    """Get the permission mask of a token, tokens issued before the "perm" claim only carry role names."""
+    if (permissions := claims.get("perm")) is not None:
+        return permissions
+    return _get_legacy_permissions(tuple(claims.get("roles") or ()))
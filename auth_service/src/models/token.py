@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+
+INTROSPECT_MAX_TOKENS = 100
+
+
+class TokenIntrospectRequest(BaseModel):
+    tokens: list[str] = Field(min_length=1, max_length=INTROSPECT_MAX_TOKENS)
+
+
+class TokenIntrospection(BaseModel):
+    # sha256 hex digest of the token, callers cache the answer under it
+    token_hash: str
+    active: bool
+    claims: dict | None = None
+    exp: int | None = None
+    # seconds the answer may be cached for
+    max_age: int
+
+
+class TokenIntrospectResponse(BaseModel):
+    tokens: list[TokenIntrospection]
@@ -85,3 +85,11 @@ class UserLoginHistoryInDB(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UserLoginHistoryCursorPage(BaseModel):
+    items: list[UserLoginHistoryInDB]
+    # pass as `cursor` to get the next page, None on the last page
+    next_cursor: str | None = None
+    # planner estimate of matching records, only when requested
+    estimated_total: int | None = None
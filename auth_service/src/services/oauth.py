@@ -7,11 +7,11 @@ import httpx
 from fastapi import Depends
 from redis.asyncio import Redis
 from sqlalchemy import select, exc, and_
-from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.models.db import User
-from src.core.dependencies import get_pg_connection, get_redis
+from src.core.dependencies import get_db_session, get_redis
 from src.core.config import oauth_settings
 from src.core.config.oauth import Settings
 from src.models.oauth import UserProviderData
@@ -44,8 +44,8 @@ class ABCOAuthService(abc.ABC):
 class BaseOAuthService(ABCOAuthService, BaseService):
     OAUTH_SERVICE_NAME = "base"
 
-    def __init__(self, pg_connection: AsyncEngine, redis: Redis, role_service: RoleService, user_service: UserService):
-        super().__init__(pg_connection, redis)
+    def __init__(self, session: AsyncSession, redis: Redis, role_service: RoleService, user_service: UserService):
+        super().__init__(session, redis)
         self.role_service = role_service
         self.user_service = user_service
         self.provider_settings = get_provider_settings(provider_name=self.OAUTH_SERVICE_NAME)
@@ -74,29 +74,26 @@ class BaseOAuthService(ABCOAuthService, BaseService):
 
     async def _get_oauth_user_by_id(self, oauth_id: str) -> OAuthUser | None:
         """Method to fetch user data from database."""
-        async with self.get_session() as session, session.begin():
-            try:
-                result = await session.execute(
-                    select(OAuthUser)
-                    .options(selectinload(OAuthUser.user).joinedload(User.roles))
-                    .where(and_(OAuthUser.oauth_id == oauth_id, OAuthUser.oauth_name == self.OAUTH_SERVICE_NAME))
-                )
-                return result.scalars().first()
-            except exc.SQLAlchemyError:
-                logging.error("Could not fetch a oauth user '{}'".format(oauth_id), exc_info=True)
-                raise
+        try:
+            result = await self.session.execute(
+                select(OAuthUser)
+                .options(selectinload(OAuthUser.user).joinedload(User.roles))
+                .where(and_(OAuthUser.oauth_id == oauth_id, OAuthUser.oauth_name == self.OAUTH_SERVICE_NAME))
+            )
+            return result.scalars().first()
+        except exc.SQLAlchemyError:
+            logging.error("Could not fetch a oauth user '{}'".format(oauth_id), exc_info=True)
+            raise
 
     async def _create_oauth_user(self, user_id: str, oauth_id: str) -> OAuthUser | None:
-        async with self.get_session() as session, session.begin():
-            try:
-                oauth_user = OAuthUser(user_id=user_id, oauth_id=oauth_id, oauth_name=self.OAUTH_SERVICE_NAME)
-                session.add(oauth_user)
-                await session.commit()
-                return oauth_user
-            except exc.SQLAlchemyError:
-                await session.rollback()
-                logging.error("Could not create an oauth user '{}'".format(oauth_user.user_id), exc_info=True)
-                raise
+        try:
+            oauth_user = OAuthUser(user_id=user_id, oauth_id=oauth_id, oauth_name=self.OAUTH_SERVICE_NAME)
+            self.session.add(oauth_user)
+            await self.session.flush()
+            return oauth_user
+        except exc.SQLAlchemyError:
+            logging.error("Could not create an oauth user '{}'".format(oauth_user.user_id), exc_info=True)
+            raise
 
     async def create_oauth(
         self, oauth_id: str, email: str, first_name: str | None, last_name: str | None
@@ -120,7 +117,7 @@ OAUTH_SERVICE_REGISTRY = {
 
 def get_oauth_service(
     provider: str = "yandex",
-    pg_connection: AsyncEngine = Depends(get_pg_connection),
+    session: AsyncSession = Depends(get_db_session),
     redis: Redis | None = Depends(get_redis),
     role_service: RoleService = Depends(get_role_service),
     user_service: UserService = Depends(get_user_service),
@@ -128,4 +125,4 @@ def get_oauth_service(
     service_class: Type[BaseOAuthService] = OAUTH_SERVICE_REGISTRY.get(provider.lower())
     if not service_class:
         raise ValueError(f"Unsupported provider: {provider}")
-    return service_class(pg_connection=pg_connection, redis=redis, role_service=role_service, user_service=user_service)
+    return service_class(session=session, redis=redis, role_service=role_service, user_service=user_service)
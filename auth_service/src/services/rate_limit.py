@@ -1,42 +1,84 @@
-import datetime
-import redis
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from src.core.config import redis_settings
+import logging
 
+import jwt
+from async_fastapi_jwt_auth import AuthJWT
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from redis.exceptions import RedisError
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.core import dependencies
+from src.core.config import rate_limit_settings
+from src.core.dependencies import get_rate_limiter
+from src.core.signing import decode_token
 
-# Установим лимит на 10 запросов в минуту
-REQUEST_LIMIT_PER_MINUTE = 10
 
-# Создайте подключение к Redis
-redis_conn = redis.Redis(host=redis_settings.host, port=redis_settings.port, db=0)
+def get_client_ip(request: HTTPConnection) -> str:
+    """Get client IP, nginx passes it in X-Real-IP."""
+    return request.headers.get("X-Real-IP") or (request.client.host if request.client else "unknown")
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        authorize = request.scope.get("authorize")
+def get_user_subject(request: HTTPConnection) -> str | None:
+    """Get subject of a valid access token of the request, without hitting the denylist."""
+    token = request.cookies.get(AuthJWT._access_cookie_key)
+    if not token:
+        header = request.headers.get(AuthJWT._header_name, "")
+        header_type, _, token = header.partition(" ")
+        if header_type != AuthJWT._header_type:
+            return None
+    try:
+        return decode_token(token, dependencies.key_ring).get("sub")
+    except jwt.InvalidTokenError:
+        return None
 
-        if not authorize:
-            return await call_next(request)
 
-        await authorize.jwt_required()
+def get_rate_limit_key(request: HTTPConnection, key_type: str) -> str:
+    """Get identity the request is limited by, falling back to the client IP."""
+    if key_type == "user" and (subject := get_user_subject(request)):
+        return f"user:{subject}"
+    if key_type == "client" and (client_id := request.headers.get(rate_limit_settings.client_header)):
+        return f"client:{client_id}"
+    return f"ip:{get_client_ip(request)}"
 
-        current_user = await authorize.get_jwt_subject()
-        if not current_user:
-            raise HTTPException(status_code=401, detail="Unauthorized")
 
-        # Логика ограничения скорости
-        now = datetime.datetime.now()
-        key = f"{current_user}:{now.minute}"
+class RateLimitMiddleware:
+    """Check the rate limit of every HTTP request, rejected requests never reach the application."""
 
-        pipe = redis_conn.pipeline()
-        pipe.incr(key, 1)
-        pipe.expire(key, 59)
-        result = await pipe.execute()
-        request_number = result[0]
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        if request_number > REQUEST_LIMIT_PER_MINUTE:
-            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests")
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        rate_limiter = await get_rate_limiter()
+        if scope["type"] != "http" or not rate_limiter:
+            await self.app(scope, receive, send)
+            return
 
-        response = await call_next(request)
-        return response
+        route, policy = rate_limiter.get_policy(scope["method"], scope["path"])
+        if not policy:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{route}:{get_rate_limit_key(HTTPConnection(scope), policy.key)}"
+        try:
+            result = await rate_limiter.hit(key=key, policy=policy)
+        except RedisError:
+            # Fail open: losing the rate limit is better than losing the service.
+            logging.error("Rate limit check failed for '{}'".format(key), exc_info=True)
+            await self.app(scope, receive, send)
+            return
+
+        headers = result.get_headers()
+        if not result.allowed:
+            response = ORJSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS, content={"detail": "Too Many Requests"}, headers=headers
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
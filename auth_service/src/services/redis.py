@@ -1,53 +1,168 @@
+import time
+
 from fastapi import Depends
 from redis import Redis
-from src.core.config.base import base_auth_jwt_settings
+from src.core.denylist import REVOKED_TOKENS_CHANNEL, TOKEN_EPOCHS_CHANNEL, get_epoch_key, get_revoke_key
 from src.core.dependencies import get_redis
+from src.core.token_issuer import TokenPair
+
+# Bump the epoch and announce the new value atomically, so no worker can cache an older one after the publish.
+BUMP_EPOCH_SCRIPT = """
+local epoch = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', ARGV[1], epoch .. ' ' .. KEYS[1])
+return epoch
+"""
+
+# KEYS[1]: session index, ARGV[1]: now, ARGV[2]: "1" to drop other sessions, ARGV[3..]: member, expires at pairs.
+# Expired members are pruned on every write and the index itself expires with its last token.
+ADD_SESSIONS_SCRIPT = """
+if ARGV[2] == '1' then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+end
+for i = 3, #ARGV, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[i + 1], ARGV[i])
+end
+local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+if last[2] then
+    redis.call('EXPIREAT', KEYS[1], math.ceil(tonumber(last[2])))
+end
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+# KEYS[1]: session index, KEYS[2]: rotated refresh tokens, KEYS[3]: token epoch
+# ARGV[1]: now, ARGV[2]: presented member, ARGV[3]: presented jti, ARGV[4]: presented expires at,
+# ARGV[5]: new member, ARGV[6]: new expires at, ARGV[7]: token epochs channel
+# Returns 1 when rotated, 0 for a token that is not an active session and -1 when a rotated token is reused:
+# then the epoch is bumped, revoking every token of the user, and the user's sessions are dropped.
+ROTATE_REFRESH_SCRIPT = """
+local expires_at = redis.call('ZSCORE', KEYS[1], ARGV[2])
+if expires_at and tonumber(expires_at) > tonumber(ARGV[1]) then
+    redis.call('ZREM', KEYS[1], ARGV[2])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    redis.call('ZADD', KEYS[1], ARGV[6], ARGV[5])
+    local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+    redis.call('EXPIREAT', KEYS[1], math.ceil(tonumber(last[2])))
+
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[3])
+    last = redis.call('ZRANGE', KEYS[2], -1, -1, 'WITHSCORES')
+    redis.call('EXPIREAT', KEYS[2], math.ceil(tonumber(last[2])))
+    return 1
+end
+if redis.call('ZSCORE', KEYS[2], ARGV[3]) then
+    local epoch = redis.call('INCR', KEYS[3])
+    redis.call('PUBLISH', ARGV[7], epoch .. ' ' .. KEYS[3])
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return -1
+end
+return 0
+"""
+
+REFRESH_ROTATED = 1
+REFRESH_UNKNOWN = 0
+REFRESH_REUSED = -1
+
+
+def get_sessions_key(email: str) -> str:
+    """Get Redis key of the sorted set with the user's active tokens scored by expiration time."""
+    return f"{email}:sessions"
+
+
+def get_rotated_key(email: str) -> str:
+    """Get Redis key of the sorted set with jtis of the user's rotated refresh tokens scored by expiration time."""
+    return f"{email}:rotated"
 
 
 class RedisService:
     def __init__(self, redis: Redis) -> None:
         self.redis = redis
+        self._bump_epoch = redis.register_script(BUMP_EPOCH_SCRIPT)
+        self._add_sessions = redis.register_script(ADD_SESSIONS_SCRIPT)
+        self._rotate_refresh = redis.register_script(ROTATE_REFRESH_SCRIPT)
+
+    async def add_sessions(self, email: str, sessions: dict[str, float], drop_others: bool = False) -> int:
+        """Add tokens to the user's session index.
 
-    async def _delete_token_by_email(self, email: str, token: str) -> None:
-        async for key in self.redis.scan_iter(f"{email}:{token}:*"):
-            await self.redis.delete(key)
+        :param sessions: mapping of "<token_name>:<token>" to the unix time the token expires at
+        :param drop_others: delete every other session of the user in the same round trip
+        """
+        args = [time.time(), int(drop_others)]
+        for member, expires_at in sessions.items():
+            args.extend((member, expires_at))
+        return await self._add_sessions(keys=[get_sessions_key(email)], args=args)
 
     async def delete_tokens(self, email: str) -> None:
-        async with self.redis.pipeline() as p:
-            await self._delete_token_by_email(email, "access_token")
-            await self._delete_token_by_email(email, "refresh_token")
-            await p.execute()
+        await self.redis.delete(get_sessions_key(email))
 
-    async def set_tokens(self, email: str, access_token: str, refresh_token: str) -> None:
-        async with self.redis.pipeline() as p:
-            await self.delete_tokens(email=email)
-            await p.setex(
-                f"{email}:access_token:{access_token}",
-                base_auth_jwt_settings.access_expires_time,
-                access_token,
-            )
-            await p.setex(
-                f"{email}:refresh_token:{refresh_token}",
-                base_auth_jwt_settings.refresh_expires_time,
-                refresh_token,
-            )
-            await p.execute()
+    async def set_tokens(self, email: str, tokens: TokenPair) -> None:
+        await self.add_sessions(
+            email=email,
+            sessions={
+                f"access_token:{tokens.access_token}": tokens.access_expires_at,
+                f"refresh_token:{tokens.refresh_token}": tokens.refresh_expires_at,
+            },
+            drop_others=True,
+        )
 
     async def check_token_exists(self, email: str, token_name: str, token_value: str) -> bool:
-        return bool(await self.redis.get(f"{email}:{token_name}:{token_value}"))
+        expires_at = await self.redis.zscore(get_sessions_key(email), f"{token_name}:{token_value}")
+        return expires_at is not None and expires_at > time.time()
+
+    async def set_refresh_token(self, email: str, refresh_token: str, expires_at: int) -> None:
+        """Make the refresh token the only session of the user, scored by its "exp"."""
+        await self.add_sessions(email=email, sessions={f"refresh_token:{refresh_token}": expires_at}, drop_others=True)
+
+    async def rotate_refresh_token(
+        self, email: str, refresh_claims: dict, refresh_token: str, new_refresh_token: str, new_expires_at: int
+    ) -> int:
+        """Replace the presented refresh token with the new one in a single script call.
+
+        Sessions are scored by the "exp" of their tokens, so a session lives exactly as long as its token.
+
+        :return: REFRESH_ROTATED, REFRESH_UNKNOWN if the token is not an active session (e.g. dropped by a later
+            login) or REFRESH_REUSED if it has already been rotated, then every token of the user is revoked
+        """
+        return await self._rotate_refresh(
+            keys=[get_sessions_key(email), get_rotated_key(email), get_epoch_key(email)],
+            args=[
+                time.time(),
+                f"refresh_token:{refresh_token}",
+                refresh_claims["jti"],
+                refresh_claims["exp"],
+                f"refresh_token:{new_refresh_token}",
+                new_expires_at,
+                TOKEN_EPOCHS_CHANNEL,
+            ],
+        )
 
-    async def set_refresh_token(self, email: str, refresh_token: str) -> None:
+    async def revoke_token(self, email: str, token_name: str, token_value: str, ttl: int) -> None:
+        await self.revoke_tokens(email=email, tokens={token_name: (token_value, ttl)})
+
+    async def revoke_tokens(self, email: str, tokens: dict[str, tuple[str, int]]) -> None:
+        """Revoke tokens in one round trip.
+
+        :param tokens: mapping of token name ("access" or "refresh") to its jti and seconds until it expires
+        """
         async with self.redis.pipeline() as p:
-            await self.delete_tokens(email=email)
-            await p.setex(
-                f"{email}:refresh_token:{refresh_token}",
-                base_auth_jwt_settings.refresh_expires_time,
-                refresh_token,
-            )
+            for token_name, (jti, ttl) in tokens.items():
+                revoke_key = get_revoke_key(email=email, token_name=token_name, jti=jti)
+                await p.setex(revoke_key, max(ttl, 1), "true")
+                # Tell every worker to update its denylist cache.
+                await p.publish(REVOKED_TOKENS_CHANNEL, revoke_key)
             await p.execute()
 
-    async def revoke_token(self, email: str, token_name: str, token_value: str, ttl: int) -> None:
-        await self.redis.setex(f"{email}:revoke:{token_name}:{token_value}", ttl, "true")
+    async def get_token_epoch(self, email: str) -> int:
+        return int(await self.redis.get(get_epoch_key(email)) or 0)
+
+    async def revoke_all_tokens(self, email: str) -> int:
+        """Revoke every token issued to the user so far by bumping the token epoch.
+
+        The epoch key never expires: resetting it to 0 would make already revoked tokens valid again.
+        """
+        return await self._bump_epoch(keys=[get_epoch_key(email)], args=[TOKEN_EPOCHS_CHANNEL])
 
 
 def get_redis_service(redis: Redis = Depends(get_redis)) -> RedisService:
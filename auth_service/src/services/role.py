@@ -1,13 +1,21 @@
 import logging
+from typing import Iterable
 from uuid import UUID
 
 from fastapi import Depends
 from fastapi.encoders import jsonable_encoder
 from redis.asyncio import Redis
 from sqlalchemy import and_, delete, exc, insert, select, update
-from sqlalchemy.ext.asyncio import AsyncEngine
-from sqlalchemy.orm import selectinload
-from src.core.dependencies import get_pg_connection, get_redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.dependencies import (
+    call_after_commit,
+    get_db_session,
+    get_redis,
+    get_role_catalog,
+    get_user_roles_cache,
+)
+from src.core.role_catalog import RoleCatalog
+from src.core.user_roles import UserRoles, UserRolesCache
 from src.models.db import User
 from src.models.db.role import Role, association_table
 from src.models.role import RoleCRUD, RoleInDB
@@ -15,116 +23,151 @@ from src.services.base import BaseService
 
 
 class RoleService(BaseService):
-    async def get_user_roles_ids(self, user_id: UUID) -> list[RoleCRUD]:
-        async with self.get_session() as session:
-            async with session.begin():
-                query = await session.execute(select(User).options(selectinload(User.roles)).where(User.id == user_id))
-                user = query.scalars().first()
-                if user:
-                    roles = user.roles
-                    return [role.id for role in roles]
-                else:
-                    return []
-
-    async def get_by_id(self, role_id: UUID) -> Role | None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    return (await session.scalars(select(Role).where(Role.id == role_id))).first()
-                except exc.SQLAlchemyError:
-                    logging.error("Could not fetch role with role_id = '{}'".format(role_id), exc_info=True)
-
-    async def get_by_name(self, role_name: str) -> Role | None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    return (await session.scalars(select(Role).where(Role.name == role_name))).first()
-                except exc.SQLAlchemyError:
-                    logging.error("Could not fetch role with role_name = '{}'".format(role_name), exc_info=True)
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        role_catalog: RoleCatalog | None = None,
+        user_roles_cache: UserRolesCache | None = None,
+    ):
+        super().__init__(session, redis)
+        self.role_catalog = role_catalog
+        self.user_roles_cache = user_roles_cache
+
+    def _publish_changed(self) -> None:
+        if self.role_catalog:
+            call_after_commit(self.session, self.role_catalog.publish_changed)
+
+    async def get_user_roles(self, user_id: UUID) -> UserRoles | None:
+        """Get role ids and access level of the user, None if there is no such user."""
+        version = None
+        if self.user_roles_cache:
+            if user_roles := await self.user_roles_cache.get(user_id):
+                return user_roles
+            version = await self.user_roles_cache.get_version(user_id)
+
+        rows = (
+            await self.session.execute(
+                select(User.access_level, association_table.c.role_id)
+                .outerjoin(association_table, association_table.c.user_id == User.id)
+                .where(User.id == user_id)
+            )
+        ).all()
+        if not rows:
+            return None
+        user_roles = UserRoles(
+            role_ids=frozenset(role_id for _, role_id in rows if role_id), access_level=rows[0].access_level
+        )
+        if self.user_roles_cache:
+            await self.user_roles_cache.fill(user_id, user_roles, version)
+        return user_roles
+
+    async def get_user_roles_ids(self, user_id: UUID) -> list[UUID]:
+        user_roles = await self.get_user_roles(user_id)
+        return list(user_roles.role_ids) if user_roles else []
+
+    async def get_role_names(self, role_ids: Iterable[UUID]) -> list[str]:
+        role_ids = list(role_ids)
+        if self.role_catalog and self.role_catalog.is_fresh:
+            return [role.name for role_id in role_ids if (role := self.role_catalog.get_by_id(role_id))]
+        if not role_ids:
+            return []
+        return list((await self.session.scalars(select(Role.name).where(Role.id.in_(role_ids)))).all())
+
+    async def get_by_id(self, role_id: UUID) -> Role | RoleInDB | None:
+        if self.role_catalog and self.role_catalog.is_fresh:
+            return self.role_catalog.get_by_id(role_id)
+        try:
+            return (await self.session.scalars(select(Role).where(Role.id == role_id))).first()
+        except exc.SQLAlchemyError:
+            logging.error("Could not fetch role with role_id = '{}'".format(role_id), exc_info=True)
+
+    async def get_by_name(self, role_name: str) -> Role | RoleInDB | None:
+        if self.role_catalog and self.role_catalog.is_fresh:
+            return self.role_catalog.get_by_name(role_name)
+        try:
+            return (await self.session.scalars(select(Role).where(Role.name == role_name))).first()
+        except exc.SQLAlchemyError:
+            logging.error("Could not fetch role with role_name = '{}'".format(role_name), exc_info=True)
 
     async def get_list(self) -> list[RoleInDB] | None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    roles = (await session.scalars(select(Role))).all()
-                    return [RoleInDB(id=role.id, name=role.name) for role in roles]
-                except exc.SQLAlchemyError:
-                    logging.error("Could not fetch list of roles", exc_info=True)
-                    raise
+        if self.role_catalog and self.role_catalog.is_fresh:
+            return self.role_catalog.get_list()
+        try:
+            roles = (await self.session.scalars(select(Role))).all()
+            return [RoleInDB(id=role.id, name=role.name) for role in roles]
+        except exc.SQLAlchemyError:
+            logging.error("Could not fetch list of roles", exc_info=True)
+            raise
 
     async def create(self, role_data: RoleCRUD) -> RoleInDB:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    role_dto = jsonable_encoder(role_data)
-                    role = Role(**role_dto)
-                    session.add(role)
-                    await session.commit()
-                    return role
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error("Could not create a role with name '{}'".format(role_data.name), exc_info=True)
-                    raise
-
-    async def update(self, role: Role, role_data: RoleCRUD) -> RoleInDB:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    await session.execute(update(Role).where(Role.id == role.id).values(name=role_data.name))
-                    await session.commit()
-                    return role
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error("Could not update a role with name '{}'".format(role_data.name), exc_info=True)
-                    raise
-
-    async def delete(self, role: Role) -> RoleInDB:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    await session.execute(delete(association_table).where(association_table.c.role_id == role.id))
-                    await session.delete(role)
-                    await session.commit()
-                    return role
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error("Could not delete a role with name '{}'".format(role.name), exc_info=True)
-                    raise
-
-    async def assign_role(self, role: Role, user: User) -> None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    await session.execute(insert(association_table).values(role_id=role.id, user_id=user.id))
-                    await session.commit()
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error(
-                        "Could not assign a role '{}' to a user '{}'".format(role.name, user.email), exc_info=True
-                    )
-                    raise
-
-    async def revoke_role(self, role: Role, user: User) -> None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    await session.execute(
-                        delete(association_table).where(
-                            and_(association_table.c.role_id == role.id, association_table.c.user_id == user.id)
-                        )
-                    )
-                    await session.commit()
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error(
-                        "Could not revoke a role '{}' from a user '{}'".format(role.name, user.email), exc_info=True
-                    )
-                    raise
+        try:
+            role_dto = jsonable_encoder(role_data)
+            role = Role(**role_dto)
+            self.session.add(role)
+            await self.session.flush()
+            self._publish_changed()
+            return role
+        except exc.SQLAlchemyError:
+            logging.error("Could not create a role with name '{}'".format(role_data.name), exc_info=True)
+            raise
+
+    async def update(self, role: Role | RoleInDB, role_data: RoleCRUD) -> RoleInDB:
+        try:
+            await self.session.execute(update(Role).where(Role.id == role.id).values(name=role_data.name))
+            self._publish_changed()
+            return RoleInDB(id=role.id, name=role_data.name)
+        except exc.SQLAlchemyError:
+            logging.error("Could not update a role with name '{}'".format(role_data.name), exc_info=True)
+            raise
+
+    async def delete(self, role: Role | RoleInDB) -> RoleInDB:
+        try:
+            user_ids = (
+                await self.session.scalars(
+                    delete(association_table)
+                    .where(association_table.c.role_id == role.id)
+                    .returning(association_table.c.user_id)
+                )
+            ).all()
+            # A statement, role may come from the catalog and not belong to the session.
+            await self.session.execute(delete(Role).where(Role.id == role.id))
+            self._publish_changed()
+            if self.user_roles_cache:
+                call_after_commit(self.session, lambda: self.user_roles_cache.invalidate(user_ids))
+            return RoleInDB(id=role.id, name=role.name)
+        except exc.SQLAlchemyError:
+            logging.error("Could not delete a role with name '{}'".format(role.name), exc_info=True)
+            raise
+
+    async def assign_role(self, role: Role | RoleInDB, user: User) -> None:
+        try:
+            await self.session.execute(insert(association_table).values(role_id=role.id, user_id=user.id))
+            if self.user_roles_cache:
+                call_after_commit(self.session, lambda: self.user_roles_cache.invalidate([user.id]))
+        except exc.SQLAlchemyError:
+            logging.error("Could not assign a role '{}' to a user '{}'".format(role.name, user.email), exc_info=True)
+            raise
+
+    async def revoke_role(self, role: Role | RoleInDB, user: User) -> None:
+        try:
+            await self.session.execute(
+                delete(association_table).where(
+                    and_(association_table.c.role_id == role.id, association_table.c.user_id == user.id)
+                )
+            )
+            if self.user_roles_cache:
+                call_after_commit(self.session, lambda: self.user_roles_cache.invalidate([user.id]))
+        except exc.SQLAlchemyError:
+            logging.error("Could not revoke a role '{}' from a user '{}'".format(role.name, user.email), exc_info=True)
+            raise
 
 
 def get_role_service(
-    pg_connection: AsyncEngine = Depends(get_pg_connection),
+    session: AsyncSession = Depends(get_db_session),
     redis: Redis | None = Depends(get_redis),
+    role_catalog: RoleCatalog | None = Depends(get_role_catalog),
+    user_roles_cache: UserRolesCache | None = Depends(get_user_roles_cache),
 ) -> RoleService:
     """Get RoleService instance."""
-    return RoleService(pg_connection=pg_connection, redis=redis)
+    return RoleService(session=session, redis=redis, role_catalog=role_catalog, user_roles_cache=user_roles_cache)
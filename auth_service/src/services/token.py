@@ -0,0 +1,61 @@
+import hashlib
+import time
+
+import jwt
+from fastapi import Depends
+from src.core.config import base_auth_jwt_settings
+from src.core.denylist import DenylistCache
+from src.core.dependencies import get_denylist_cache, get_key_ring
+from src.core.signing import KeyRing, decode_token
+from src.models.token import TokenIntrospection
+
+# Claims the denylist is keyed by, tokens of this service always carry them.
+REQUIRED_CLAIMS = ["sub", "type", "jti", "exp"]
+
+
+class TokenService:
+    def __init__(self, denylist_cache: DenylistCache, key_ring: KeyRing | None) -> None:
+        self.denylist_cache = denylist_cache
+        self.key_ring = key_ring
+
+    async def introspect(self, tokens: list[str]) -> list[TokenIntrospection]:
+        """Verify tokens and check all of them against the denylist with at most one Redis round trip.
+
+        Every answer may be cached by the token hash for the rest of the token's lifetime, capped by
+        AUTHJWT_INTROSPECT_MAX_AGE: a valid token can only become revoked, an invalid one never becomes valid.
+        """
+        now = int(time.time())
+        max_age = base_auth_jwt_settings.introspect_max_age
+        decoded = {}
+        for index, token in enumerate(tokens):
+            try:
+                decoded[index] = decode_token(token, self.key_ring, options={"require": REQUIRED_CLAIMS})
+            except jwt.InvalidTokenError:
+                pass
+        revoked = dict(zip(decoded, await self.denylist_cache.are_tokens_revoked(list(decoded.values()))))
+
+        results = []
+        for index, token in enumerate(tokens):
+            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            if index not in decoded:
+                results.append(TokenIntrospection(token_hash=token_hash, active=False, max_age=max_age))
+                continue
+            claims = decoded[index]
+            results.append(
+                TokenIntrospection(
+                    token_hash=token_hash,
+                    active=not revoked[index],
+                    claims=None if revoked[index] else claims,
+                    exp=claims["exp"],
+                    max_age=max(min(claims["exp"] - now, max_age), 0),
+                )
+            )
+        return results
+
+
+def get_token_service(
+    denylist_cache: DenylistCache = Depends(get_denylist_cache),
+    key_ring: KeyRing | None = Depends(get_key_ring),
+) -> TokenService:
+    """Get TokenService instance."""
+    return TokenService(denylist_cache=denylist_cache, key_ring=key_ring)
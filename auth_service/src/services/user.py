@@ -1,4 +1,8 @@
+import asyncio
+import base64
+import json
 import logging
+from datetime import datetime, timezone
 from uuid import UUID
 
 from fastapi import Depends, HTTPException
@@ -7,18 +11,43 @@ from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
 from pydantic import BaseModel
 from redis.asyncio import Redis
-from sqlalchemy import exc
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy import Select, exc, func, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from src.core.dependencies import get_pg_connection, get_redis
+from src.core.dependencies import get_db_session, get_password_hasher, get_redis, release_connection
+from src.core.hashing import PasswordHasher, PasswordHasherOverloadedError
+from src.core.metrics import metrics
 from src.models.db.user import User, UserLoginHistory
-from src.models.user import UserCreate, UserInDB, UserLoginHistoryCreate, UserLoginHistoryInDB
+from src.models.user import UserCreate, UserInDB, UserLoginHistoryCursorPage, UserLoginHistoryInDB
 from src.services.base import BaseService
 from starlette import status
 
+# Keep references to fire-and-forget tasks, otherwise they may be garbage collected before completion.
+_background_tasks: set[asyncio.Task] = set()
+
+
+def encode_history_cursor(login_time: datetime, record_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{login_time.isoformat()}|{record_id}".encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a cursor made by encode_history_cursor, raise ValueError for anything else."""
+    login_time, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(login_time), UUID(record_id)
+
+
+def _to_naive_utc(value: datetime | None) -> datetime | None:
+    """login_time is stored as naive UTC."""
+    if value and value.tzinfo:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
 class UserService(BaseService):
+    def __init__(self, session: AsyncSession, redis: Redis, password_hasher: PasswordHasher):
+        super().__init__(session, redis)
+        self.password_hasher = password_hasher
+
     @staticmethod
     async def _check_model_exists_by_id(session: AsyncSession, model: type[BaseModel], model_id: UUID) -> bool:
         query = await session.execute(select(model).where(model.id == model_id))
@@ -26,90 +55,164 @@ class UserService(BaseService):
 
     @staticmethod
     async def _check_user_exists(session: AsyncSession, email: str) -> bool:
-        query = await session.execute(select(User).where(User.email == email))  # noqa
+        query = await session.execute(select(User).where(func.lower(User.email) == email.lower()))  # noqa
         return bool(query.unique().fetchone())
 
     async def _get_user(self, session: AsyncSession, email: str) -> User:
-        query = await session.execute(select(User).where(User.email == email))  # noqa
+        query = await session.execute(select(User).where(func.lower(User.email) == email.lower()))  # noqa
         return query.scalar()
 
     async def get_by_email(self, user_email: str) -> User | None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    return (
-                        await session.scalars(
-                            select(User).where(User.email == user_email).options(selectinload(User.roles))  # noqa
-                        )
-                    ).first()
-                except exc.SQLAlchemyError:
-                    logging.error("Something went wrong", exc_info=True)
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Something went wrong",
-                    )
-
-    async def get_user_login_history(self, email: str) -> Page[UserLoginHistoryInDB]:
-        async with self.get_session() as session:
-            async with session.begin():
-                return await paginate(session, select(UserLoginHistory).join(User).filter(User.email == email))
+        try:
+            return (
+                await self.session.scalars(select(User).where(func.lower(User.email) == user_email.lower()))
+            ).first()
+        except exc.SQLAlchemyError:
+            logging.error("Something went wrong", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Something went wrong",
+            )
+
+    async def check_password(self, user: User, password: str) -> bool:
+        """Check user password and upgrade its hash in the background if the hash policy has changed."""
+        await release_connection(self.session)
+        if not await self.password_hasher.verify(user.password, password):
+            return False
+
+        if self.password_hasher.needs_rehash(user.password):
+            task = asyncio.create_task(
+                self._rehash_password(user_id=user.id, old_hash=user.password, password=password)
+            )
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return True
+
+    async def _rehash_password(self, user_id: UUID, old_hash: str, password: str) -> None:
+        try:
+            new_hash = await self.password_hasher.hash(password)
+        except PasswordHasherOverloadedError:
+            logging.info("Skip password rehash for user '{}': hasher is overloaded".format(user_id))
+            return
+
+        # Runs after the request has finished, so it can't use the request session.
+        # The transaction is rolled back by begin() on any error, including a failed commit, before it is logged.
+        try:
+            async with AsyncSession(self.session.bind) as session, session.begin():
+                # Compare-and-swap: do not overwrite a password changed in the meantime.
+                await session.execute(
+                    update(User).where(User.id == user_id, User.password == old_hash).values(password=new_hash)
+                )
+        except (exc.SQLAlchemyError, OSError):
+            logging.error("Could not rehash password for user '{}'".format(user_id), exc_info=True)
+            return
+        metrics.inc("password_rehash_total")
+
+    async def get_user_login_history(self, user_id: UUID) -> Page[UserLoginHistoryInDB]:
+        return await paginate(
+            self.session,
+            select(UserLoginHistory)
+            .where(UserLoginHistory.user_id == user_id)
+            .order_by(UserLoginHistory.login_time.desc(), UserLoginHistory.id.desc()),
+        )
+
+    async def get_user_login_history_page(
+        self,
+        user_id: UUID,
+        size: int,
+        cursor: str | None = None,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+        estimate_total: bool = False,
+    ) -> UserLoginHistoryCursorPage:
+        """Get a page of login history, newest first, seeking by (login_time, id) instead of OFFSET.
+
+        Bounds are [from_time, to_time) and let Postgres skip partitions outside of them.
+        """
+        from_time, to_time = _to_naive_utc(from_time), _to_naive_utc(to_time)
+        conditions = [UserLoginHistory.user_id == user_id]
+        if from_time:
+            conditions.append(UserLoginHistory.login_time >= from_time)
+        if to_time:
+            conditions.append(UserLoginHistory.login_time < to_time)
+
+        query_conditions = list(conditions)
+        if cursor:
+            cursor_time, cursor_id = decode_history_cursor(cursor)
+            query_conditions.append(UserLoginHistory.login_time <= cursor_time)
+            query_conditions.append(
+                tuple_(UserLoginHistory.login_time, UserLoginHistory.id) < tuple_(cursor_time, cursor_id)
+            )
+
+        records = (
+            await self.session.scalars(
+                select(UserLoginHistory)
+                .where(*query_conditions)
+                .order_by(UserLoginHistory.login_time.desc(), UserLoginHistory.id.desc())
+                .limit(size + 1)
+            )
+        ).all()
+
+        next_cursor = None
+        if len(records) > size:
+            records = records[:size]
+            next_cursor = encode_history_cursor(records[-1].login_time, records[-1].id)
+
+        return UserLoginHistoryCursorPage(
+            items=[UserLoginHistoryInDB.model_validate(record) for record in records],
+            next_cursor=next_cursor,
+            estimated_total=(
+                await self._estimate_count(select(UserLoginHistory.id).where(*conditions)) if estimate_total else None
+            ),
+        )
+
+    async def _estimate_count(self, query: Select) -> int:
+        """Get the planner row estimate for query, cheap compared to COUNT(*) over all partitions."""
+        compiled = query.compile(dialect=self.session.bind.dialect, compile_kwargs={"literal_binds": True})
+        plan = (await self.session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
     async def get_by_id(self, user_id: UUID) -> User | None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    return (await session.scalars(select(User).where(User.id == user_id))).first()
-                except exc.SQLAlchemyError:
-                    logging.error("Something went wrong", exc_info=True)
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Something went wrong",
-                    )
+        try:
+            return (await self.session.scalars(select(User).where(User.id == user_id))).first()
+        except exc.SQLAlchemyError:
+            logging.error("Something went wrong", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Something went wrong",
+            )
 
     async def create(self, user_create: UserCreate) -> UserInDB | None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    user_dto = jsonable_encoder(user_create)
-                    user = User(**user_dto)
-                    session.add(user)
-                    await session.commit()
-                    return user
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error("Something went wrong", exc_info=True)
-                    raise
-
-    async def create_history_record(self, user_login_history: UserLoginHistoryCreate) -> None:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    user_login_history_dto = jsonable_encoder(user_login_history)
-                    history = UserLoginHistory(**user_login_history_dto)
-                    session.add(history)
-                    await session.commit()
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error("Unable to add login history record", exc_info=True)
-                    raise
+        user_dto = jsonable_encoder(user_create)
+        await release_connection(self.session)
+        password_hash = await self.password_hasher.hash(user_dto.pop("password"))
+        try:
+            user = User(**user_dto, password_hash=password_hash)
+            self.session.add(user)
+            await self.session.flush()
+            return user
+        except exc.SQLAlchemyError:
+            logging.error("Something went wrong", exc_info=True)
+            raise
 
     async def update_credentials(self, user: User, new_password: str) -> UserInDB:
-        async with self.get_session() as session:
-            async with session.begin():
-                try:
-                    user.set_password(new_password)
-                    session.add(user)
-                    await session.commit()
-                    return UserInDB.model_validate(user)
-                except exc.SQLAlchemyError:
-                    await session.rollback()
-                    logging.error("Something went wrong", exc_info=True)
-                    raise
+        await release_connection(self.session)
+        user.password = await self.password_hasher.hash(new_password)
+        try:
+            self.session.add(user)
+            await self.session.flush()
+            return UserInDB.model_validate(user)
+        except exc.SQLAlchemyError:
+            logging.error("Something went wrong", exc_info=True)
+            raise
 
 
 def get_user_service(
-    pg_connection: AsyncEngine = Depends(get_pg_connection),
+    session: AsyncSession = Depends(get_db_session),
     redis: Redis | None = Depends(get_redis),
+    password_hasher: PasswordHasher = Depends(get_password_hasher),
 ) -> UserService:
     """Get UserService instance."""
-    return UserService(pg_connection=pg_connection, redis=redis)
+    return UserService(session=session, redis=redis, password_hasher=password_hasher)
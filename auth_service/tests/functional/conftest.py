@@ -41,3 +41,23 @@ async def test_user(session):
         body = await response.json()
 
     return body
+
+
+@pytest_asyncio.fixture()
+async def wait_for_login_history(session):
+    """Wait until the background writer has flushed the expected number of login history records."""
+
+    async def inner(access_token: str, expected_total: int, timeout: float = 10) -> None:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            async with session.get(
+                f"{test_settings.service_url}/api/v1/users/history",
+                cookies={"access_token_cookie": access_token},
+            ) as response:
+                total = (await response.json()).get("total")
+            if total is not None and total >= expected_total:
+                return
+            assert asyncio.get_running_loop().time() < deadline, "Login history was not flushed in time"
+            await asyncio.sleep(0.1)
+
+    return inner
@@ -12,6 +12,8 @@ class TestSettings(BaseSettings):
     redis_host: str = Field("127.0.0.1:6379", alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
     service_url: str = Field("http://127.0.0.1:8000", alias="SERVICE_URL")
+    jwt_secret_key: str = Field("", alias="AUTHJWT_SECRET_KEY")
+    jwt_refresh_expires_time: int = Field(604800, alias="AUTHJWT_REFRESH_EXPIRES_TIME")
 
     model_config = SettingsConfigDict(extra="ignore", env_file="tests.env")
 
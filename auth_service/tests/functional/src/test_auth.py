@@ -1,6 +1,8 @@
+import time
 import uuid
 from http import HTTPStatus
 
+import jwt
 import pytest
 from tests.functional.settings import test_settings
 
@@ -160,3 +162,121 @@ async def test_revoke_refresh_token(session):
         cookies={"refresh_token_cookie": refresh_token_cookie},
     ) as response:
         assert response.status == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse(session):
+    create_user_data = {
+        "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+        "password": "StrongPass123",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+    async with session.post(f"{test_settings.service_url}/api/v1/users/signup", json=create_user_data) as response:
+        assert response.status == HTTPStatus.CREATED
+
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/login",
+        json={
+            "email": create_user_data["email"],
+            "password": create_user_data["password"],
+        },
+    ) as response:
+        assert response.status == HTTPStatus.OK
+
+    refresh_token_cookie = response.cookies["refresh_token_cookie"]
+
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/refresh",
+        cookies={"refresh_token_cookie": refresh_token_cookie},
+    ) as response:
+        assert response.status == HTTPStatus.OK
+        rotated_refresh_token_cookie = response.cookies["refresh_token_cookie"]
+
+    # The rotated token is presented again: the whole family is revoked, including the new token.
+    for cookie in [refresh_token_cookie, rotated_refresh_token_cookie]:
+        async with session.post(
+            f"{test_settings.service_url}/api/v1/auth/refresh",
+            cookies={"refresh_token_cookie": cookie},
+        ) as response:
+            assert response.status == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_logout_all(session):
+    create_user_data = {
+        "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+        "password": "StrongPass123",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+    async with session.post(f"{test_settings.service_url}/api/v1/users/signup", json=create_user_data) as response:
+        assert response.status == HTTPStatus.CREATED
+
+    access_token_cookies = []
+    for _ in range(2):
+        async with session.post(
+            f"{test_settings.service_url}/api/v1/auth/login",
+            json={
+                "email": create_user_data["email"],
+                "password": create_user_data["password"],
+            },
+        ) as response:
+            assert response.status == HTTPStatus.OK
+            access_token_cookies.append(response.cookies["access_token_cookie"])
+
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/logout-all",
+        cookies={"access_token_cookie": access_token_cookies[0]},
+    ) as response:
+        assert response.status == HTTPStatus.OK
+
+    for access_token_cookie in access_token_cookies:
+        async with session.get(
+            f"{test_settings.service_url}/api/v1/users/history",
+            cookies={"access_token_cookie": access_token_cookie},
+        ) as response:
+            assert response.status == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_refresh_session_scored_by_token_exp(session, redis_client):
+    create_user_data = {
+        "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+        "password": "StrongPass123",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+    async with session.post(f"{test_settings.service_url}/api/v1/users/signup", json=create_user_data) as response:
+        assert response.status == HTTPStatus.CREATED
+
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/login",
+        json={"email": create_user_data["email"], "password": create_user_data["password"]},
+    ) as response:
+        assert response.status == HTTPStatus.OK
+        login_refresh_token = response.cookies["refresh_token_cookie"].value
+
+    sessions_key = f"{create_user_data['email']}:sessions"
+    login_claims = jwt.decode(login_refresh_token, options={"verify_signature": False})
+    assert await redis_client.zscore(sessions_key, f"refresh_token:{login_refresh_token}") == login_claims["exp"]
+
+    # A session of a refresh token living longer than AUTHJWT_REFRESH_EXPIRES_TIME, scored by its own "exp".
+    now = int(time.time())
+    expires_at = now + test_settings.jwt_refresh_expires_time + 86400
+    refresh_token = jwt.encode(
+        {**login_claims, "iat": now, "nbf": now, "jti": str(uuid.uuid4()), "exp": expires_at},
+        test_settings.jwt_secret_key,
+        algorithm="HS256",
+    )
+    await redis_client.zadd(sessions_key, {f"refresh_token:{refresh_token}": expires_at})
+
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/refresh",
+        cookies={"refresh_token_cookie": refresh_token},
+    ) as response:
+        assert response.status == HTTPStatus.OK
+        new_refresh_token = response.cookies["refresh_token_cookie"].value
+
+    new_claims = jwt.decode(new_refresh_token, options={"verify_signature": False})
+    assert await redis_client.zscore(sessions_key, f"refresh_token:{new_refresh_token}") == new_claims["exp"]
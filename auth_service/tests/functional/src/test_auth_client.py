@@ -0,0 +1,159 @@
+import hashlib
+import time
+
+import httpx
+import jwt
+import orjson
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from src.auth_client import JWKSCache, TokenVerifier
+from src.core.signing import SigningKey
+
+JWKS_URL = "http://auth/.well-known/jwks.json"
+ISSUER = "auth_service"
+
+
+def create_key(kid: str) -> SigningKey:
+    return SigningKey(kid=kid, algorithm="ES256", private_key=ec.generate_private_key(ec.SECP256R1()), active_from=None)
+
+
+class JWKSServer:
+    """JWKS endpoint of the auth service answering conditional requests, with a log of the requests."""
+
+    def __init__(self, keys: list[SigningKey], max_age: int = 3600) -> None:
+        self.keys = keys
+        self.max_age = max_age
+        self.available = True
+        self.requests: list[httpx.Request] = []
+        self.responses: list[httpx.Response] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.responses.append(response := self._respond(request))
+        return response
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        if not self.available:
+            return httpx.Response(httpx.codes.SERVICE_UNAVAILABLE)
+        body = orjson.dumps({"keys": [key.get_jwk() for key in self.keys]})
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={self.max_age}"}
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(httpx.codes.NOT_MODIFIED, headers=headers)
+        return httpx.Response(httpx.codes.OK, content=body, headers=headers)
+
+    def create_cache(self, **options) -> JWKSCache:
+        return JWKSCache(JWKS_URL, client=httpx.AsyncClient(transport=httpx.MockTransport(self)), **options)
+
+
+def create_token(key: SigningKey, **claims) -> str:
+    now = int(time.time())
+    claims = {"sub": "test@example.com", "type": "access", "iat": now, "exp": now + 60, "iss": ISSUER, **claims}
+    return jwt.encode(claims, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+
+@pytest.mark.asyncio
+async def test_key_found_by_kid():
+    current = create_key("current")
+    server = JWKSServer([current, create_key("next")])
+    jwks = server.create_cache()
+
+    key = await jwks.get_key("current")
+    assert key.kid == "current"
+    assert key.algorithm == "ES256"
+    assert key.key.public_numbers() == current.public_key.public_numbers()
+
+    # Known keys are served from the cache for max-age.
+    assert (await jwks.get_key("next")).kid == "next"
+    assert len(server.requests) == 1
+    await jwks.close()
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetched():
+    server = JWKSServer([create_key("current")])
+    jwks = server.create_cache(min_refresh_interval=0)
+    assert await jwks.get_key("current")
+
+    # The key published after the cache was filled is fetched on first use.
+    server.keys.append(create_key("next"))
+    assert (await jwks.get_key("next")).kid == "next"
+    assert len(server.requests) == 2
+    await jwks.close()
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetch_throttled():
+    server = JWKSServer([create_key("current")])
+    jwks = server.create_cache(min_refresh_interval=60)
+    assert await jwks.get_key("current")
+
+    # Tokens with made up key ids cannot make every verification a request to the auth service.
+    assert await jwks.get_key("unknown") is None
+    assert await jwks.get_key("unknown") is None
+    assert len(server.requests) == 1
+    await jwks.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_keys_revalidated_with_etag():
+    server = JWKSServer([create_key("current")], max_age=0)
+    jwks = server.create_cache()
+    assert await jwks.get_key("current")
+    assert "If-None-Match" not in server.requests[0].headers
+
+    # The unchanged set is answered with 304, the cached keys stay in use.
+    assert (await jwks.get_key("current")).kid == "current"
+    assert server.requests[1].headers["If-None-Match"] == server.responses[0].headers["ETag"]
+    assert server.responses[1].status_code == httpx.codes.NOT_MODIFIED
+    await jwks.close()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_jwks_keeps_known_keys():
+    server = JWKSServer([create_key("current")], max_age=0)
+    jwks = server.create_cache(min_refresh_interval=0)
+    assert await jwks.get_key("current")
+
+    server.available = False
+    assert (await jwks.get_key("current")).kid == "current"
+    assert server.responses[-1].status_code == httpx.codes.SERVICE_UNAVAILABLE
+    await jwks.close()
+
+
+@pytest.mark.asyncio
+async def test_verifier_accepts_token():
+    key = create_key("current")
+    verifier = TokenVerifier(jwks=JWKSServer([key]).create_cache(), issuer=ISSUER)
+
+    token = await verifier.verify(create_token(key, user_id="42"))
+    assert token.subject == "test@example.com"
+    assert token.user_id == "42"
+    await verifier.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "claims, error",
+    [
+        ({"exp": int(time.time()) - 1}, jwt.ExpiredSignatureError),
+        ({"iss": "another_service"}, jwt.InvalidIssuerError),
+        ({"type": "refresh"}, jwt.InvalidTokenError),
+    ],
+)
+async def test_verifier_rejects_token(claims: dict, error: type[Exception]):
+    key = create_key("current")
+    verifier = TokenVerifier(jwks=JWKSServer([key]).create_cache(), issuer=ISSUER)
+
+    with pytest.raises(error):
+        await verifier.verify(create_token(key, **claims))
+    await verifier.stop()
+
+
+@pytest.mark.asyncio
+async def test_verifier_rejects_unknown_kid():
+    verifier = TokenVerifier(jwks=JWKSServer([create_key("current")]).create_cache(), issuer=ISSUER)
+
+    with pytest.raises(jwt.InvalidTokenError, match="Unknown key id"):
+        await verifier.verify(create_token(create_key("forged")))
+    await verifier.stop()
@@ -0,0 +1,53 @@
+import asyncio
+import inspect
+import uuid
+from typing import Awaitable, Callable
+
+import pytest
+from src.core.denylist import DenylistCache
+from src.core.metrics import metrics
+from src.core.pubsub import RedisSubscriber
+from src.services.redis import RedisService
+
+
+async def wait_for(predicate: Callable[[], Awaitable[bool] | bool], timeout: float = 5) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        result = predicate()
+        if inspect.isawaitable(result):
+            result = await result
+        if result:
+            return
+        assert asyncio.get_running_loop().time() < deadline, "Condition was not met in time"
+        await asyncio.sleep(0.05)
+
+
+def get_cache_misses() -> int:
+    return metrics.snapshot()["counters"].get("denylist_cache_misses_total", 0)
+
+
+@pytest.mark.asyncio
+async def test_revocations_reach_cached_lookups(redis_client):
+    subscriber = RedisSubscriber(redis=redis_client)
+    denylist_cache = DenylistCache(redis=redis_client, subscriber=subscriber)
+    subscriber.start()
+    try:
+        await wait_for(lambda: subscriber.connected)
+
+        email = f"test_user{str(uuid.uuid4())[:40]}@test.com"
+        token = {"sub": email, "type": "access", "jti": str(uuid.uuid4()), "epoch": 0}
+        other_token = {"sub": email, "type": "access", "jti": str(uuid.uuid4()), "epoch": 0}
+        assert await denylist_cache.are_tokens_revoked([token, other_token]) == [False, False]
+
+        # Lookups are cached now, the revocation arrives over pub/sub without another Redis read.
+        misses = get_cache_misses()
+        redis_service = RedisService(redis=redis_client)
+        await redis_service.revoke_token(email=email, token_name="access", token_value=token["jti"], ttl=60)
+        await wait_for(lambda: denylist_cache.is_token_revoked(token))
+        assert not await denylist_cache.is_token_revoked(other_token)
+
+        await redis_service.revoke_all_tokens(email=email)
+        await wait_for(lambda: denylist_cache.is_token_revoked(other_token))
+        assert get_cache_misses() == misses
+    finally:
+        await subscriber.stop()
@@ -0,0 +1,72 @@
+import asyncio
+import uuid
+from http import HTTPStatus
+
+import pytest
+from tests.functional.settings import test_settings
+
+INTROSPECT_URL = f"{test_settings.service_url}/internal/introspect"
+
+
+async def login(session) -> str:
+    create_user_data = {
+        "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+        "password": "StrongPass123",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+    async with session.post(f"{test_settings.service_url}/api/v1/users/signup", json=create_user_data) as response:
+        assert response.status == HTTPStatus.CREATED
+
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/login",
+        json={"email": create_user_data["email"], "password": create_user_data["password"]},
+    ) as response:
+        assert response.status == HTTPStatus.OK
+        return response.cookies["access_token_cookie"].value
+
+
+async def introspect(session, tokens: list[str]) -> list[dict]:
+    async with session.post(INTROSPECT_URL, json={"tokens": tokens}) as response:
+        assert response.status == HTTPStatus.OK
+        return (await response.json())["tokens"]
+
+
+@pytest.mark.asyncio
+async def test_introspect(session):
+    access_token = await login(session)
+
+    active, invalid = await introspect(session, [access_token, "not a token"])
+    assert active["active"] is True
+    assert active["claims"]["type"] == "access"
+    assert active["max_age"] > 0
+    assert invalid["active"] is False
+    assert invalid["claims"] is None
+
+
+@pytest.mark.asyncio
+async def test_introspect_revoked_token(session):
+    access_token = await login(session)
+    # The answer is cached by the worker now, the revocation reaches its cache over pub/sub.
+    assert (await introspect(session, [access_token]))[0]["active"] is True
+
+    async with session.delete(
+        f"{test_settings.service_url}/api/v1/auth/access-revoke", cookies={"access_token_cookie": access_token}
+    ) as response:
+        assert response.status == HTTPStatus.NO_CONTENT
+
+    deadline = asyncio.get_running_loop().time() + 5
+    while (await introspect(session, [access_token]))[0]["active"]:
+        assert asyncio.get_running_loop().time() < deadline, "Revoked token is still active"
+        await asyncio.sleep(0.1)
+
+    (revoked,) = await introspect(session, [access_token])
+    assert revoked["claims"] is None
+
+
+@pytest.mark.asyncio
+async def test_introspect_not_public(session):
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/introspect", json={"tokens": ["not a token"]}
+    ) as response:
+        assert response.status == HTTPStatus.NOT_FOUND
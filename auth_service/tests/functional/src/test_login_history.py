@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from src.core.database import create_pg_engine
+from src.core.login_history import LoginHistoryWriter
+from src.core.metrics import metrics
+from src.models.user import UserLoginHistoryCreate
+from tests.functional.settings import test_settings
+
+
+@pytest_asyncio.fixture()
+async def engine():
+    engine = create_pg_engine()
+    yield engine
+    await engine.dispose()
+
+
+async def signup(session) -> dict:
+    create_user_data = {
+        "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+        "password": "StrongPass123",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+    async with session.post(f"{test_settings.service_url}/api/v1/users/signup", json=create_user_data) as response:
+        assert response.status == HTTPStatus.CREATED
+        return {**create_user_data, "id": (await response.json())["id"]}
+
+
+async def get_history_rows(engine: AsyncEngine, user_id: str) -> list:
+    async with engine.connect() as connection:
+        result = await connection.execute(
+            text("SELECT user_agent, ip_address FROM users_login_history WHERE user_id = :user_id"),
+            {"user_id": uuid.UUID(user_id)},
+        )
+        return result.all()
+
+
+def get_counter(name: str) -> int:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+@pytest.mark.asyncio
+async def test_login_writes_history_row(session, engine):
+    user = await signup(session)
+
+    # Values longer than the columns would fail the whole COPY batch, they are cut to fit.
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/login",
+        json={"email": user["email"], "password": user["password"]},
+        headers={"User-Agent": "a" * 300, "X-Real-IP": "2001:db8::ff00:42:8329"},
+    ) as response:
+        assert response.status == HTTPStatus.OK
+
+    deadline = asyncio.get_running_loop().time() + 10
+    while not (rows := await get_history_rows(engine, user["id"])):
+        assert asyncio.get_running_loop().time() < deadline, "Login history was not flushed in time"
+        await asyncio.sleep(0.1)
+
+    assert rows == [("a" * 255, "2001:db8::ff00:")]
+
+
+@pytest.mark.asyncio
+async def test_writer_copies_batches(session, engine):
+    user = await signup(session)
+    writer = LoginHistoryWriter(engine=engine, batch_size=2, flush_interval=0.05)
+    writer.start()
+    for _ in range(3):
+        writer.write(UserLoginHistoryCreate(user_id=user["id"], user_agent="test", ip_address="10.0.0.1"))
+    await writer.stop()
+
+    assert len(await get_history_rows(engine, user["id"])) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_drops_batch(session, engine):
+    user = await signup(session)
+    broken_engine = create_async_engine(engine.url.set(database=f"missing_{uuid.uuid4().hex}"))
+    writer = LoginHistoryWriter(engine=broken_engine, flush_interval=0.05)
+    writer.start()
+    dropped = get_counter("login_history_dropped_total")
+
+    # Neither the write nor the failed flush reaches the caller, the batch is dropped and counted.
+    writer.write(UserLoginHistoryCreate(user_id=user["id"], user_agent="test", ip_address="10.0.0.1"))
+    await writer.stop()
+    await broken_engine.dispose()
+
+    assert get_counter("login_history_dropped_total") == dropped + 1
+    assert await get_history_rows(engine, user["id"]) == []
@@ -0,0 +1,79 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from src.commands.base import async_engine
+from src.commands.manage_partitions import manage_partitions
+from src.core.partitions import (
+    LOGIN_HISTORY_TABLE,
+    PARTITION_KEY,
+    add_months,
+    create_default_partition,
+    get_default_partition_name,
+    get_partition_name,
+    list_partitions,
+)
+
+
+@pytest_asyncio.fixture()
+async def history_table():
+    """A partitioned copy of the login history table without partitions, dropped with them afterwards."""
+    table = f"test_history_{uuid.uuid4().hex[:8]}"
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text(
+                f"CREATE TABLE {table} (LIKE {LOGIN_HISTORY_TABLE} INCLUDING DEFAULTS) "
+                f"PARTITION BY RANGE ({PARTITION_KEY})"
+            )
+        )
+    yield table
+    async with async_engine.begin() as connection:
+        await connection.execute(text(f"DROP TABLE {table} CASCADE"))
+
+
+async def count_rows(table: str) -> int:
+    async with async_engine.connect() as connection:
+        return (await connection.execute(text(f"SELECT count(*) FROM ONLY {table}"))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_rows_moved_out_of_default_partition(history_table):
+    current_month = datetime.utcnow().date().replace(day=1)
+    next_month = add_months(current_month, 1)
+    # Rows of months without a partition land in DEFAULT, where Postgres would refuse to create their partition.
+    await create_default_partition(async_engine, history_table)
+    login_months = [current_month, current_month, next_month, add_months(current_month, -24)]
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text(f"INSERT INTO {history_table} (id, {PARTITION_KEY}) VALUES (:id, :login_time)"),
+            [
+                {"id": uuid.uuid4(), "login_time": datetime(m.year, m.month, 1) + timedelta(hours=1)}
+                for m in login_months
+            ],
+        )
+
+    await manage_partitions(
+        future_months=1, retention_months=0, default_partition=True, drop=False, report=False, table=history_table
+    )
+
+    async with async_engine.connect() as connection:
+        partitions = {partition.name: partition for partition in await list_partitions(connection, history_table)}
+    assert set(partitions) == {
+        get_default_partition_name(history_table),
+        get_partition_name(history_table, current_month),
+        get_partition_name(history_table, next_month),
+    }
+    assert partitions[get_partition_name(history_table, next_month)].month == next_month
+    assert await count_rows(get_default_partition_name(history_table)) == 1
+    assert await count_rows(get_partition_name(history_table, current_month)) == 2
+    assert await count_rows(get_partition_name(history_table, next_month)) == 1
+
+    # New rows of the month are routed to its partition now.
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            text(f"INSERT INTO {history_table} (id, {PARTITION_KEY}) VALUES (:id, :login_time)"),
+            {"id": uuid.uuid4(), "login_time": datetime.utcnow()},
+        )
+    assert await count_rows(get_partition_name(history_table, current_month)) == 3
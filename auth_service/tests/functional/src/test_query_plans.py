@@ -0,0 +1,269 @@
+import json
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, NamedTuple
+from uuid import UUID
+
+import psycopg2
+import pytest
+from fastapi_pagination import Params
+from fastapi_pagination.api import set_params
+from sqlalchemy import event
+from sqlalchemy.engine import Dialect, IteratorResult, Result
+from sqlalchemy.engine.result import SimpleResultMetaData
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql import Executable
+from src.core.hashing import PasswordHasher
+from src.models.db.user import User
+from src.models.role import RoleCRUD, RoleInDB
+from src.services.oauth import BaseOAuthService, OAuthYandexService
+from src.services.role import RoleService
+from src.services.user import UserService, encode_history_cursor
+from tests.functional.settings import test_settings
+
+USERS = 20_000
+ROLES = 50
+HISTORY_PER_USER = 10
+
+# Service calls whose statements are checked, with the tables they must not scan sequentially.
+# RoleService.get_list and RoleCatalog read the whole roles table by design, inserts go by primary key.
+SERVICE_CALLS = {
+    "UserService.get_by_email": (lambda services, p: services.user.get_by_email(user_email=p["email"]), {"users"}),
+    "UserService.get_by_id": (lambda services, p: services.user.get_by_id(user_id=p["user_id"]), {"users"}),
+    "UserService._check_model_exists_by_id": (
+        lambda services, p: services.user._check_model_exists_by_id(services.user.session, User, p["user_id"]),
+        {"users"},
+    ),
+    "UserService._rehash_password": (
+        lambda services, p: services.user._rehash_password(user_id=p["user_id"], old_hash="hash", password="password"),
+        {"users"},
+    ),
+    "UserService.get_user_login_history": (
+        lambda services, p: services.user.get_user_login_history(user_id=p["user_id"]),
+        {"users_login_history"},
+    ),
+    "UserService.get_user_login_history_page": (
+        lambda services, p: services.user.get_user_login_history_page(user_id=p["user_id"], size=50),
+        {"users_login_history"},
+    ),
+    "UserService.get_user_login_history_page with cursor and bounds": (
+        lambda services, p: services.user.get_user_login_history_page(
+            user_id=p["user_id"],
+            size=50,
+            cursor=encode_history_cursor(p["now"], p["user_id"]),
+            from_time=p["now"] - timedelta(days=HISTORY_PER_USER),
+            to_time=p["now"],
+        ),
+        {"users_login_history"},
+    ),
+    "RoleService.get_user_roles": (
+        lambda services, p: services.role.get_user_roles(user_id=p["user_id"]),
+        {"users", "users_roles"},
+    ),
+    "RoleService.get_role_names": (
+        lambda services, p: services.role.get_role_names(role_ids=[p["role"].id]),
+        {"roles"},
+    ),
+    "RoleService.get_by_id": (lambda services, p: services.role.get_by_id(role_id=p["role"].id), {"roles"}),
+    "RoleService.get_by_name": (lambda services, p: services.role.get_by_name(role_name=p["role"].name), {"roles"}),
+    "RoleService.update": (
+        lambda services, p: services.role.update(role=p["role"], role_data=RoleCRUD(name="renamed")),
+        {"roles"},
+    ),
+    "RoleService.delete": (lambda services, p: services.role.delete(role=p["role"]), {"roles", "users_roles"}),
+    "RoleService.assign_role": (
+        lambda services, p: services.role.assign_role(role=p["role"], user=p["user"]),
+        {"users_roles"},
+    ),
+    "RoleService.revoke_role": (
+        lambda services, p: services.role.revoke_role(role=p["role"], user=p["user"]),
+        {"users_roles"},
+    ),
+    "BaseOAuthService._get_oauth_user_by_id": (
+        lambda services, p: services.oauth._get_oauth_user_by_id(oauth_id=p["oauth_id"]),
+        {"oauth_users"},
+    ),
+}
+
+# Lookups Postgres itself runs by foreign key when a user is deleted, there is no service statement for them.
+CASCADE_LOOKUPS = {
+    "oauth_users of a deleted user": "SELECT * FROM oauth_users WHERE oauth_users.user_id = %(user_id)s",
+}
+
+
+class Services(NamedTuple):
+    user: UserService
+    role: RoleService
+    oauth: BaseOAuthService
+
+
+@contextmanager
+def capture_statements() -> Iterator[list]:
+    """Record statements executed by any Session instead of running them, every result is empty.
+
+    Loads that only follow returned rows, like selectinload, are not reached; they go by primary key.
+    """
+    statements = []
+
+    def record(orm_execute_state: ORMExecuteState) -> Result:
+        statements.append(orm_execute_state.statement)
+        return IteratorResult(SimpleResultMetaData(["value"]), iter([]))
+
+    event.listen(Session, "do_orm_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Session, "do_orm_execute", record)
+
+
+def compile_statement(statement: Executable, dialect: Dialect) -> str:
+    """Compile statement as the service sends it to Postgres, with its parameters inlined."""
+    return str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+async def get_service_statements(name: str, params: dict) -> list[str]:
+    call, _ = SERVICE_CALLS[name]
+    password_hasher = PasswordHasher(executor="thread", max_workers=1, method="pbkdf2:sha256:1")
+    # Never connects, statements are captured before they need a connection.
+    engine = create_async_engine("postgresql+asyncpg://")
+    session = AsyncSession(engine)
+    user_service = UserService(session=session, redis=None, password_hasher=password_hasher)
+    role_service = RoleService(session=session, redis=None)
+    services = Services(
+        user=user_service,
+        role=role_service,
+        oauth=OAuthYandexService(session=session, redis=None, role_service=role_service, user_service=user_service),
+    )
+    try:
+        with capture_statements() as statements, set_params(Params()):
+            await call(services, params)
+    finally:
+        await session.close()
+        await engine.dispose()
+        password_hasher.shutdown()
+    return [compile_statement(statement, engine.dialect) for statement in statements]
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    """Load a synthetic dataset in a transaction that is rolled back afterwards."""
+    connection = psycopg2.connect(**test_settings.get_postgres_dsn())
+    cursor = connection.cursor()
+    prefix = f"plan_{uuid.uuid4().hex[:8]}"
+    cursor.execute(
+        "INSERT INTO roles (id, name) SELECT gen_random_uuid(), %(prefix)s || '_role_' || i "
+        "FROM generate_series(1, %(roles)s) i",
+        {"prefix": prefix, "roles": ROLES},
+    )
+    cursor.execute(
+        "INSERT INTO users (id, email, password, created_at, access_level) "
+        "SELECT gen_random_uuid(), %(prefix)s || '_user_' || i || '@test.com', 'hash', now(), 0 "
+        "FROM generate_series(1, %(users)s) i",
+        {"prefix": prefix, "users": USERS},
+    )
+    cursor.execute(
+        "INSERT INTO users_roles (user_id, role_id) "
+        "SELECT u.id, r.id FROM generate_series(1, %(users)s) i "
+        "JOIN users u ON u.email = %(prefix)s || '_user_' || i || '@test.com' "
+        "JOIN roles r ON r.name = %(prefix)s || '_role_' || (i %% %(roles)s + 1)",
+        {"prefix": prefix, "users": USERS, "roles": ROLES},
+    )
+    cursor.execute(
+        "INSERT INTO oauth_users (id, user_id, oauth_id, oauth_name) "
+        "SELECT gen_random_uuid(), id, md5(email), 'yandex' FROM users WHERE email LIKE %(pattern)s",
+        {"pattern": f"{prefix}_%"},
+    )
+    cursor.execute(
+        "INSERT INTO users_login_history (id, user_id, user_agent, ip_address, login_time) "
+        "SELECT gen_random_uuid(), u.id, 'benchmark', '127.0.0.1', now() - (i || ' days')::interval "
+        "FROM users u CROSS JOIN generate_series(0, %(history)s - 1) i WHERE u.email LIKE %(pattern)s",
+        {"pattern": f"{prefix}_%", "history": HISTORY_PER_USER},
+    )
+    cursor.execute("ANALYZE users, roles, users_roles, oauth_users, users_login_history")
+    cursor.execute(
+        "SELECT u.id, u.email, md5(u.email), r.id, r.name FROM users u, roles r "
+        "WHERE u.email = %(email)s AND r.name = %(role_name)s",
+        {"email": f"{prefix}_user_1@test.com", "role_name": f"{prefix}_role_1"},
+    )
+    user_id, email, oauth_id, role_id, role_name = cursor.fetchone()
+    user = User(email=email, password_hash="hash")
+    user.id = UUID(str(user_id))
+    params = {
+        "user_id": UUID(str(user_id)),
+        "email": email.upper(),
+        "oauth_id": oauth_id,
+        "role": RoleInDB(id=UUID(str(role_id)), name=role_name),
+        "user": user,
+        "now": datetime.utcnow(),
+    }
+    yield cursor, params
+    connection.rollback()
+    connection.close()
+
+
+def get_scans(plan: dict) -> list[tuple[str, str]]:
+    """Get (node type, relation) of every scan node of the plan."""
+    scans = []
+    if "Relation Name" in plan:
+        scans.append((plan["Node Type"], plan["Relation Name"]))
+    for subplan in plan.get("Plans", []):
+        scans.extend(get_scans(subplan))
+    return scans
+
+
+def get_indexes(plan: dict) -> set[str]:
+    """Get names of the indexes the plan scans."""
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for subplan in plan.get("Plans", []):
+        indexes |= get_indexes(subplan)
+    return indexes
+
+
+def get_plan(cursor, statement: str, params: dict | None = None) -> dict:
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def get_seq_scans(cursor, statement: str, tables: set[str], params: dict | None = None) -> list[str]:
+    """Get tables of the statement plan that are scanned sequentially."""
+    scans = get_scans(get_plan(cursor, statement, params))
+
+    # Monthly partitions are scanned under their own names, <table>_YYYY_MM.
+    return [
+        relation
+        for node_type, relation in scans
+        if node_type == "Seq Scan" and any(relation == table or relation.startswith(f"{table}_2") for table in tables)
+    ]
+
+
+@pytest.mark.parametrize("name", SERVICE_CALLS)
+@pytest.mark.asyncio
+async def test_query_uses_index(dataset, name):
+    cursor, params = dataset
+    _, tables = SERVICE_CALLS[name]
+    statements = await get_service_statements(name, params)
+    assert statements, f"{name} does not query the database"
+
+    for statement in statements:
+        seq_scans = get_seq_scans(cursor, statement, tables)
+        assert not seq_scans, f"{name} scans {seq_scans} sequentially:\n{statement}"
+
+
+@pytest.mark.asyncio
+async def test_email_lookup_uses_lower_index(dataset):
+    cursor, params = dataset
+    # params["email"] is upper-cased, only the expression index serves the case-insensitive match.
+    (statement,) = await get_service_statements("UserService.get_by_email", params)
+    assert "ix_users_email_lower" in get_indexes(get_plan(cursor, statement))
+
+
+@pytest.mark.parametrize("name", CASCADE_LOOKUPS)
+def test_cascade_lookup_uses_index(dataset, name):
+    cursor, params = dataset
+    seq_scans = get_seq_scans(cursor, CASCADE_LOOKUPS[name], {"oauth_users"}, {"user_id": str(params["user_id"])})
+    assert not seq_scans, f"{name} scans {seq_scans} sequentially"
@@ -0,0 +1,180 @@
+import uuid
+from http import HTTPStatus
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from src.api.v1.middlewares import RequestIdMiddleware
+from src.core import dependencies
+from src.core.config.base import RateLimitPolicy, RateLimitSettings
+from src.core.metrics import metrics
+from src.core.rate_limit import RateLimiter
+from src.services.rate_limit import RateLimitMiddleware
+
+LIMIT = 3
+PERIOD = 60
+
+
+def create_app(request_id: bool = False) -> FastAPI:
+    service = FastAPI(default_response_class=ORJSONResponse)
+    service.state.calls = 0
+
+    @service.get("/ping")
+    async def ping() -> dict:
+        service.state.calls += 1
+        return {"ping": "pong"}
+
+    @service.get("/unlimited")
+    async def unlimited() -> dict:
+        return {"ping": "pong"}
+
+    @service.get("/stream")
+    async def stream() -> StreamingResponse:
+        return StreamingResponse(iter([b"po", b"ng"]), media_type="text/plain")
+
+    # Same order as in main: the rate limit runs first, then the X-Request-Id check.
+    if request_id:
+        service.add_middleware(RequestIdMiddleware)
+    service.add_middleware(RateLimitMiddleware)
+    return service
+
+
+def create_rate_limiter(redis_client, **settings) -> RateLimiter:
+    return RateLimiter(
+        redis=redis_client,
+        settings=RateLimitSettings(
+            default=RateLimitPolicy(limit=LIMIT, period=PERIOD, key="ip"),
+            routes={"GET /unlimited": None},
+            **settings,
+        ),
+    )
+
+
+def get_counter(name: str) -> int:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+@pytest_asyncio.fixture()
+async def client(redis_client):
+    # The service reads the limiter from dependencies, as set up by the lifespan of the app.
+    dependencies.rate_limiter = create_rate_limiter(redis_client)
+    async with httpx.AsyncClient(app=create_app(), base_url="http://test") as client:
+        yield client
+    dependencies.rate_limiter = None
+
+
+@pytest.fixture()
+def traced_app() -> FastAPI:
+    """App with the middleware stack of the service with Jaeger enabled."""
+    return create_app(request_id=True)
+
+
+@pytest_asyncio.fixture()
+async def traced_client(redis_client, traced_app):
+    dependencies.rate_limiter = create_rate_limiter(redis_client)
+    async with httpx.AsyncClient(app=traced_app, base_url="http://test") as client:
+        yield client
+    dependencies.rate_limiter = None
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_headers(client):
+    headers = {"X-Real-IP": str(uuid.uuid4())}
+    for remaining in range(LIMIT - 1, -1, -1):
+        response = await client.get("/ping", headers=headers)
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["RateLimit-Limit"] == str(LIMIT)
+        assert response.headers["RateLimit-Remaining"] == str(remaining)
+        assert 0 < int(response.headers["RateLimit-Reset"]) <= PERIOD
+        assert "Retry-After" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_exceeded(client):
+    headers = {"X-Real-IP": str(uuid.uuid4())}
+    for _ in range(LIMIT):
+        response = await client.get("/ping", headers=headers)
+        assert response.status_code == HTTPStatus.OK
+
+    response = await client.get("/ping", headers=headers)
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.json() == {"detail": "Too Many Requests"}
+    assert response.headers["RateLimit-Limit"] == str(LIMIT)
+    assert response.headers["RateLimit-Remaining"] == "0"
+    # One request is let through every PERIOD / LIMIT seconds.
+    assert 0 < int(response.headers["Retry-After"]) <= PERIOD // LIMIT
+
+    # Buckets are per client IP.
+    response = await client.get("/ping", headers={"X-Real-IP": str(uuid.uuid4())})
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_unlimited_route(client):
+    headers = {"X-Real-IP": str(uuid.uuid4())}
+    for _ in range(LIMIT + 1):
+        response = await client.get("/unlimited", headers=headers)
+        assert response.status_code == HTTPStatus.OK
+        assert "RateLimit-Limit" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_leases_never_exceed_limit(redis_client):
+    limit, lease_size = 100, 10
+    policy = RateLimitPolicy(limit=limit, period=3600, key="ip")
+    # Each worker process has its own limiter and leases, the bucket in Redis is shared.
+    worker_count = 4
+    workers = [create_rate_limiter(redis_client, lease_size=lease_size, lease_ttl=60) for _ in range(worker_count)]
+    key = f"ip:{uuid.uuid4()}"
+    redis_calls = get_counter("rate_limit_redis_calls_total")
+
+    results = [await workers[i % worker_count].hit(key, policy) for i in range(limit * 2)]
+
+    # Tokens leased by one worker are never granted to another one, however the requests are spread.
+    assert sum(result.allowed for result in results) <= limit
+    assert not any(result.allowed for result in results[-worker_count:])
+    # Denials are answered from the lease until the Retry-After of the bucket, so most requests skip Redis.
+    redis_calls = get_counter("rate_limit_redis_calls_total") - redis_calls
+    assert redis_calls <= limit // lease_size + worker_count
+
+
+@pytest.mark.asyncio
+async def test_middleware_stack_applies_to_every_request(traced_app, traced_client):
+    headers = {"X-Real-IP": str(uuid.uuid4())}
+    redis_calls = get_counter("rate_limit_redis_calls_total")
+    rejected = get_counter("rate_limit_rejected_total")
+
+    # Requests without X-Request-Id are rejected before the handler, after they are counted by the limit.
+    response = await traced_client.get("/ping", headers=headers)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {"detail": "X-Request-Id is required"}
+    assert response.headers["RateLimit-Remaining"] == str(LIMIT - 1)
+    assert traced_app.state.calls == 0
+
+    for remaining in range(LIMIT - 2, -1, -1):
+        response = await traced_client.get("/ping", headers={**headers, "X-Request-Id": str(uuid.uuid4())})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {"ping": "pong"}
+        assert response.headers["RateLimit-Remaining"] == str(remaining)
+    assert traced_app.state.calls == LIMIT - 1
+
+    for _ in range(2):
+        response = await traced_client.get("/ping", headers={**headers, "X-Request-Id": str(uuid.uuid4())})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert "Retry-After" in response.headers
+    assert traced_app.state.calls == LIMIT - 1
+
+    assert get_counter("rate_limit_redis_calls_total") - redis_calls == LIMIT + 2
+    assert get_counter("rate_limit_rejected_total") - rejected == 2
+
+
+@pytest.mark.asyncio
+async def test_headers_added_to_streamed_response(traced_client):
+    response = await traced_client.get(
+        "/stream", headers={"X-Real-IP": str(uuid.uuid4()), "X-Request-Id": str(uuid.uuid4())}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.text == "pong"
+    assert response.headers["RateLimit-Remaining"] == str(LIMIT - 1)
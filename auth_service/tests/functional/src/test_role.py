@@ -1,9 +1,42 @@
+import time
 import uuid
 from http import HTTPStatus
 
+import jwt
 import pytest
 from tests.functional.settings import test_settings
 
+ROLES_URL = f"{test_settings.service_url}/api/v1/roles/"
+
+
+async def login(session, email: str, password: str):
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/login", json={"email": email, "password": password}
+    ) as response:
+        assert response.status == HTTPStatus.OK
+        return response.cookies["access_token_cookie"]
+
+
+def create_access_token(access_level: int, **claims) -> str:
+    """Sign an access token like the service does, with claims no seeded user has."""
+    now = int(time.time())
+    return jwt.encode(
+        {
+            "sub": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+            "iat": now,
+            "nbf": now,
+            "jti": str(uuid.uuid4()),
+            "exp": now + 300,
+            "type": "access",
+            "fresh": False,
+            "access_level": access_level,
+            "epoch": 0,
+            **claims,
+        },
+        test_settings.jwt_secret_key,
+        algorithm="HS256",
+    )
+
 
 @pytest.mark.asyncio
 async def test_create(session):
@@ -43,3 +76,67 @@ async def test_assign(session):
 async def test_revoke(session):
     pass
     # TODO add after default roles and default user endpoints are added
+
+
+@pytest.mark.asyncio
+async def test_staff_cannot_write(session):
+    access_token = await login(session, "staff@mail.com", "staff_password")
+
+    async with session.get(ROLES_URL, cookies={"access_token_cookie": access_token}) as response:
+        assert response.status == HTTPStatus.OK
+
+    create_role_data = {"name": f"test_role_{str(uuid.uuid4())}"}
+    async with session.post(
+        ROLES_URL, json=create_role_data, cookies={"access_token_cookie": access_token}
+    ) as response:
+        assert response.status == HTTPStatus.FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_admin_can_write(session):
+    access_token = await login(session, "admin@mail.com", "admin_password")
+
+    create_role_data = {"name": f"test_role_{str(uuid.uuid4())}"}
+    async with session.post(
+        ROLES_URL, json=create_role_data, cookies={"access_token_cookie": access_token}
+    ) as response:
+        assert response.status == HTTPStatus.CREATED
+
+
+@pytest.mark.asyncio
+async def test_access_level_below_bound(session):
+    # Every permission bit, but the level of staff.
+    access_token = create_access_token(access_level=3, perm=7)
+
+    create_role_data = {"name": f"test_role_{str(uuid.uuid4())}"}
+    async with session.post(
+        ROLES_URL, json=create_role_data, cookies={"access_token_cookie": access_token}
+    ) as response:
+        assert response.status == HTTPStatus.FORBIDDEN
+        body = await response.json()
+        assert body["detail"] == "User does not have the required level."
+
+
+@pytest.mark.parametrize(
+    "roles, expected_read, expected_write",
+    [
+        (["admin"], HTTPStatus.OK, HTTPStatus.CREATED),
+        (["staff"], HTTPStatus.OK, HTTPStatus.FORBIDDEN),
+        (["user"], HTTPStatus.FORBIDDEN, HTTPStatus.FORBIDDEN),
+        (["user", "staff"], HTTPStatus.OK, HTTPStatus.FORBIDDEN),
+        ([], HTTPStatus.FORBIDDEN, HTTPStatus.FORBIDDEN),
+    ],
+)
+@pytest.mark.asyncio
+async def test_legacy_roles_token(roles, expected_read, expected_write, session):
+    # Issued before the "perm" claim, permissions come from role names.
+    access_token = create_access_token(access_level=5, roles=roles)
+
+    async with session.get(ROLES_URL, cookies={"access_token_cookie": access_token}) as response:
+        assert response.status == expected_read
+
+    create_role_data = {"name": f"test_role_{str(uuid.uuid4())}"}
+    async with session.post(
+        ROLES_URL, json=create_role_data, cookies={"access_token_cookie": access_token}
+    ) as response:
+        assert response.status == expected_write
@@ -0,0 +1,122 @@
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from src.core.signing import KeyRing, SigningKey
+
+PUBLISH_AHEAD = 3600
+MAX_TOKEN_LIFETIME = 86400
+LEGACY_SECRET = "legacy_secret_of_at_least_32_bytes"
+
+NOW = datetime.utcnow().replace(microsecond=0)
+CURRENT_ACTIVE_FROM = NOW - timedelta(days=30)
+NEXT_ACTIVE_FROM = NOW + timedelta(hours=12)
+
+
+def create_key(kid: str, active_from: datetime) -> SigningKey:
+    return SigningKey(
+        kid=kid, algorithm="ES256", private_key=ec.generate_private_key(ec.SECP256R1()), active_from=active_from
+    )
+
+
+@pytest.fixture(scope="module")
+def keys() -> dict[str, SigningKey]:
+    return {"current": create_key("current", CURRENT_ACTIVE_FROM), "next": create_key("next", NEXT_ACTIVE_FROM)}
+
+
+@pytest.fixture(scope="module")
+def key_ring(keys: dict[str, SigningKey]) -> KeyRing:
+    return KeyRing(
+        keys=list(keys.values()),
+        max_token_lifetime=MAX_TOKEN_LIFETIME,
+        publish_ahead=PUBLISH_AHEAD,
+        legacy_secret=LEGACY_SECRET,
+    )
+
+
+def get_published_kids(key_ring: KeyRing, now: datetime) -> list[str]:
+    return [key.kid for key in key_ring.get_published_keys(now)]
+
+
+def create_token(key: SigningKey, kid: str | None = None, **claims) -> str:
+    claims = {"sub": "test@example.com", "iat": int(time.time()), "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(claims, key.private_key, algorithm=key.algorithm, headers={"kid": kid or key.kid})
+
+
+@pytest.mark.parametrize(
+    "now, expected_kids",
+    [
+        (NEXT_ACTIVE_FROM - timedelta(seconds=PUBLISH_AHEAD + 1), ["current"]),
+        (NEXT_ACTIVE_FROM - timedelta(seconds=PUBLISH_AHEAD), ["current", "next"]),
+        (NEXT_ACTIVE_FROM - timedelta(seconds=1), ["current", "next"]),
+    ],
+)
+def test_next_key_published_ahead(key_ring: KeyRing, now: datetime, expected_kids: list[str]):
+    assert get_published_kids(key_ring, now) == expected_kids
+
+
+def test_published_key_is_not_signing_before_active(key_ring: KeyRing):
+    now = NEXT_ACTIVE_FROM - timedelta(seconds=1)
+    assert key_ring.get_verification_key("next", now)
+    assert key_ring.get_signing_key(now).kid == "current"
+    assert key_ring.get_signing_key(NEXT_ACTIVE_FROM).kid == "next"
+
+
+@pytest.mark.parametrize(
+    "now, expected_kids",
+    [
+        (NEXT_ACTIVE_FROM + timedelta(seconds=MAX_TOKEN_LIFETIME - 1), ["current", "next"]),
+        (NEXT_ACTIVE_FROM + timedelta(seconds=MAX_TOKEN_LIFETIME), ["next"]),
+    ],
+)
+def test_old_key_retained_for_max_token_lifetime(key_ring: KeyRing, now: datetime, expected_kids: list[str]):
+    assert get_published_kids(key_ring, now) == expected_kids
+
+
+def test_no_signing_key_before_first_active(key_ring: KeyRing):
+    with pytest.raises(RuntimeError):
+        key_ring.get_signing_key(CURRENT_ACTIVE_FROM - timedelta(seconds=1))
+
+
+def test_decode_signed_token(key_ring: KeyRing, keys: dict[str, SigningKey]):
+    assert key_ring.decode(create_token(keys["current"]))["sub"] == "test@example.com"
+
+
+def test_unknown_kid_rejected(key_ring: KeyRing, keys: dict[str, SigningKey]):
+    with pytest.raises(jwt.InvalidTokenError, match="Unknown key id"):
+        key_ring.decode(create_token(keys["current"], kid="unknown"))
+
+
+def test_unpublished_key_rejected(keys: dict[str, SigningKey]):
+    future_key = create_key("future", NOW + timedelta(seconds=PUBLISH_AHEAD * 2))
+    key_ring = KeyRing(
+        keys=[keys["current"], future_key], max_token_lifetime=MAX_TOKEN_LIFETIME, publish_ahead=PUBLISH_AHEAD
+    )
+    with pytest.raises(jwt.InvalidTokenError, match="Unknown key id"):
+        key_ring.decode(create_token(future_key))
+
+
+def test_legacy_token_older_than_max_token_lifetime(key_ring: KeyRing):
+    issued_at = int((CURRENT_ACTIVE_FROM - timedelta(hours=1) - datetime(1970, 1, 1)).total_seconds())
+    token = jwt.encode({"sub": "test@example.com", "iat": issued_at}, LEGACY_SECRET, algorithm="HS256")
+    with pytest.raises(jwt.InvalidTokenError, match="longest token lifetime"):
+        key_ring.decode(token)
+
+
+def test_legacy_token_issued_before_key_ring():
+    legacy_key_ring = KeyRing(
+        keys=[create_key("current", NOW - timedelta(hours=1))],
+        max_token_lifetime=MAX_TOKEN_LIFETIME,
+        legacy_secret=LEGACY_SECRET,
+    )
+    issued_at = int(time.time()) - 2 * 3600
+    token = jwt.encode({"sub": "test@example.com", "iat": issued_at}, LEGACY_SECRET, algorithm="HS256")
+    assert legacy_key_ring.decode(token)["sub"] == "test@example.com"
+
+
+def test_legacy_token_issued_after_key_ring(key_ring: KeyRing):
+    token = jwt.encode({"sub": "test@example.com", "iat": int(time.time())}, LEGACY_SECRET, algorithm="HS256")
+    with pytest.raises(jwt.InvalidTokenError, match="issued after"):
+        key_ring.decode(token)
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import jwt
+import orjson
+import pytest
+from async_fastapi_jwt_auth import AuthJWT
+from cryptography.hazmat.primitives.asymmetric import ec
+from src.core.signing import KeyRing, SigningKey
+from src.core.token_issuer import TokenIssuer
+
+ISSUER = "auth_service"
+SUBJECT = "test@example.com"
+
+
+@pytest.fixture()
+def key_ring() -> KeyRing:
+    key = SigningKey(
+        kid="current",
+        algorithm="ES256",
+        private_key=ec.generate_private_key(ec.SECP256R1()),
+        active_from=datetime.utcnow() - timedelta(days=1),
+    )
+    return KeyRing(keys=[key], max_token_lifetime=86400)
+
+
+@pytest.fixture()
+def issuer(monkeypatch) -> str:
+    # AuthJWT keeps its settings on the class, the issuer reads them once on creation.
+    monkeypatch.setattr(AuthJWT, "_encode_issuer", ISSUER)
+    return ISSUER
+
+
+def decode_with_jwks(token: str, key_ring: KeyRing, **options) -> dict:
+    body, _ = key_ring.get_jwks()
+    jwks = {jwk["kid"]: jwk for jwk in orjson.loads(body)["keys"]}
+    jwk = jwks[jwt.get_unverified_header(token)["kid"]]
+    return jwt.decode(token, jwt.PyJWK(jwk).key, algorithms=[jwk["alg"]], **options)
+
+
+def test_tokens_verified_with_published_key(key_ring: KeyRing, issuer: str):
+    tokens = TokenIssuer(key_ring=key_ring).issue_pair(subject=SUBJECT, user_claims={"access_level": 1})
+
+    access_claims = decode_with_jwks(tokens.access_token, key_ring, issuer=issuer)
+    assert access_claims["iss"] == issuer
+    assert access_claims["sub"] == SUBJECT
+    assert access_claims["type"] == "access"
+    assert access_claims["access_level"] == 1
+    assert access_claims["exp"] == tokens.access_expires_at
+
+    refresh_claims = decode_with_jwks(tokens.refresh_token, key_ring, issuer=issuer)
+    assert refresh_claims["iss"] == issuer
+    assert refresh_claims["type"] == "refresh"
+    assert refresh_claims["exp"] == tokens.refresh_expires_at
+    assert refresh_claims["jti"] != access_claims["jti"]
+
+
+def test_no_issuer_by_default(key_ring: KeyRing, monkeypatch):
+    monkeypatch.setattr(AuthJWT, "_encode_issuer", None)
+    tokens = TokenIssuer(key_ring=key_ring).issue_pair(subject=SUBJECT)
+
+    assert "iss" not in decode_with_jwks(tokens.access_token, key_ring)
@@ -60,7 +60,7 @@ async def test_signup_required_invalid_data(create_user_data, session):
 
 
 @pytest.mark.asyncio
-async def test_login_history(session):
+async def test_login_history(session, wait_for_login_history):
     url = f"{test_settings.service_url}/api/v1/users/signup"
     create_user_data = {
         "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
@@ -82,6 +82,9 @@ async def test_login_history(session):
         await response.json()
         access_token = response.cookies["access_token_cookie"]
 
+    # Login history is written in batches, wait for the flush.
+    await wait_for_login_history(access_token=access_token, expected_total=1)
+
     async with session.get(
         f"{test_settings.service_url}/api/v1/users/history",
         cookies={"access_token_cookie": access_token},
@@ -92,6 +95,47 @@ async def test_login_history(session):
         assert len(body["items"]) == 1
 
 
+@pytest.mark.asyncio
+async def test_login_history_cursor(session, wait_for_login_history):
+    create_user_data = {
+        "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+        "password": "StrongPass123",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+    async with session.post(f"{test_settings.service_url}/api/v1/users/signup", json=create_user_data) as response:
+        assert response.status == HTTPStatus.CREATED
+
+    login_data = {
+        "email": create_user_data["email"],
+        "password": create_user_data["password"],
+    }
+    for _ in range(3):
+        async with session.post(f"{test_settings.service_url}/api/v1/auth/login", json=login_data) as response:
+            assert response.status == HTTPStatus.OK
+            access_token = response.cookies["access_token_cookie"]
+
+    # Login history is written in batches, wait for the flush.
+    await wait_for_login_history(access_token=access_token, expected_total=3)
+
+    login_times, cursor = [], None
+    for expected_items in (2, 1):
+        params = {"size": 2, **({"cursor": cursor} if cursor else {})}
+        async with session.get(
+            f"{test_settings.service_url}/api/v1/users/history/cursor",
+            params=params,
+            cookies={"access_token_cookie": access_token},
+        ) as response:
+            assert response.status == HTTPStatus.OK
+            body = await response.json()
+            assert len(body["items"]) == expected_items
+            login_times.extend(item["login_time"] for item in body["items"])
+            cursor = body["next_cursor"]
+
+    assert cursor is None
+    assert login_times == sorted(login_times, reverse=True)
+
+
 @pytest.mark.skip("cookies are saved from previous tests")
 @pytest.mark.asyncio
 async def test_login_history__unauthorized(session):
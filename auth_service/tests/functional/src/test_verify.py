@@ -0,0 +1,64 @@
+import re
+import uuid
+from http import HTTPStatus
+
+import aiohttp
+import pytest
+from tests.functional.settings import test_settings
+
+VERIFY_URL = f"{test_settings.service_url}/api/v1/auth/verify"
+# AUTHJWT_VERIFY_MAX_AGE of the service
+VERIFY_MAX_AGE = 10
+
+
+async def login(session) -> tuple[dict, str]:
+    create_user_data = {
+        "email": f"test_user{str(uuid.uuid4())[:40]}@test.com",
+        "password": "StrongPass123",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+    async with session.post(f"{test_settings.service_url}/api/v1/users/signup", json=create_user_data) as response:
+        assert response.status == HTTPStatus.CREATED
+        user = {**await response.json(), "email": create_user_data["email"]}
+
+    async with session.post(
+        f"{test_settings.service_url}/api/v1/auth/login",
+        json={"email": create_user_data["email"], "password": create_user_data["password"]},
+    ) as response:
+        assert response.status == HTTPStatus.OK
+        return user, response.cookies["access_token_cookie"].value
+
+
+def get_max_age(headers) -> int:
+    return int(re.fullmatch(r"max-age=(\d+)", headers["Cache-Control"]).group(1))
+
+
+@pytest.mark.asyncio
+async def test_verify(session):
+    user, access_token = await login(session)
+
+    async with session.get(VERIFY_URL, cookies={"access_token_cookie": access_token}) as response:
+        assert response.status == HTTPStatus.OK
+        assert await response.read() == b""
+        assert response.headers["X-User-Id"] == user["id"]
+        assert response.headers["X-User-Email"] == user["email"]
+        assert response.headers["X-User-Permissions"].isdigit()
+        assert response.headers["X-User-Access-Level"] == str(user["access_level"])
+        assert 0 < get_max_age(response.headers) <= VERIFY_MAX_AGE
+
+
+@pytest.mark.asyncio
+async def test_verify_without_cookie():
+    # A session of its own, the shared one keeps the cookies of earlier logins.
+    async with aiohttp.ClientSession() as session, session.get(VERIFY_URL) as response:
+        assert response.status == HTTPStatus.UNAUTHORIZED
+        assert "X-User-Id" not in response.headers
+        assert 0 < get_max_age(response.headers) <= VERIFY_MAX_AGE
+
+
+@pytest.mark.asyncio
+async def test_verify_invalid_token(session):
+    async with session.get(VERIFY_URL, cookies={"access_token_cookie": "not a token"}) as response:
+        assert response.status == HTTPStatus.UNAUTHORIZED
+        assert "X-User-Email" not in response.headers
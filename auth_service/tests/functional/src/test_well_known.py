@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import httpx
+import pytest
+import pytest_asyncio
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI
+from src.api.well_known import router
+from src.core.config import base_auth_jwt_settings
+from src.core.dependencies import get_key_ring
+from src.core.signing import KeyRing, SigningKey
+
+JWKS_PATH = "/.well-known/jwks.json"
+PUBLISH_AHEAD = 3600
+NOW = datetime.utcnow()
+
+
+def create_key(kid: str, active_from: datetime) -> SigningKey:
+    return SigningKey(
+        kid=kid, algorithm="ES256", private_key=ec.generate_private_key(ec.SECP256R1()), active_from=active_from
+    )
+
+
+def create_client(key_ring: KeyRing | None) -> httpx.AsyncClient:
+    service = FastAPI()
+    service.include_router(router)
+    service.dependency_overrides[get_key_ring] = lambda: key_ring
+    return httpx.AsyncClient(app=service, base_url="http://test")
+
+
+@pytest_asyncio.fixture()
+async def client():
+    key_ring = KeyRing(
+        keys=[
+            create_key("current", NOW - timedelta(days=1)),
+            # Becomes active within PUBLISH_AHEAD, verifiers must know it before the first token it signs.
+            create_key("next", NOW + timedelta(seconds=PUBLISH_AHEAD // 2)),
+            create_key("future", NOW + timedelta(seconds=PUBLISH_AHEAD * 2)),
+        ],
+        max_token_lifetime=86400,
+        publish_ahead=PUBLISH_AHEAD,
+    )
+    async with create_client(key_ring) as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_jwks_lists_keys_published_ahead(client):
+    response = await client.get(JWKS_PATH)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["Cache-Control"] == f"public, max-age={base_auth_jwt_settings.jwks_max_age}"
+    jwks = response.json()["keys"]
+    assert [jwk["kid"] for jwk in jwks] == ["current", "next"]
+    assert all(jwk["alg"] == "ES256" and jwk["use"] == "sig" and "d" not in jwk for jwk in jwks)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"stale", {etag}', "*"])
+async def test_jwks_not_modified(client, if_none_match: str):
+    etag = (await client.get(JWKS_PATH)).headers["ETag"]
+
+    response = await client.get(JWKS_PATH, headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == f"public, max-age={base_auth_jwt_settings.jwks_max_age}"
+
+
+@pytest.mark.asyncio
+async def test_jwks_changed(client):
+    response = await client.get(JWKS_PATH, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["ETag"] != '"stale"'
+    assert response.json()["keys"]
+
+
+@pytest.mark.asyncio
+async def test_jwks_without_key_ring():
+    async with create_client(None) as client:
+        response = await client.get(JWKS_PATH)
+    assert response.status_code == HTTPStatus.NOT_FOUND